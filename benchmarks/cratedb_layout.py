@@ -0,0 +1,121 @@
+"""
+Compare the CrateDB table layouts, a single `OBJECT(DYNAMIC)` payload column
+against one typed column per tag and field, by ingest throughput and by the
+size of the insert requests.
+
+Without `--address`, a local HTTP server simulating CrateDB answers each
+request to `/_sql` immediately, and records the size of the request bodies.
+The throughput then only reflects the client side, i.e. serializing the
+batches. With `--address`, the batches are inserted into a real CrateDB, where
+the typed layout also saves the dynamic mapping work.
+
+Usage::
+
+    python benchmarks/cratedb_layout.py --channels 500 --ticks 200
+    python benchmarks/cratedb_layout.py --address localhost:4200
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import threading
+
+from aiohttp import web
+
+
+class Server:
+    """
+    Simulated CrateDB, recording the size of the insert requests.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.port = None
+
+    def start(self):
+        ready = threading.Event()
+
+        async def handle_sql(request):
+            body = await request.read()
+            if json.loads(body)["stmt"].startswith("INSERT"):
+                self.requests += 1
+                self.bytes += len(body)
+            return web.json_response({"cols": [], "rows": [], "rowcount": 1, "duration": 1})
+
+        async def handle_root(request):
+            return web.json_response({"ok": True, "version": {"number": "5.6.0"}})
+
+        async def serve():
+            app = web.Application(client_max_size=1024**3)
+            app.router.add_post("/_sql", handle_sql)
+            app.router.add_get("/", handle_root)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "localhost", 0)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            await asyncio.Event().wait()
+
+        threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+        ready.wait()
+
+    def reset(self):
+        self.requests = 0
+        self.bytes = 0
+
+
+def run(address: str, typed: bool, channels: int, ticks: int, batch_size: int) -> float:
+    command = [
+        sys.executable,
+        "-c",
+        "from tsperf.cli import main; main()",
+        "write",
+        "--adapter=cratedb",
+        f"--address={address}",
+        "--schema=tsperf.schema.basic:environment.json",
+        f"--id-end={channels}",
+        f"--ingest-size={ticks}",
+        f"--batch-size={batch_size}",
+    ]
+    if typed:
+        command.append("--cratedb-typed-columns")
+    # use the rate reported by tsperf, which excludes startup and preparing the database
+    process = subprocess.run(command, check=True, capture_output=True, text=True)  # noqa: S603
+    return float(re.search(r"Records per second: ([\d.]+)", process.stderr).group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", type=str, default=None)
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = None
+    address = args.address
+    if address is None:
+        server = Server()
+        server.start()
+        address = f"localhost:{server.port}"
+
+    rows = args.channels * args.ticks
+    print(f"channels: {args.channels}, ticks: {args.ticks}, batch size: {args.batch_size}")
+    for typed in [False, True]:
+        layout = "typed columns" if typed else "object"
+        if server is not None:
+            server.reset()
+        rps = run(address, typed, args.channels, args.ticks, args.batch_size)
+        line = f"layout: {layout:13}: {rps:12,.0f} rows/s"
+        if server is not None and server.requests:
+            line += f", {server.bytes / server.requests:12,.0f} bytes/request, {server.bytes / rows:6.1f} bytes/row"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare the throughput of the scalar `FloatSimulator` with the vectorized
+`FloatSimulatorArray`, in values per second.
+
+Usage::
+
+    python benchmarks/float_simulator.py --channels 10000 --ticks 100
+"""
+
+import argparse
+import time
+
+from tsperf.util.float_simulator import FloatSimulator, FloatSimulatorArray
+
+# mean, minimum, maximum, stdev, variance, error_rate, error_length
+SCHEMA = (6.4, 6.0, 7.4, 0.2, 0.03, 0.005, 1.08)
+
+
+def bench_scalar(channels: int, ticks: int) -> float:
+    simulators = [FloatSimulator(*SCHEMA) for _ in range(channels)]
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for simulator in simulators:
+            simulator.calculate_next_value()
+    return channels * ticks / (time.perf_counter() - start)
+
+
+def bench_array(channels: int, ticks: int) -> float:
+    simulator = FloatSimulatorArray(channels, *SCHEMA)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        simulator.next_values()
+    return channels * ticks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+
+    scalar = bench_scalar(args.channels, args.ticks)
+    array = bench_array(args.channels, args.ticks)
+    print(f"channels: {args.channels}, ticks: {args.ticks}")
+    print(f"FloatSimulator     : {scalar:14,.0f} values/s")
+    print(f"FloatSimulatorArray: {array:14,.0f} values/s ({array / scalar:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
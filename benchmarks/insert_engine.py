@@ -0,0 +1,92 @@
+"""
+Compare the `threads` and `asyncio` insert engines against a simulated,
+network-bound CrateDB. A local HTTP server answers each request to `/_sql`
+after a fixed latency, so the throughput is bound by the number of requests
+in flight.
+
+Usage::
+
+    python benchmarks/insert_engine.py --latency 0.05 --concurrency 10 50 200
+"""
+
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import threading
+
+from aiohttp import web
+
+
+def start_server(latency: float) -> int:
+    """
+    Start the simulated CrateDB server in a background thread, and return its port.
+    """
+    ready = threading.Event()
+    port = []
+
+    async def handle_sql(request):
+        await request.read()
+        await asyncio.sleep(latency)
+        return web.json_response({"cols": [], "rows": [], "rowcount": 1, "duration": 1})
+
+    async def handle_root(request):
+        return web.json_response({"ok": True, "version": {"number": "5.6.0"}})
+
+    async def serve():
+        app = web.Application(client_max_size=1024**3)
+        app.router.add_post("/_sql", handle_sql)
+        app.router.add_get("/", handle_root)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        port.append(site._server.sockets[0].getsockname()[1])
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+def run(port: int, engine: str, concurrency: int, channels: int, ticks: int, batch_size: int) -> float:
+    command = [
+        sys.executable,
+        "-c",
+        "from tsperf.cli import main; main()",
+        "write",
+        "--adapter=cratedb",
+        f"--address=localhost:{port}",
+        "--schema=tsperf.schema.basic:environment.json",
+        f"--insert-engine={engine}",
+        f"--concurrency={concurrency}",
+        f"--id-end={channels}",
+        f"--ingest-size={ticks}",
+        f"--batch-size={batch_size}",
+    ]
+    # use the rate reported by tsperf, which excludes startup and preparing the database
+    process = subprocess.run(command, check=True, capture_output=True, text=True)  # noqa: S603
+    return float(re.search(r"Records per second: ([\d.]+)", process.stderr).group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    port = start_server(args.latency)
+    print(f"latency: {args.latency}s, channels: {args.channels}, ticks: {args.ticks}, batch size: {args.batch_size}")
+    for concurrency in args.concurrency:
+        for engine in ["threads", "asyncio"]:
+            rps = run(port, engine, concurrency, args.channels, args.ticks, args.batch_size)
+            print(f"concurrency: {concurrency:4}, engine: {engine:8}: {rps:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
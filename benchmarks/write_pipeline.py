@@ -0,0 +1,56 @@
+"""
+Measure the throughput of the write pipeline, from value generation to the
+database writer threads, using the `dummy` adapter. Besides wall-clock rows per
+second, the CPU time consumed by the process is reported, which exposes threads
+burning cycles while waiting.
+
+Each run uses a fresh process, because the write pipeline keeps its state in
+module globals.
+
+Usage::
+
+    python benchmarks/write_pipeline.py --channels 500 --ticks 2000 --concurrency 2
+"""
+
+import argparse
+import logging
+import resource
+import time
+
+from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.write import core
+from tsperf.write.config import DataGeneratorConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    config = DataGeneratorConfig(
+        adapter=DatabaseInterfaceType.Dummy,
+        schema="tsperf.schema.basic:environment.json",
+        id_end=args.channels,
+        ingest_size=args.ticks,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+    )
+    rows = args.channels * args.ticks
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    core.start(config)
+    duration = time.perf_counter() - start
+    cpu = sum(resource.getrusage(resource.RUSAGE_SELF)[:2]) - sum(usage[:2])
+
+    print(f"channels: {args.channels}, ticks: {args.ticks}, concurrency: {args.concurrency}")
+    print(f"rows/s     : {rows / duration:12,.0f}")
+    print(f"CPU seconds: {cpu:12.2f} ({cpu / duration:.2f} cores)")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,12 @@ requires = [
     "cloup<4",
 ]
 
+asyncio_requires = [
+    "aiohttp<4",
+    "asyncpg<0.30",
+    "influxdb-client[async]<2",
+]
+
 develop_requires = [
     "mypy<1.12",
     "poethepoet<0.28",
@@ -48,6 +54,8 @@ release_requires = [
 ]
 
 test_requires = [
+    "aiohttp<4",
+    "asyncpg<0.30",
     "dotmap<1.4",
     "pytest<9",
     "pytest-cov<6",
@@ -97,6 +105,7 @@ setuptools.setup(
     },
     install_requires=requires,
     extras_require={
+        "asyncio": asyncio_requires,
         "develop": develop_requires,
         "docs": docs_requires,
         "release": release_requires,
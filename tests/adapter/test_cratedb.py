@@ -1,3 +1,4 @@
+import asyncio
 from unittest import mock
 
 import pytest
@@ -7,6 +8,7 @@ from tests.write.schema import test_schema1, test_schema2
 from tsperf.adapter.cratedb import CrateDbAdapter
 from tsperf.model.configuration import DatabaseConnectionConfiguration
 from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.write.model.batch import ColumnarBatch
 
 
 @pytest.fixture
@@ -184,6 +186,86 @@ def test_insert_stmt(mock_connect, config):
     )
 
 
+@mock.patch.object(client, "connect", autospec=True)
+def test_prepare_database_typed_columns(mock_connect, config):
+    """
+    This function tests if the .prepare_database() function creates one typed column per tag and field
+
+    Test Case 1:
+    A new CrateDbAdapter is initialized with typed columns
+    -> tags are INTEGER or TEXT columns
+    -> fields use the types of the schema, spelled the CrateDB way, floats with double precision
+    -> no payload column is created
+    """
+    # Pre Condition:
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+
+    config.cratedb_typed_columns = True
+    db_writer = CrateDbAdapter(config=config, schema=test_schema1)
+
+    db_writer.prepare_database()
+    # Test Case 1:
+    stmt = cursor.execute.call_args.args[0]
+    assert '"plant" INTEGER' in stmt
+    assert '"sensor_id" INTEGER' in stmt
+    assert '"value" DOUBLE PRECISION' in stmt
+    assert '"button_press" BOOLEAN' in stmt
+    assert "payload" not in stmt
+    assert "g_ts_week" in stmt
+
+
+@mock.patch.object(client, "connect", autospec=True)
+def test_insert_stmt_typed_columns(mock_connect, config):
+    """
+    This function tests if the .insert_stmt() function sends one array per column with typed columns
+
+    Test Case 1:
+    calling CrateDbAdapter.insert_stmt() with two rows
+    -> stmt lists all columns, and unnests one array per column
+    -> values are the timestamps and the transposed rows
+
+    Test Case 2:
+    calling CrateDbAdapter.insert_columnar() with the same rows
+    -> the columns of the batch are used as they are
+    """
+    # Pre Condition:
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+
+    config.cratedb_typed_columns = True
+    db_writer = CrateDbAdapter(config=config, schema=test_schema1)
+
+    # Test Case 1:
+    db_writer.insert_stmt(
+        [1586327807000, 1586327808000],
+        [
+            {"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7, "button_press": False},
+            {"plant": 1, "line": 2, "sensor_id": 2, "value": 6.8, "button_press": True},
+        ],
+    )
+    stmt, values = cursor.execute.call_args.args
+    assert stmt == (
+        'INSERT INTO temperature (ts, "plant", "line", "sensor_id", "value", "button_press") '
+        "(SELECT * FROM UNNEST(?,?,?,?,?,?))"
+    )
+    expected = ([1586327807000, 1586327808000], [1, 1], [1, 2], [1, 2], [6.7, 6.8], [False, True])
+    assert values == expected
+
+    # Test Case 2:
+    db_writer.insert_columnar(
+        [1586327807000, 1586327808000],
+        ColumnarBatch(
+            {"plant": [1, 1], "line": [1, 2], "sensor_id": [1, 2], "value": [6.7, 6.8], "button_press": [False, True]}
+        ),
+    )
+    assert cursor.execute.call_args.args == (stmt, expected)
+
+
 @mock.patch.object(client, "connect", autospec=True)
 def test_execute_query(mock_connect, config):
     """
@@ -198,6 +280,10 @@ def test_execute_query(mock_connect, config):
     -> cursor.execute is called with argument from execute_query
     -> fetchall is called
 
+    Test Case 2:
+    when calling CrateDbAdapter.execute_query() with parameters
+    -> cursor.execute is called with the parameters
+
     :param mock_connect: mocked function call from crate.client.connect()
     """
     # Pre Condition:
@@ -205,6 +291,7 @@ def test_execute_query(mock_connect, config):
     cursor = mock.Mock()
     mock_connect.return_value = conn
     conn.cursor.return_value = cursor
+    cursor.fetchall.return_value = [(1, "abc"), (2, "def")]
 
     db_writer = CrateDbAdapter(config=config, schema=test_schema1)
 
@@ -212,3 +299,94 @@ def test_execute_query(mock_connect, config):
     db_writer.execute_query("SELECT * FROM temperature;")
     cursor.execute.assert_called_with("SELECT * FROM temperature;")
     cursor.fetchall.assert_called()
+    assert db_writer.profile.rows == 2
+    assert db_writer.profile.bytes == 22
+
+    # Test Case 2:
+    assert db_writer.paramstyle == "qmark"
+    db_writer.execute_query("SELECT * FROM temperature WHERE plant = ?;", [1])
+    cursor.execute.assert_called_with("SELECT * FROM temperature WHERE plant = ?;", [1])
+
+
+def test_async_insert_stmt(config):
+    """
+    This function tests if the .insert_stmt() function of CrateDbAsyncAdapter submits the statement
+    to the HTTP endpoint of CrateDB
+
+    Pre Condition: a local HTTP server records the requests to /_sql
+        CrateDbAsyncAdapter is connected to this server.
+
+    Test Case 1:
+    calling CrateDbAsyncAdapter.insert_stmt()
+    -> one request with the INSERT statement and timestamps and batch as arguments is received
+    """
+    web = pytest.importorskip("aiohttp.web")
+    from tsperf.adapter.cratedb import CrateDbAsyncAdapter
+
+    requests = []
+
+    async def handle_sql(request):
+        requests.append(await request.json())
+        return web.json_response({"cols": [], "rows": [], "rowcount": 1})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/_sql", handle_sql)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            config.address = f"localhost:{port}"
+            db_writer = CrateDbAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+            await db_writer.insert_stmt([1586327807000], [{"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7}])
+            await db_writer.close_connection()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert len(requests) == 1
+    assert requests[0]["stmt"].startswith("INSERT INTO temperature (ts, payload)")
+    assert requests[0]["args"] == [[1586327807000], [{"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7}]]
+
+
+def test_async_insert_stmt_typed_columns(config):
+    """
+    This function tests if the .insert_stmt() function of CrateDbAsyncAdapter sends one array per column
+    with typed columns
+    """
+    web = pytest.importorskip("aiohttp.web")
+    from tsperf.adapter.cratedb import CrateDbAsyncAdapter
+
+    requests = []
+
+    async def handle_sql(request):
+        requests.append(await request.json())
+        return web.json_response({"cols": [], "rows": [], "rowcount": 1})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/_sql", handle_sql)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            config.address = f"localhost:{port}"
+            config.cratedb_typed_columns = True
+            db_writer = CrateDbAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+            await db_writer.insert_stmt(
+                [1586327807000], [{"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7, "button_press": False}]
+            )
+            await db_writer.close_connection()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert len(requests) == 1
+    assert "UNNEST(?,?,?,?,?,?)" in requests[0]["stmt"]
+    assert requests[0]["args"] == [[1586327807000], [1], [1], [1], [6.7], [False]]
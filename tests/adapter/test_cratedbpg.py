@@ -220,6 +220,7 @@ def test_execute_query(mock_connect, config):
     cursor = mock.Mock()
     mock_connect.return_value = conn
     conn.cursor.return_value = cursor
+    cursor.fetchall.return_value = [(1, "abc"), (2, "def")]
 
     db_writer = CrateDbPgWireAdapter(config=config, schema=test_schema1)
 
@@ -227,3 +228,5 @@ def test_execute_query(mock_connect, config):
     db_writer.execute_query("SELECT * FROM temperature;")
     cursor.execute.assert_called_with("SELECT * FROM temperature;")
     cursor.fetchall.assert_called()
+    assert db_writer.profile.rows == 2
+    assert db_writer.profile.bytes == 22
@@ -1,14 +1,16 @@
+import asyncio
 from unittest import mock
 
 import pytest
 from dotmap import DotMap
-from influxdb_client import Bucket
+from influxdb_client import Bucket, WritePrecision
 from influxdb_client.client.write_api import Point
 
 from tests.write.schema import test_schema1
 from tsperf.adapter.influxdb import InfluxDbAdapter
 from tsperf.model.configuration import DatabaseConnectionConfiguration
 from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.write.model.batch import ColumnarBatch
 
 
 @pytest.fixture
@@ -153,6 +155,49 @@ def test_insert_stmt(mock_client, config):
     assert isinstance(data[0], Point)
 
 
+@mock.patch("tsperf.adapter.influxdb.InfluxDBClient", autospec=True)
+def test_insert_columnar(mock_client, config):
+    """
+    This function tests if the .insert_columnar() function of InfluxDbAdapter serializes the batch to line protocol
+
+    Pre Condition: InfluxDBClient() returns a Mock Object client
+        client.write_api() returns a Mock Object write_api
+        InfluxDbAdapter is called.
+
+    Test Case 1:
+    calling InfluxDbAdapter.insert_columnar() with two timestamps and a batch of two rows
+    -> data is a list of two lines in line protocol
+    -> write precision is milliseconds
+
+    :param mock_client: mocked InfluxDBClient class
+    """
+    # Pre Condition:
+    client = mock.Mock()
+    write_api = mock.Mock()
+    mock_client.return_value = client
+    client.write_api.return_value = write_api
+    db_writer = InfluxDbAdapter(config=config, schema=test_schema1)
+    # Test Case 1:
+    db_writer.insert_columnar(
+        [1586327807000, 1586327807000],
+        ColumnarBatch(
+            {
+                "plant": [2, 3],
+                "line": [2, 3],
+                "sensor_id": [2, 3],
+                "value": [6.7, 6.8],
+                "button_press": [False, True],
+            }
+        ),
+    )
+    call_arguments = write_api.write.call_args[1]
+    assert call_arguments["write_precision"] == WritePrecision.MS
+    assert call_arguments["record"] == [
+        "temperature,plant=2,line=2,sensor_id=2 value=6.7,button_press=false 1586327807000",
+        "temperature,plant=3,line=3,sensor_id=3 value=6.8,button_press=true 1586327807000",
+    ]
+
+
 @mock.patch("tsperf.adapter.influxdb.InfluxDBClient", autospec=True)
 def test_execute_query(mock_client, config):
     """
@@ -172,6 +217,57 @@ def test_execute_query(mock_client, config):
     query_api = mock.Mock()
     mock_client.return_value = client
     client.query_api.return_value = query_api
+    query_api.query.return_value = [
+        mock.Mock(records=[mock.Mock(values={"_value": 1.5}), mock.Mock(values={"_value": 2.5})])
+    ]
     db_writer = InfluxDbAdapter(config=config, schema=test_schema1)
     db_writer.execute_query("SELECT * FROM temperature;")
     query_api.query.assert_called_with("SELECT * FROM temperature;", org="acme")
+    assert db_writer.profile.rows == 2
+    assert db_writer.profile.bytes == 28
+
+    assert db_writer.paramstyle == "flux"
+    db_writer.execute_query("from(bucket: params.bucket)", {"bucket": "temperature"})
+    query_api.query.assert_called_with("from(bucket: params.bucket)", org="acme", params={"bucket": "temperature"})
+
+
+def test_async_insert_columnar(config):
+    """
+    This function tests if the .insert_columnar() function of InfluxDbAsyncAdapter writes line protocol
+
+    Pre Condition: InfluxDBClientAsync() returns a Mock Object client
+        InfluxDbAsyncAdapter is connected.
+
+    Test Case 1:
+    calling InfluxDbAsyncAdapter.insert_columnar() with a batch of one row
+    -> write_api.write() is awaited with a list of one line in line protocol
+    """
+    pytest.importorskip("aiohttp")
+    from tsperf.adapter.influxdb import InfluxDbAsyncAdapter
+
+    client = mock.Mock()
+    client.close = mock.AsyncMock()
+    write_api = mock.Mock()
+    write_api.write = mock.AsyncMock()
+    client.write_api.return_value = write_api
+
+    async def run():
+        with mock.patch(
+            "influxdb_client.client.influxdb_client_async.InfluxDBClientAsync", return_value=client
+        ) as mock_client:
+            db_writer = InfluxDbAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+            mock_client.assert_called_once_with(url="http://localhost:8086/", token="token", org="acme")
+        await db_writer.insert_columnar(
+            [1586327807000],
+            ColumnarBatch({"plant": [2], "line": [2], "sensor_id": [2], "value": [6.7], "button_press": [False]}),
+        )
+        await db_writer.close_connection()
+
+    asyncio.run(run())
+    call_arguments = write_api.write.await_args.kwargs
+    assert call_arguments["write_precision"] == WritePrecision.MS
+    assert call_arguments["record"] == [
+        "temperature,plant=2,line=2,sensor_id=2 value=6.7,button_press=false 1586327807000"
+    ]
+    client.close.assert_awaited_once()
@@ -111,3 +111,9 @@ def test_execute_query(mock_client, config):
     args = client.mock_calls[2].args
     assert len(args) == 1
     assert args[0] == {"plant": 1}
+
+    # Test Case 2:
+    db_writer.collection.find.return_value.limit.return_value = iter([{"plant": 1}, {"plant": 2}])
+    assert db_writer.execute_query({}) == [{"plant": 1}, {"plant": 2}]
+    assert db_writer.profile.rows == 2
+    assert db_writer.profile.bytes == 26
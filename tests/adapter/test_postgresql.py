@@ -1,12 +1,18 @@
+import asyncio
+import datetime
 from unittest import mock
 
 import psycopg2.extras
 import pytest
+from datetime_truncate import truncate
 
+from tests.util.test_pgbinary import decode
 from tests.write.schema import test_schema1, test_schema3
+from tsperf.adapter import PreparedStatementCache, TimestampCache
 from tsperf.adapter.postgresql import PostgreSQLAdapter
 from tsperf.model.configuration import DatabaseConnectionConfiguration
 from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.write.model.batch import ColumnarBatch
 
 
 @pytest.fixture
@@ -218,6 +224,165 @@ def test_insert_stmt(mock_connect, config):
     conn.commit.assert_called()
 
 
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_insert_stmt_tag_fragments(mock_connect, config):
+    """
+    This function tests if the .insert_stmt() function reuses the serialized tag literals of a channel
+
+    Pre Condition: psycopg2.client.connect() returns a Mock Object conn which returns a Mock Object
+        cursor when its .cursor() function is called.
+        PostgreSQLAdapter is called.
+
+    Test Case 1: calling PostgreSQLAdapter.insert_stmt() with two rows of the same channel
+    -> statement contains both rows
+    -> tag literals are serialized once
+    """
+    # Pre Condition:
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+
+    db_writer = PostgreSQLAdapter(config=config, schema=test_schema1)
+
+    # Test Case 1:
+    db_writer.insert_stmt(
+        [1586327807000, 1586327808000],
+        [
+            {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False},
+            {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.8, "button_press": True},
+        ],
+    )
+    stmt = cursor.execute.call_args.args[0]
+    assert stmt.count("'1','2','3','6.") == 2
+    assert "'6.8','True')" in stmt
+    assert list(db_writer.tag_fragments.keys()) == [(1, 2, 3)]
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_insert_stmt_copy(mock_connect, config):
+    """
+    This function tests if the .insert_stmt() and .insert_columnar() functions stream the
+    batch with binary COPY, when enabled
+
+    Test Case 1: calling PostgreSQLAdapter.insert_stmt()
+    -> cursor.copy_expert() is called with the COPY statement and the encoded rows
+    -> conn.commit() function has been called
+
+    Test Case 2: calling PostgreSQLAdapter.insert_columnar()
+    -> the rows are encoded the same way
+    """
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+    config.postgresql_copy = True
+    rows = [
+        {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False},
+        {"plant": 1, "line": 2, "sensor_id": 4, "value": 6.8, "button_press": True},
+    ]
+
+    db_writer = PostgreSQLAdapter(config=config, schema=test_schema1)
+
+    # Test Case 1:
+    db_writer.insert_stmt([1586327807000, 1586327808000], rows)
+    stmt, data = cursor.copy_expert.call_args.args
+    assert stmt == (
+        "COPY temperature (ts, ts_week, value, button_press, plant, line, sensor_id) FROM STDIN (FORMAT binary)"
+    )
+    records = decode(data.getvalue(), ["timestamp", "timestamp", "d", "?", "i", "i", "i"])
+    assert [record[2:] for record in records] == [[6.7, False, 1, 2, 3], [6.8, True, 1, 2, 4]]
+    assert records[1][0] - records[0][0] == datetime.timedelta(seconds=1)
+    assert records[0][1].weekday() == 0
+    conn.commit.assert_called()
+    cursor.execute.assert_not_called()
+
+    # Test Case 2:
+    db_writer.insert_columnar(
+        [1586327807000, 1586327808000], ColumnarBatch({key: [row[key] for row in rows] for key in rows[0]})
+    )
+    assert cursor.copy_expert.call_args.args[1].getvalue() == data.getvalue()
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_insert_stmt_prepared(mock_connect, config):
+    """
+    This function tests if the .insert_stmt() function uses prepared multi-row INSERT
+    statements, when enabled
+
+    Test Case 1: calling PostgreSQLAdapter.insert_stmt() with a batch of the announced batch size
+    -> the INSERT statement for 2 rows is prepared once, and executed with the values bound as parameters
+
+    Test Case 2: calling PostgreSQLAdapter.insert_stmt() with a smaller batch
+    -> a statement for 1 row is prepared for the tail
+
+    Test Case 3: more statements than the capacity of the cache
+    -> the least recently used statement is deallocated
+    """
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+    config.postgresql_prepared = True
+    row = {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False}
+
+    db_writer = PostgreSQLAdapter(config=config, schema=test_schema1)
+    db_writer.set_batch_size(2)
+
+    # Test Case 1:
+    db_writer.insert_stmt([1586327807000, 1586327808000], [row, row])
+    db_writer.insert_stmt([1586327807000, 1586327808000], [row, row])
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[0] == (
+        "PREPARE tsperf_insert_2 AS INSERT INTO temperature "
+        "(ts, ts_week, plant, line, sensor_id, value, button_press) VALUES "
+        "($1, $2, $3, $4, $5, $6, $7), ($8, $9, $10, $11, $12, $13, $14)"
+    )
+    assert statements[1:] == ["EXECUTE tsperf_insert_2 (" + ", ".join(["%s"] * 14) + ")"] * 2
+    parameters = cursor.execute.call_args.args[1]
+    assert parameters[0] == datetime.datetime.fromtimestamp(1586327807)
+    assert parameters[2:7] == [1, 2, 3, 6.7, False]
+    assert conn.commit.call_count == 2
+
+    # Test Case 2:
+    cursor.reset_mock()
+    db_writer.insert_stmt([1586327807000], [row])
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[0].startswith("PREPARE tsperf_insert_1 AS INSERT")
+    assert statements[1] == "EXECUTE tsperf_insert_1 (" + ", ".join(["%s"] * 7) + ")"
+
+    # Test Case 3:
+    cursor.reset_mock()
+    db_writer.prepared_statements.capacity = 2
+    db_writer.set_batch_size(4)
+    db_writer.insert_stmt([1586327807000] * 4, [row] * 4)
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[0].startswith("PREPARE tsperf_insert_4 AS INSERT")
+    assert statements[1] == "DEALLOCATE tsperf_insert_2"
+    assert list(db_writer.prepared_statements) == [1, 4]
+
+
+@pytest.mark.parametrize(
+    "batch_size,rows,widths",
+    [
+        (0, 5, [5]),
+        (1000, 1000, [1000]),
+        (1000, 2000, [1000, 1000]),
+        (1000, 999, [512, 256, 128, 64, 32, 4, 2, 1]),
+        (20000, 20000, [9362, 9362, 1024, 128, 64, 32, 16, 8, 4]),
+    ],
+)
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_get_insert_widths(mock_connect, config, batch_size, rows, widths):
+    """
+    Batches are split into statements of the announced batch size, at most 65535 parameters,
+    and powers of two for the rest.
+    """
+    db_writer = PostgreSQLAdapter(config=config, schema=test_schema1)
+    db_writer.set_batch_size(batch_size)
+    assert db_writer._get_insert_widths(rows) == widths
+
+
 @mock.patch.object(psycopg2, "connect", autospec=True)
 def test_execute_query(mock_connect, config):
     """
@@ -238,9 +403,187 @@ def test_execute_query(mock_connect, config):
     cursor = mock.Mock()
     mock_connect.return_value = conn
     conn.cursor.return_value = cursor
+    cursor.fetchall.return_value = [(1, "abc"), (2, "def")]
 
     db_writer = PostgreSQLAdapter(config=config, schema=test_schema1)
 
     db_writer.execute_query("SELECT * FROM temperature;")
     cursor.execute.assert_called_with("SELECT * FROM temperature;")
     cursor.fetchall.assert_called()
+    assert db_writer.profile.rows == 2
+    assert db_writer.profile.bytes == 22
+
+    assert db_writer.paramstyle == "pyformat"
+    db_writer.execute_query("SELECT * FROM temperature WHERE plant = %(plant)s;", {"plant": 1})
+    cursor.execute.assert_called_with("SELECT * FROM temperature WHERE plant = %(plant)s;", {"plant": 1})
+
+
+def test_async_insert_stmt(config):
+    """
+    This function tests if the .insert_stmt() function of PostgreSQLAsyncAdapter executes the INSERT statement
+
+    Pre Condition: asyncpg.connect() returns a Mock Object conn
+        PostgreSQLAsyncAdapter is connected.
+
+    Test Case 1: calling PostgreSQLAsyncAdapter.insert_stmt()
+    -> conn.execute() is awaited with the INSERT statement
+    -> conn.close() is awaited when closing the connection
+    """
+    asyncpg = pytest.importorskip("asyncpg")
+    from tsperf.adapter.postgresql import PostgreSQLAsyncAdapter
+
+    conn = mock.AsyncMock()
+
+    async def run():
+        with mock.patch.object(asyncpg, "connect", new=mock.AsyncMock(return_value=conn)):
+            db_writer = PostgreSQLAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+        await db_writer.insert_stmt(
+            [1586327807000],
+            [{"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False}],
+        )
+        await db_writer.close_connection()
+
+    asyncio.run(run())
+    stmt = conn.execute.await_args.args[0]
+    assert stmt.startswith("INSERT INTO temperature (ts, ts_week,")
+    assert "'1','2','3','6.7','False')" in stmt
+    conn.close.assert_awaited_once()
+
+
+def test_async_insert_stmt_prepared(config):
+    """
+    This function tests if the .insert_stmt() function of PostgreSQLAsyncAdapter binds the
+    values as parameters of prepared multi-row INSERT statements, when enabled
+
+    Test Case 1: calling PostgreSQLAsyncAdapter.insert_stmt() with batches of 3, 3 and 2 rows
+    -> conn.prepare() is awaited once per statement width, i.e. for 2 and 1 rows
+    -> the prepared statements are executed with the values as arguments
+    """
+    asyncpg = pytest.importorskip("asyncpg")
+    from tsperf.adapter.postgresql import PostgreSQLAsyncAdapter
+
+    statements = {}
+
+    async def prepare(sql):
+        statement = statements[sql.count("(") - 1] = mock.Mock()
+        statement.fetch = mock.AsyncMock()
+        return statement
+
+    conn = mock.AsyncMock()
+    conn.prepare.side_effect = prepare
+    config.postgresql_prepared = True
+    row = {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False}
+
+    async def run():
+        with mock.patch.object(asyncpg, "connect", new=mock.AsyncMock(return_value=conn)):
+            db_writer = PostgreSQLAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+        db_writer.set_batch_size(4)
+        for rows in [3, 3, 2]:
+            await db_writer.insert_stmt([1586327807000] * rows, [row] * rows)
+
+    asyncio.run(run())
+    assert conn.prepare.await_count == 2
+    sql = conn.prepare.await_args_list[0].args[0]
+    assert sql.startswith(
+        "INSERT INTO temperature (ts, ts_week, plant, line, sensor_id, value, button_press) VALUES ($1"
+    )
+    assert sorted(statements) == [1, 2]
+    assert statements[2].fetch.await_count == 3
+    assert statements[1].fetch.await_count == 2
+    arguments = statements[1].fetch.await_args.args
+    assert list(arguments[2:]) == [1, 2, 3, 6.7, False]
+    conn.execute.assert_not_awaited()
+
+
+def test_async_insert_stmt_copy(config):
+    """
+    This function tests if the .insert_stmt() function of PostgreSQLAsyncAdapter streams the
+    batch with binary COPY, when enabled
+
+    Test Case 1: calling PostgreSQLAsyncAdapter.insert_stmt()
+    -> conn.copy_to_table() is awaited with the encoded rows
+    """
+    asyncpg = pytest.importorskip("asyncpg")
+    from tsperf.adapter.postgresql import PostgreSQLAsyncAdapter
+
+    conn = mock.AsyncMock()
+    config.postgresql_copy = True
+
+    async def run():
+        with mock.patch.object(asyncpg, "connect", new=mock.AsyncMock(return_value=conn)):
+            db_writer = PostgreSQLAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+        await db_writer.insert_stmt(
+            [1586327807000],
+            [{"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False}],
+        )
+
+    asyncio.run(run())
+    conn.execute.assert_not_awaited()
+    kwargs = conn.copy_to_table.await_args.kwargs
+    assert conn.copy_to_table.await_args.args == ("temperature",)
+    assert kwargs["format"] == "binary"
+    assert kwargs["columns"] == ["ts", "ts_week", "value", "button_press", "plant", "line", "sensor_id"]
+    records = decode(kwargs["source"].getvalue(), ["timestamp", "timestamp", "d", "?", "i", "i", "i"])
+    assert records[0][2:] == [6.7, False, 1, 2, 3]
+
+
+def test_prepared_statement_cache():
+    prepare = mock.Mock(side_effect=lambda rows: f"statement-{rows}")
+    deallocate = mock.Mock()
+    cache = PreparedStatementCache(prepare, deallocate, capacity=2)
+
+    assert cache[1] == "statement-1"
+    assert cache[2] == "statement-2"
+    assert cache[1] == "statement-1"
+    assert cache[3] == "statement-3"
+    assert prepare.call_count == 3
+    deallocate.assert_called_once_with(2)
+    assert list(cache) == [1, 3]
+
+
+def test_timestamp_cache():
+    convert = mock.Mock(side_effect=lambda timestamp: timestamp // 1000)
+    cache = TimestampCache(convert, capacity=2)
+
+    assert cache[1000] == 1
+    assert cache[1000] == 1
+    assert cache[2000] == 2
+    assert convert.call_count == 2
+    assert cache[3000] == 3
+    assert list(cache) == [3000]
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_insert_stmt_timestamp_literals(mock_connect, config):
+    """
+    This function tests if the .insert_stmt() function renders the literals of a timestamp once
+
+    Test Case 1: calling PostgreSQLAdapter.insert_stmt() with two rows of the same tick
+    -> statement contains the timestamp and its truncation to the partition for both rows
+    -> the timestamp is converted once
+    """
+    # Pre Condition:
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+
+    db_writer = PostgreSQLAdapter(config=config, schema=test_schema1)
+
+    # Test Case 1:
+    with mock.patch.object(db_writer.timestamps, "convert", wraps=db_writer.timestamps.convert) as convert:
+        db_writer.insert_stmt(
+            [1586327807000, 1586327807000],
+            [
+                {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False},
+                {"plant": 1, "line": 2, "sensor_id": 4, "value": 6.8, "button_press": True},
+            ],
+        )
+    stmt = cursor.execute.call_args.args[0]
+    t = datetime.datetime.fromtimestamp(1586327807)
+    assert stmt.count(f"('{t}', '{truncate(t, 'week')}', '1','2',") == 2
+    assert convert.call_count == 1
+    assert list(db_writer.timestamp_literals) == [1586327807000]
@@ -1,4 +1,5 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
 from unittest import mock
 
 import psycopg2.extras
@@ -9,6 +10,7 @@ from tests.write.schema import test_schema1, test_schema2, test_schema3
 from tsperf.adapter.timescaledb import TimescaleDbAdapter
 from tsperf.model.configuration import DatabaseConnectionConfiguration
 from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.write.model.batch import ColumnarBatch
 
 
 @pytest.fixture
@@ -249,6 +251,37 @@ def test_insert_vanilla(mock_connect, config):
     conn.commit.assert_called()
 
 
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_insert_prepared(mock_connect, config):
+    """
+    This function tests if the .insert_stmt() function uses a prepared multi-row INSERT
+    statement, when enabled
+
+    Test Case 1: calling TimescaleDbAdapter.insert_stmt()
+    -> the statement is prepared once, and executed for each batch
+    -> conn.commit() function has been called
+    """
+    conn = mock.Mock()
+    cursor = mock.Mock()
+    mock_connect.return_value = conn
+    conn.cursor.return_value = cursor
+    config.timescaledb_pgcopy = False
+    config.postgresql_prepared = True
+    row = {"plant": 1, "line": 2, "sensor_id": 3, "value": 6.7, "button_press": False}
+
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+    db_writer.set_batch_size(1)
+    db_writer.insert_stmt([1586327807000], [row])
+    db_writer.insert_stmt([1586327808000], [row])
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[0].startswith("PREPARE tsperf_insert_1 AS INSERT INTO temperature (ts, ts_week, plant,")
+    assert statements[1:] == ["EXECUTE tsperf_insert_1 (" + ", ".join(["%s"] * 7) + ")"] * 2
+    t = datetime.fromtimestamp(1586327808)
+    assert cursor.execute.call_args.args[1] == [t, truncate(t, "week"), 1, 2, 3, 6.7, False]
+    assert conn.commit.call_count == 2
+
+
 @mock.patch.object(psycopg2, "connect", autospec=True)
 @mock.patch("tsperf.adapter.timescaledb.CopyManager", autospec=True)
 def test_insert_pgcopy(mock_copy_manager, mock_connect, config):
@@ -306,6 +339,225 @@ def test_insert_pgcopy(mock_copy_manager, mock_connect, config):
     conn.commit.assert_called()
 
 
+@mock.patch.object(psycopg2, "connect", autospec=True)
+@mock.patch("tsperf.adapter.timescaledb.CopyManager", autospec=True)
+def test_insert_stmt_pgcopy_timestamps(mock_copy_manager, mock_connect, config):
+    """
+    This function tests if the timestamps of a batch are converted once per distinct timestamp
+
+    Pre Condition: psycopg2.client.connect() returns a Mock Object conn which returns a Mock Object
+        cursor when its .cursor() function is called.
+        TimescaleDbAdapter is called with copy=True.
+
+    Test Case 1: calling TimescaleDbAdapter.insert_stmt() with two ticks of two rows each
+    -> copy_manager.copy() receives the same timestamps and partitions as converting each row
+    -> each distinct timestamp is converted once
+
+    :param mock_connect: mocked function call from psycopg2.client.connect()
+    """
+    # Pre Condition:
+    conn = mock.MagicMock()
+    mock_connect.return_value = conn
+
+    config.timescaledb_pgcopy = True
+    config.partition = "day"
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+    copy_manager = mock.MagicMock()
+    mock_copy_manager.return_value = copy_manager
+
+    # Test Case 1:
+    timestamps = [1586327807000, 1586327807000, 1586414207000, 1586414207000]
+    row = {"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7, "button_press": False}
+    with mock.patch.object(db_writer.timestamps, "convert", wraps=db_writer.timestamps.convert) as convert:
+        db_writer.insert_stmt(timestamps, [row] * 4)
+        db_writer.insert_stmt(timestamps[2:], [row] * 2)
+
+    rows = copy_manager.copy.call_args_list[0].args[0]
+    for timestamp, record in zip(timestamps, rows):
+        t = datetime.fromtimestamp(timestamp / 1000)
+        assert record[:2] == [t, truncate(t, "day")]
+    assert convert.call_count == 2
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+@mock.patch("tsperf.adapter.timescaledb.CopyManager", autospec=True)
+def test_insert_columnar_pgcopy(mock_copy_manager, mock_connect, config):
+    """
+    This function tests if the copy_manager is called with rows built from the columns of a ColumnarBatch
+
+    Pre Condition: psycopg2.client.connect() returns a Mock Object conn which returns a Mock Object
+        cursor when its .cursor() function is called.
+        TimescaleDbAdapter is called with copy=True.
+
+    Test Case 1: calling TimescaleDbAdapter.insert_columnar()
+    -> copy_manager.copy() receives one row with timestamp, partition and all column values
+    -> conn.commit() function has been called
+
+    :param mock_connect: mocked function call from psycopg2.client.connect()
+    """
+    # Pre Condition:
+    conn = mock.MagicMock()
+    mock_connect.return_value = conn
+
+    config.timescaledb_pgcopy = True
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+
+    copy_manager = mock.MagicMock()
+    mock_copy_manager.return_value = copy_manager
+    # Test Case 1:
+    db_writer.insert_columnar(
+        [1586327807000],
+        ColumnarBatch({"plant": [1], "line": [1], "sensor_id": [1], "value": [6.7], "button_press": [False]}),
+    )
+
+    rows = list(copy_manager.copy.call_args.args[0])
+    t = datetime.fromtimestamp(1586327807)
+    assert rows == [(t, truncate(t, "week"), 1, 1, 1, 6.7, False)]
+    conn.commit.assert_called()
+
+
+def drain_threading_copy(copy_manager) -> list:
+    return sorted(record for call in copy_manager.threading_copy.call_args_list for record in call.args[0])
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+@mock.patch("tsperf.adapter.timescaledb.CopyManager", autospec=True)
+def test_insert_stmt_pgcopy_connections(mock_copy_manager, mock_connect, config):
+    """
+    This function tests if the pgcopy strategy streams the chunks of a batch over multiple connections
+
+    Pre Condition: psycopg2.client.connect() returns a Mock Object conn.
+        TimescaleDbAdapter is called with copy=True and two pgcopy connections.
+
+    Test Case 1: calling TimescaleDbAdapter.insert_stmt() with rows of two chunks
+    -> a second connection is opened
+    -> copy_manager.threading_copy() is called once per connection, and receives all rows
+    -> each connection commits its part
+
+    Test Case 2: calling TimescaleDbAdapter.close_connection()
+    -> both connections are closed
+    """
+    # Pre Condition:
+    conn = mock.MagicMock()
+    mock_connect.return_value = conn
+
+    config.timescaledb_pgcopy = True
+    config.timescaledb_pgcopy_connections = 2
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+    assert mock_connect.call_count == 2
+    copy_manager = mock.MagicMock()
+    mock_copy_manager.return_value = copy_manager
+
+    # Test Case 1:
+    week = 7 * 24 * 60 * 60 * 1000
+    timestamps = [1586327807000, 1586327807000 + week, 1586327808000, 1586327808000 + week]
+    batch = [{"plant": 1, "line": 1, "sensor_id": i, "value": float(i), "button_press": False} for i in range(4)]
+    db_writer.insert_stmt(timestamps, batch)
+
+    assert copy_manager.threading_copy.call_count == 2
+    assert [call.args[0] for call in mock_copy_manager.call_args_list] == [conn, conn]
+    records = drain_threading_copy(copy_manager)
+    expected = []
+    for timestamp, row in zip(timestamps, batch):
+        t = datetime.fromtimestamp(timestamp / 1000)
+        expected.append((t, truncate(t, "week"), *row.values()))
+    assert records == sorted(expected)
+    # one commit per part, none for the connection as a whole
+    assert conn.commit.call_count == 2
+    conn.rollback.assert_not_called()
+
+    # Test Case 2:
+    db_writer.close_connection()
+    assert conn.close.call_count == 2
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+@mock.patch("tsperf.adapter.timescaledb.CopyManager", autospec=True)
+def test_insert_columnar_pgcopy_connections(mock_copy_manager, mock_connect, config):
+    """
+    This function tests if the pgcopy strategy streams the rows of a ColumnarBatch over multiple connections
+    """
+    # Pre Condition:
+    conn = mock.MagicMock()
+    mock_connect.return_value = conn
+
+    config.timescaledb_pgcopy = True
+    config.timescaledb_pgcopy_connections = 3
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+    copy_manager = mock.MagicMock()
+    mock_copy_manager.return_value = copy_manager
+
+    # Test Case 1:
+    db_writer.insert_columnar(
+        [1586327807000, 1586327807000],
+        ColumnarBatch(
+            {"plant": [1, 1], "line": [1, 1], "sensor_id": [1, 2], "value": [6.7, 6.8], "button_press": [False, True]}
+        ),
+    )
+
+    # Only two of three connections receive a row.
+    assert copy_manager.threading_copy.call_count == 2
+    t = datetime.fromtimestamp(1586327807)
+    assert drain_threading_copy(copy_manager) == [
+        (t, truncate(t, "week"), 1, 1, 1, 6.7, False),
+        (t, truncate(t, "week"), 1, 1, 2, 6.8, True),
+    ]
+    assert conn.commit.call_count == 2
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+def test_split_chunks(mock_connect, config):
+    """
+    This function tests if the rows of a batch are ordered by chunk, and split into contiguous parts
+    """
+    mock_connect.return_value = mock.MagicMock()
+    config.timescaledb_pgcopy = True
+    config.timescaledb_pgcopy_connections = 2
+    config.timescaledb_distributed = True
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+
+    # A chunk boundary in local wall-clock time, the `ts` column stores local time.
+    boundary = datetime(1970, 1, 1) + 2000 * TimescaleDbAdapter.chunk_time_interval
+    before = boundary - timedelta(seconds=1)
+    after = boundary + timedelta(seconds=1)
+    times = [before, before, after, after, before]
+    converted = [(t, truncate(t, "week")) for t in times]
+    space = [2, 1, 1, 2, 1]
+
+    # Ordered by time bucket, then by the value of the space partitioning column.
+    assert db_writer._split_chunks(converted, space) == [[1, 4, 0], [2, 3]]
+
+
+@mock.patch.object(psycopg2, "connect", autospec=True)
+@mock.patch("tsperf.adapter.timescaledb.CopyManager", autospec=True)
+def test_insert_stmt_pgcopy_connections_failure(mock_copy_manager, mock_connect, config):
+    """
+    This function tests if a batch streamed over multiple connections fails as a whole
+
+    Test Case 1: calling TimescaleDbAdapter.insert_stmt(), where copying one of two parts fails
+    -> the error is raised
+    -> both connections are rolled back, none is committed
+    """
+    # Pre Condition:
+    conns = [mock.MagicMock(), mock.MagicMock()]
+    mock_connect.side_effect = conns
+
+    config.timescaledb_pgcopy = True
+    config.timescaledb_pgcopy_connections = 2
+    db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
+    copy_managers = {conn: mock.MagicMock() for conn in conns}
+    mock_copy_manager.side_effect = lambda conn, table, columns: copy_managers[conn]
+    copy_managers[conns[1]].threading_copy.side_effect = psycopg2.DataError("invalid input")
+
+    # Test Case 1:
+    row = {"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7, "button_press": False}
+    with pytest.raises(psycopg2.DataError):
+        db_writer.insert_stmt([1586327807000, 1586327807000], [row, row])
+    for conn in conns:
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+
 @mock.patch.object(psycopg2, "connect", autospec=True)
 def test_execute_query(mock_connect, config):
     """
@@ -326,8 +578,52 @@ def test_execute_query(mock_connect, config):
     cursor = mock.Mock()
     mock_connect.return_value = conn
     conn.cursor.return_value = cursor
+    cursor.fetchall.return_value = [(1, "abc"), (2, "def")]
 
     db_writer = TimescaleDbAdapter(config=config, schema=test_schema1)
     db_writer.execute_query("SELECT * FROM temperature;")
     cursor.execute.assert_called_with("SELECT * FROM temperature;")
     cursor.fetchall.assert_called()
+    assert db_writer.profile.rows == 2
+    assert db_writer.profile.bytes == 22
+
+
+def test_async_insert_stmt_pgcopy(config):
+    """
+    This function tests if the .insert_stmt() function of TimescaleDbAsyncAdapter uses the COPY protocol of asyncpg
+
+    Pre Condition: asyncpg.connect() returns a Mock Object conn
+        TimescaleDbAsyncAdapter is connected, with pgcopy enabled.
+
+    Test Case 1: calling TimescaleDbAsyncAdapter.insert_stmt()
+    -> conn.copy_records_to_table() is awaited with the records and columns
+
+    Test Case 2: calling TimescaleDbAsyncAdapter.insert_columnar()
+    -> conn.copy_records_to_table() is awaited with the same records
+    """
+    asyncpg = pytest.importorskip("asyncpg")
+    from tsperf.adapter.timescaledb import TimescaleDbAsyncAdapter
+
+    conn = mock.AsyncMock()
+    config.timescaledb_pgcopy = True
+    row = {"plant": 1, "line": 1, "sensor_id": 1, "value": 6.7, "button_press": False}
+    t = datetime.fromtimestamp(1586327807000 / 1000)
+    expected = [[t, truncate(t, "week"), 1, 1, 1, 6.7, False]]
+
+    async def run():
+        with mock.patch.object(asyncpg, "connect", new=mock.AsyncMock(return_value=conn)):
+            db_writer = TimescaleDbAsyncAdapter(config=config, schema=test_schema1)
+            await db_writer.connect()
+
+        # Test Case 1:
+        await db_writer.insert_stmt([1586327807000], [row])
+        kwargs = conn.copy_records_to_table.await_args.kwargs
+        assert kwargs["records"] == expected
+        assert kwargs["columns"] == ["ts", "ts_week", "plant", "line", "sensor_id", "value", "button_press"]
+
+        # Test Case 2:
+        await db_writer.insert_columnar([1586327807000], ColumnarBatch({key: [value] for key, value in row.items()}))
+        kwargs = conn.copy_records_to_table.await_args.kwargs
+        assert [list(record) for record in kwargs["records"]] == expected
+
+    asyncio.run(run())
@@ -156,6 +156,15 @@ def test_execute_query(mock_boto, config):
     assert len(args) == 1
     assert args["QueryString"] == query
 
+    # Test Case 2:
+    paginator.paginate.return_value = [
+        {"Rows": [{"Data": []}, {"Data": []}], "ResponseMetadata": {"HTTPHeaders": {"content-length": "512"}}},
+        {"Rows": [{"Data": []}], "ResponseMetadata": {"HTTPHeaders": {"content-length": "256"}}},
+    ]
+    assert len(db_writer.execute_query(query)) == 2
+    assert db_writer.profile.rows == 3
+    assert db_writer.profile.bytes == 768
+
 
 @mock.patch("tsperf.adapter.timestream.boto3", autospec=True)
 def test_prepare_database_not_existing_db_and_table(mock_boto, config):
@@ -0,0 +1,69 @@
+import time
+from unittest import mock
+
+import pytest
+
+import tsperf.mixed.core as mixed
+import tsperf.read.core as read_core
+import tsperf.write.core as write_core
+from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.read.config import QueryTimerConfig
+from tsperf.write.config import DataGeneratorConfig
+from tsperf.write.model.metrics import c_inserted_values
+
+
+def fake_run_dg():
+    time.sleep(0.3)
+    c_inserted_values.inc(1000)
+
+
+def fake_run_workers():
+    worker = read_core.create_worker_statistics()
+    while not read_core.stop_event.is_set():
+        worker.record(0.001)
+        time.sleep(0.005)
+
+
+@mock.patch("tsperf.read.core.setup", autospec=True)
+@mock.patch("tsperf.write.core.setup", autospec=True)
+def test_start(mock_write_setup, mock_read_setup):
+    """
+    Queries run during the baseline and the ingest phase, and stop when the writers are done.
+    The query parameters are drawn from the dataset actually written.
+    """
+    write_config = DataGeneratorConfig(adapter=DatabaseInterfaceType.Dummy, timestamp_start=1000, ingest_size=10)
+    read_config = QueryTimerConfig(adapter=DatabaseInterfaceType.Dummy)
+    write_core.config = write_config
+    write_core.schema = {"environment": {"tags": {}}}
+    read_core.config = read_config
+    read_core.worker_statistics.clear()
+
+    with mock.patch.object(write_core, "run_dg", fake_run_dg), mock.patch.object(
+        read_core, "run_workers", fake_run_workers
+    ):
+        timeline = mixed.start(write_config, read_config, interval=0.1, baseline=0.2)
+    read_core.stop_event.clear()
+    statistics, _ = read_core.merge_worker_statistics()
+    read_core.worker_statistics.clear()
+
+    mock_write_setup.assert_called_once_with(write_config)
+    mock_read_setup.assert_called_once()
+    read_setup_config = mock_read_setup.call_args[0][0]
+    assert read_setup_config.timestamp_start == 1000
+    assert read_setup_config.ingest_size == 10
+    assert mock_read_setup.call_args[1]["schema_"] is write_core.schema
+
+    assert [sample.phase for sample in timeline.samples[:2]] == ["baseline", "baseline"]
+    assert timeline.samples[-1].phase == "ingest"
+    baseline, ingest = timeline.phases["baseline"], timeline.phases["ingest"]
+    assert baseline.rows == 0
+    assert ingest.rows == 1000
+    assert baseline.duration == pytest.approx(0.2, abs=0.05)
+    assert baseline.latency.count > 0
+    assert ingest.latency.count > 0
+    assert sum(sample.latency.count for sample in timeline.samples) == statistics.count
+
+    report = timeline.report(["50", "99"])
+    assert "baseline:\n" in report
+    assert "ingest:\n" in report
+    assert "  p99     : 1.0" in report
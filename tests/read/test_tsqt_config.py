@@ -1,5 +1,7 @@
+import json
 import os
 import os.path
+import time
 from unittest import mock
 
 import pytest
@@ -88,6 +90,17 @@ def test_config_iterations_environ(config_environ):
     assert config_environ.iterations == 3
 
 
+@pytest.mark.parametrize("env_vars", ["RATE=250.5"])
+def test_config_rate_environ(config_environ):
+    assert config_environ.rate == 250.5
+
+
+@pytest.mark.parametrize("env_vars", ["DURATION=2.5", "SWEEP=1,2,4"])
+def test_config_sweep_environ(config_environ):
+    assert config_environ.validate_config()
+    assert config_environ.duration == 2.5 or config_environ.sweep == [1, 2, 4]
+
+
 @pytest.mark.parametrize("env_vars", ["QUANTILES=1,2,3,4,5"])
 def test_config_quantiles_environ(config_environ):
     assert config_environ.quantiles == ["1", "2", "3", "4", "5"]
@@ -135,6 +148,78 @@ def test_not_enough_results():
     assert "ITERATIONS" in config.invalid_configs[0]
 
 
+def test_time_range():
+    config = mkconfig(["--timestamp-start", "1000", "--timestamp-delta", "2", "--ingest-size", "50"])
+    assert config.time_range() == (1000, 1100)
+    config.timestamp_start = None
+    start, end = config.time_range()
+    assert end - start == 100
+    assert end == pytest.approx(time.time(), abs=5)
+
+
+def test_validate_processes_invalid():
+    config = mkconfig(["--concurrency", "4", "--iterations", "100"])
+    config.processes = 0
+    assert not config.validate_config()
+    assert config.invalid_configs == ["PROCESSES: 0 < 1"]
+    config = mkconfig(["--concurrency", "4", "--iterations", "100", "--processes", "5"])
+    assert not config.validate_config()
+    assert config.invalid_configs == ["PROCESSES: 5 > CONCURRENCY: 4"]
+
+
+def test_validate_rate_invalid():
+    config = mkconfig()
+    config.rate = -1
+    assert not config.validate_config()
+    assert config.invalid_configs == ["RATE: -1 < 0"]
+
+
+def test_validate_duration():
+    config = mkconfig(["--concurrency", "1", "--iterations", "1", "--duration", "5"])
+    assert config.validate_config()
+    config.duration = -1
+    assert not config.validate_config()
+    assert "DURATION: -1 < 0" in config.invalid_configs
+
+
+@pytest.mark.parametrize(
+    "sweep,options,error",
+    [
+        ("1,a", [], "SWEEP: 1,a. Concurrency levels must be integers"),
+        ("0,1", [], "SWEEP: [0, 1]. Concurrency levels must be at least 1"),
+        ("4,2", [], "SWEEP: [4, 2]. Concurrency levels must be ascending"),
+        ("1,2", ["--processes", "2"], "PROCESSES: 2 > SWEEP: 1"),
+        ("1,2", ["--rate", "10"], "SWEEP: [1, 2]; RATE: 10.0. A sweep runs a closed loop"),
+    ],
+)
+def test_validate_sweep_invalid(sweep, options, error):
+    config = mkconfig(["--concurrency", "4", "--iterations", "100", "--sweep", sweep, *options])
+    assert not config.validate_config()
+    assert config.invalid_configs == [error]
+
+
+def test_load_workload(tmp_path):
+    workload_file = tmp_path / "workload.json"
+    workload_file.write_text(json.dumps({"queries": [{"name": "all", "query": "SELECT * FROM {schema}"}]}))
+    config = mkconfig(["--workload", str(workload_file), "--schema", "doc.sensors"])
+    assert config.validate_config()
+    workload = config.load_workload()
+    assert workload.queries[0].name == "all"
+    assert workload.queries[0].query == "SELECT * FROM doc.sensors"
+
+    config = mkconfig()
+    config.query = "SELECT 1"
+    assert config.load_workload().queries[0].query == "SELECT 1"
+
+
+def test_validate_workload_invalid(tmp_path):
+    workload_file = tmp_path / "workload.json"
+    workload_file.write_text(json.dumps({"queries": []}))
+    config = mkconfig(["--workload", str(workload_file)])
+    assert not config.validate_config()
+    assert config.invalid_configs == [f"WORKLOAD: {workload_file}. Workload needs at least one query"]
+
+
 @mock.patch("shutil.get_terminal_size", autospec=True)
 def test_terminal_too_small(mock_terminal_size):
     mock_size = mock.MagicMock()
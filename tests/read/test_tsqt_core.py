@@ -1,11 +1,15 @@
+import pickle
+import time
 from unittest import mock
 
 import pytest
 
 import tsperf.read.core as qt
 from tsperf.engine import TsPerfEngine
-from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.model.interface import DatabaseInterfaceType, QueryProfile
 from tsperf.read.config import QueryTimerConfig
+from tsperf.read.workload import Workload
+from tsperf.util import tictrack
 
 
 @pytest.fixture(scope="function")
@@ -57,9 +61,333 @@ def test_start_query_run(mock_engine, config):
 
     # FIXME: This uses variables in the module scope. Get rid of it.
     qt.config = config
+    qt.workload = Workload.single("SELECT 1")
 
     qt.config.iterations = 2
     qt.start_query_run()
     assert mock_db_writer.execute_query.call_count == 2
     assert qt.success == 1
     assert qt.failure == 1
+    statistics, histogram = qt.merge_worker_statistics()
+    assert statistics.count == 1
+    assert histogram.count == 1
+
+
+@mock.patch("tsperf.read.core.time.sleep", autospec=True)
+@mock.patch("tsperf.read.core.engine", autospec=True)
+def test_start_query_run_rate(mock_engine, mock_sleep, config):
+    """
+    With a target rate, queries are started on a fixed schedule, and their response times are
+    measured from the intended start times, also when the database falls behind the schedule.
+    """
+    mock_db_writer = mock.MagicMock()
+    mock_engine.create_adapter.return_value = mock_db_writer
+    qt.config = config
+    qt.workload = Workload.single("SELECT 1")
+    qt.config.iterations = 3
+    qt.worker_statistics.clear()
+    qt.rate_limiter = mock.MagicMock()
+    now = time.monotonic()
+    # the first query is due in the future, the others are overdue by one second each
+    qt.rate_limiter.schedule.side_effect = [now + 60, now - 1, now - 2]
+    try:
+        qt.start_query_run()
+    finally:
+        qt.rate_limiter = None
+
+    assert mock_db_writer.execute_query.call_count == 3
+    mock_sleep.assert_called_once()
+    assert mock_sleep.call_args[0][0] == pytest.approx(60, abs=1)
+    statistics, _ = qt.merge_worker_statistics()
+    response_times = qt.merge_response_times()
+    assert statistics.count == 3
+    assert response_times.count == 3
+    # the corrected latency includes the time spent behind schedule
+    assert response_times.max >= 2
+    assert statistics.max < 1
+
+
+def test_report_quantiles(config):
+    qt.config = config
+    qt.config.quantiles = ["50", "99"]
+    qt.worker_statistics.clear()
+    tictrack.tic_toc.clear()
+    worker = qt.create_worker_statistics()
+    for i in range(1, 101):
+        tictrack.tic_toc.record("execute_query", i / 1000)
+        worker.record(i / 1000, i / 100)
+
+    report = qt.report_quantiles()
+    assert "p50" in report
+    assert "p99" in report
+    assert "corrected" not in report
+
+    qt.config.rate = 10
+    report = qt.report_quantiles()
+    assert "p50  : 50.0" in report
+    assert "(corrected: 500." in report
+    tictrack.tic_toc.clear()
+
+
+@mock.patch("tsperf.read.core.engine", autospec=True)
+def test_start_query_run_workload(mock_engine, config):
+    """
+    Queries are picked according to the mix, and their statistics are recorded per query.
+    """
+    mock_db_writer = mock.MagicMock()
+
+    def execute_query(query):
+        if query == "fail":
+            raise Exception("mocked failure")
+
+    mock_db_writer.execute_query.side_effect = execute_query
+    mock_engine.create_adapter.return_value = mock_db_writer
+    qt.config = config
+    qt.config.iterations = 8
+    qt.config.quantiles = ["50", "99.9"]
+    qt.worker_statistics.clear()
+    qt.workload = Workload.from_dict(
+        {
+            "mix": "ratio",
+            "queries": [
+                {"name": "point", "query": "SELECT 1", "weight": 3},
+                {"name": "broken", "query": "fail"},
+            ],
+        }
+    )
+    qt.start_query_run()
+
+    point, _ = qt.merge_worker_statistics("point")
+    broken, _ = qt.merge_worker_statistics("broken")
+    assert point.count == 6
+    assert broken.count == 0
+    assert sum(worker.failure for worker in qt.get_worker_statistics("broken")) == 2
+    assert qt.merge_worker_statistics()[0].count == 6
+
+    report = qt.report_workload()
+    assert "point:\n  success: 6\n  failure: 0\n" in report
+    assert "broken:\n  success: 0\n  failure: 2\n" in report
+    assert "  p99.9  : " in report
+
+
+@mock.patch("tsperf.read.core.engine", autospec=True)
+def test_start_query_run_template(mock_engine, config):
+    """
+    Parameters of query templates are drawn for each execution, and bound as driver parameters.
+    """
+    mock_db_writer = mock.MagicMock()
+    mock_db_writer.paramstyle = "pyformat"
+    mock_engine.create_adapter.return_value = mock_db_writer
+    qt.config = config
+    qt.config.iterations = 20
+    qt.config.timestamp_start = 1_600_000_000
+    qt.schema = {"environment": {"tags": {"plant": 100, "sensor_id": "id"}}}
+    qt.workload = Workload.from_dict(
+        {
+            "queries": [
+                {
+                    "name": "window",
+                    "query": "SELECT * FROM t WHERE sensor_id = :sensor_id AND ts >= :w_start AND ts < :w_end",
+                    "parameters": {"sensor_id": {"type": "tag"}, "w": {"type": "time_window", "length": 60}},
+                },
+            ],
+        }
+    )
+    qt.start_query_run()
+
+    assert mock_db_writer.execute_query.call_count == 20
+    calls = mock_db_writer.execute_query.call_args_list
+    assert {call.args[0] for call in calls} == {
+        "SELECT * FROM t WHERE sensor_id = %(sensor_id)s AND ts >= %(w_start)s AND ts < %(w_end)s"
+    }
+    parameters = [call.args[1] for call in calls]
+    assert len({p["w_start"] for p in parameters}) == 20
+    assert all(config.id_start <= p["sensor_id"] <= config.id_end for p in parameters)
+    assert all(p["w_start"].timestamp() >= 1_600_000_000 for p in parameters)
+
+
+def test_worker_statistics_take_and_merge():
+    worker = qt.WorkerStatistics("query")
+    worker.record(0.01, 0.02)
+    worker.record_failure()
+    delta = pickle.loads(pickle.dumps(worker.take()))  # noqa: S301
+    assert worker.statistics.count == 0
+    assert worker.failure == 0
+
+    proxy = qt.WorkerStatistics("query")
+    proxy.merge(delta)
+    proxy.merge(delta)
+    assert proxy.statistics.count == 2
+    assert proxy.histogram.count == 2
+    assert proxy.response_times.max == 0.02
+    assert proxy.failure == 2
+
+
+def test_query_profile():
+    profile = QueryProfile()
+    with mock.patch("tsperf.model.interface.time.monotonic", side_effect=[1.0, 1.25, 2.0, 2.5]):
+        with profile.phase("submit"):
+            pass
+        with profile.phase("submit"):
+            pass
+    assert profile.submit == 0.75
+    profile.count([(1, "abc", None), (2, "def", None)])
+    assert profile.rows == 2
+    assert profile.bytes == 24
+    profile.count([], size=100)
+    assert (profile.rows, profile.bytes) == (0, 100)
+    profile.count_rows(3, sample=(1, "abc", None))
+    assert (profile.rows, profile.bytes) == (3, 36)
+
+
+@mock.patch("tsperf.read.core.engine", autospec=True)
+def test_start_query_run_profile(mock_engine, config):
+    """
+    The phases and result sizes of the queries profiled by the adapter are aggregated, and
+    survive taking and merging the worker statistics.
+    """
+    profile = QueryProfile()
+    profile.submit, profile.fetch, profile.decode, profile.rows, profile.bytes = 0.002, 0.001, 0.0005, 10, 400
+    mock_engine.create_adapter.return_value.profile = profile
+    qt.config = config
+    qt.config.iterations = 4
+    qt.workload = Workload.single("SELECT 1")
+    qt.worker_statistics.clear()
+
+    qt.start_query_run()
+
+    report = qt.report_profiles().splitlines()
+    assert report == [
+        "submit : mean 2.0ms, max 2.0ms",
+        "fetch  : mean 1.0ms, max 1.0ms",
+        "decode : mean 0.5ms, max 0.5ms",
+        "rows   : mean 10.0, total 40",
+        "bytes  : mean 400.0, total 1600",
+    ]
+    proxy = qt.WorkerStatistics()
+    proxy.merge(pickle.loads(pickle.dumps(qt.worker_statistics[0].take())))  # noqa: S301
+    assert proxy.profiles["rows"].count == 4
+    assert qt.report_profiles() == ""
+    qt.worker_statistics.clear()
+
+
+def test_run_worker_processes(config):
+    """
+    The aggregates and the `tictrack` result sets of the worker processes are merged.
+    """
+    qt.config = config
+    qt.config.concurrency = 3
+    qt.config.processes = 2
+    qt.config.iterations = 50
+    qt.config.refresh_interval = 0.05
+    qt.schema = None
+    qt.workload = Workload.single("SELECT 1")
+    qt.worker_statistics.clear()
+    tictrack.tic_toc.clear()
+    qt.success = qt.failure = 0
+
+    qt.run_workers()
+
+    statistics, histogram = qt.merge_worker_statistics()
+    assert statistics.count == 150
+    assert histogram.count == 150
+    assert qt.success == 150
+    assert qt.failure == 0
+    assert len(tictrack.tic_toc["execute_query"]) == 150
+    qt.worker_statistics.clear()
+    tictrack.tic_toc.clear()
+
+
+def test_run_worker_processes_rate(config):
+    """
+    With a target rate, the parent process has no rate limiter of its own, but reports the
+    corrected response times, and the rates and lags submitted by the worker processes.
+    """
+    qt.config = config
+    qt.config.concurrency = 2
+    qt.config.processes = 2
+    qt.config.iterations = 10
+    qt.config.rate = 200
+    qt.config.refresh_interval = 0.05
+    qt.config.quantiles = ["50", "99"]
+    qt.schema = None
+    qt.workload = Workload.single("SELECT 1")
+    qt.worker_statistics.clear()
+    tictrack.tic_toc.clear()
+    qt.success = qt.failure = 0
+
+    qt.run_workers()
+
+    assert qt.rate_limiter is None
+    assert qt.merge_response_times().count == 20
+    assert sorted(qt.process_rates) == [0, 1]
+    achieved, lag = qt.get_rate()
+    assert achieved > 0
+    assert lag >= 0
+    assert "corrected" in qt.report_quantiles()
+    qt.process_rates.clear()
+    qt.worker_statistics.clear()
+    tictrack.tic_toc.clear()
+
+
+@mock.patch("tsperf.read.core.engine", autospec=True)
+def test_run_sweep(mock_engine, config):
+    """
+    Each concurrency level runs its own iterations, and is measured on its own.
+    """
+    mock_engine.create_adapter.return_value = mock.MagicMock()
+    qt.config = config
+    qt.config.concurrency = 4
+    qt.config.iterations = 10
+    qt.config.refresh_interval = 0.01
+    qt.config.sweep = [1, 2, 3]
+    qt.workload = Workload.single("SELECT 1")
+    qt.worker_statistics.clear()
+
+    levels = qt.run_sweep()
+
+    assert [level.concurrency for level in levels] == [1, 2, 3]
+    assert [level.success for level in levels] == [10, 20, 30]
+    assert all(level.failure == 0 and level.p99 is not None for level in levels)
+    assert qt.config.concurrency == 4
+    assert qt.queries_done.empty()
+    qt.worker_statistics.clear()
+
+
+@mock.patch("tsperf.read.core.engine", autospec=True)
+def test_run_workers_duration(mock_engine, config):
+    """
+    With a duration, the worker threads run until it has elapsed, regardless of the iterations.
+    """
+    mock_engine.create_adapter.return_value.execute_query.side_effect = lambda query: time.sleep(0.001)
+    qt.config = config
+    qt.config.concurrency = 2
+    qt.config.iterations = 1
+    qt.config.duration = 0.2
+    qt.workload = Workload.single("SELECT 1")
+    qt.worker_statistics.clear()
+    qt.stop_event.clear()
+    qt.success = qt.failure = 0
+
+    qt.run_workers()
+
+    assert qt.end_time - qt.start_time >= 0.2
+    assert qt.success > 2
+    assert qt.get_progress() == (0.2, 0.2)
+    qt.stop_event.clear()
+    qt.worker_statistics.clear()
+
+
+def test_print_progressbar(config, capsys):
+    qt.config = config
+    qt.config.concurrency = 2
+    worker = qt.create_worker_statistics()
+    for duration in [0.01, 0.02, 0.03]:
+        worker.record(duration)
+    qt.print_progressbar(1, 2)
+
+    statistics, _ = qt.merge_worker_statistics()
+    output = capsys.readouterr().err
+    assert f"mean   : {round(statistics.mean * 1000, 3)}ms" in output
+    assert f"max    : {round(statistics.max * 1000, 3)}ms" in output
+    assert "p99" in output
@@ -0,0 +1,50 @@
+from tsperf.read.sweep import SweepLevel, find_knee, report_sweep
+
+
+def mklevels(rates):
+    return [
+        SweepLevel(concurrency=concurrency, duration=1.0, success=rate, failure=0, mean=0.01, p50=0.01, p99=0.02)
+        for concurrency, rate in rates
+    ]
+
+
+def test_sweep_level_rate():
+    assert SweepLevel(concurrency=1, duration=2.0, success=50, failure=1).rate == 25
+    assert SweepLevel(concurrency=1, duration=0.0, success=50, failure=1).rate == 0
+
+
+def test_find_knee():
+    levels = mklevels([(1, 100), (2, 200), (4, 390), (8, 420), (16, 425), (32, 410)])
+    assert find_knee(levels) == 2
+
+
+def test_find_knee_linear():
+    assert find_knee(mklevels([(1, 100), (2, 200), (4, 400)])) is None
+    assert find_knee(mklevels([(1, 100), (2, 200)])) is None
+    assert find_knee(mklevels([(1, 100), (2, 100), (4, 100)])) is None
+
+
+def test_report_sweep():
+    levels = mklevels([(1, 100), (2, 200), (4, 390), (8, 420), (16, 425)])
+    levels.append(SweepLevel(concurrency=32, duration=1.0, success=0, failure=5))
+    report = report_sweep(levels).splitlines()
+    assert report[0].split() == [
+        "concurrency",
+        "rate",
+        "[qps]",
+        "mean",
+        "[ms]",
+        "p50",
+        "[ms]",
+        "p99",
+        "[ms]",
+        "failure",
+    ]
+    assert report[1].split() == ["1", "100.000", "10.000", "10.000", "20.000", "0"]
+    assert report[6].split() == ["32", "0.000", "-", "-", "-", "5"]
+    assert report[7] == "Knee at concurrency 4: 390.0qps, p99 20.0ms"
+
+
+def test_report_sweep_no_knee():
+    report = report_sweep(mklevels([(1, 100), (2, 200)]))
+    assert report.splitlines()[-1] == "No knee found, the throughput does not level off within the sweep"
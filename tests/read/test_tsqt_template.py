@@ -0,0 +1,127 @@
+import datetime
+import random
+
+import pytest
+
+from tsperf.read.template import ParameterGenerator, QueryTemplate, sql_literal
+
+tags = {"description": "tags", "plant": 100, "line": ["a", "b"], "sensor_id": "id"}
+
+
+def generator(parameters, seed=42):
+    return ParameterGenerator(
+        parameters,
+        tags=tags,
+        id_range=(10, 20),
+        time_range=(1_600_000_000.0, 1_600_086_400.0),
+        rng=random.Random(seed),  # noqa: S311
+    )
+
+
+def test_parameter_generator_tags():
+    parameters = generator(
+        {"plant": {"type": "tag"}, "line": {"type": "tag"}, "sensor": {"type": "tag", "tag": "sensor_id"}}
+    )
+    for _ in range(100):
+        values = parameters.generate()
+        assert 0 <= values["plant"] < 100
+        assert values["line"] in ["a", "b"]
+        assert 10 <= values["sensor"] <= 20
+
+
+def test_parameter_generator_time_window():
+    parameters = generator({"window": {"type": "time_window", "length": [60, 3600]}})
+    assert parameters.bound_names == ["window_start", "window_end"]
+    starts = set()
+    for _ in range(100):
+        values = parameters.generate()
+        start, end = values["window_start"], values["window_end"]
+        assert start.tzinfo == datetime.timezone.utc
+        assert 60 <= (end - start).total_seconds() <= 3600
+        assert start.timestamp() >= 1_600_000_000.0
+        assert end.timestamp() <= 1_600_086_400.0
+        starts.add(start)
+    assert len(starts) == 100
+
+
+def test_parameter_generator_integer_choice():
+    parameters = generator(
+        {"limit": {"type": "integer", "min": 1, "max": 3}, "agg": {"type": "choice", "values": ["avg", "max"]}}
+    )
+    values = [parameters.generate() for _ in range(100)]
+    assert {value["limit"] for value in values} == {1, 2, 3}
+    assert {value["agg"] for value in values} == {"avg", "max"}
+
+
+def test_parameter_generator_seed():
+    spec = {"plant": {"type": "tag"}, "window": {"type": "time_window", "length": 60}}
+    first, second = generator(spec), generator(spec)
+    assert [first.generate() for _ in range(10)] == [second.generate() for _ in range(10)]
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [
+        {"plant": {"type": "unknown"}},
+        {"unknown": {"type": "tag"}},
+        {"limit": {"type": "integer", "min": 1}},
+        {"agg": {"type": "choice", "values": []}},
+    ],
+)
+def test_parameter_generator_invalid(parameters):
+    with pytest.raises(ValueError):
+        generator(parameters)
+
+
+query = "SELECT AVG(value)::float FROM t WHERE plant = :plant AND ts >= :w_start AND ts < :w_end AND x LIKE 'a%'"
+parameters = {"plant": {"type": "tag"}, "w": {"type": "time_window", "length": 60}}
+
+
+def test_query_template_qmark():
+    template = QueryTemplate(query, generator(parameters), paramstyle="qmark")
+    text, values = template.render()
+    assert text == "SELECT AVG(value)::float FROM t WHERE plant = ? AND ts >= ? AND ts < ? AND x LIKE 'a%'"
+    assert isinstance(values, list)
+    assert len(values) == 3
+    assert values[2] - values[1] == datetime.timedelta(seconds=60)
+
+
+def test_query_template_pyformat():
+    template = QueryTemplate(query, generator(parameters), paramstyle="pyformat")
+    text, values = template.render()
+    assert text == (
+        "SELECT AVG(value)::float FROM t WHERE plant = %(plant)s AND ts >= %(w_start)s AND ts < %(w_end)s "
+        "AND x LIKE 'a%%'"
+    )
+    assert set(values.keys()) == {"plant", "w_start", "w_end"}
+
+
+def test_query_template_flux():
+    template = QueryTemplate("from(bucket: b) |> range(start: :w_start, stop: :w_end)", generator(parameters), "flux")
+    text, values = template.render()
+    assert text == "from(bucket: b) |> range(start: params.w_start, stop: params.w_end)"
+    assert set(values.keys()) == {"w_start", "w_end"}
+
+
+def test_query_template_literal():
+    template = QueryTemplate(
+        "SELECT * FROM t WHERE line = :line AND plant = :plant",
+        generator({"line": {"type": "tag"}, "plant": {"type": "tag"}}),
+    )
+    text, values = template.render()
+    assert values is None
+    assert text.startswith("SELECT * FROM t WHERE line = '")
+    assert ":" not in text
+
+
+def test_query_template_unknown_placeholder():
+    with pytest.raises(ValueError) as ex:
+        QueryTemplate("SELECT * FROM t WHERE line = :other", generator(parameters))
+    ex.match("other")
+
+
+def test_sql_literal():
+    assert sql_literal(42) == "42"
+    assert sql_literal(True) == "TRUE"
+    assert sql_literal("it's") == "'it''s'"
+    assert sql_literal(datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)) == "'2020-01-01T00:00:00+00:00'"
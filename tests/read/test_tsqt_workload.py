@@ -0,0 +1,71 @@
+import collections
+import random
+
+import pytest
+
+from tsperf.read.workload import Workload, WorkloadMix, WorkloadQuery
+
+workload_data = {
+    "mix": "ratio",
+    "queries": [
+        {"name": "last_value", "query": "SELECT * FROM {schema}", "weight": 3},
+        {"name": "hourly_avg", "query": "SELECT AVG(value) FROM {schema}"},
+    ],
+}
+
+
+def test_workload_from_dict():
+    workload = Workload.from_dict(workload_data)
+    assert workload.mix == WorkloadMix.RATIO
+    assert workload.queries == [
+        WorkloadQuery(name="last_value", query="SELECT * FROM {schema}", weight=3),
+        WorkloadQuery(name="hourly_avg", query="SELECT AVG(value) FROM {schema}", weight=1),
+    ]
+    workload = workload.format(schema="doc.sensors")
+    assert workload.queries[1].query == "SELECT AVG(value) FROM doc.sensors"
+
+
+def test_workload_from_dict_defaults():
+    workload = Workload.from_dict({"queries": ["SELECT 1", "SELECT 2"]})
+    assert workload.mix == WorkloadMix.RANDOM
+    assert [query.name for query in workload.queries] == ["query-0", "query-1"]
+    assert [query.weight for query in workload.queries] == [1, 1]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {"queries": []},
+        {"queries": [{"name": "a", "query": "SELECT 1"}, {"name": "a", "query": "SELECT 2"}]},
+        {"queries": [{"name": "a"}]},
+        {"queries": [{"name": "a", "query": "SELECT 1", "weight": 0}]},
+        {"queries": ["SELECT 1"], "mix": "unknown"},
+    ],
+)
+def test_workload_invalid(data):
+    with pytest.raises(ValueError):
+        Workload.from_dict(data)
+
+
+def test_workload_selector_ratio():
+    workload = Workload.from_dict(workload_data)
+    selector = workload.selector()
+    names = [next(selector).name for _ in range(8)]
+    assert names == ["last_value", "last_value", "hourly_avg", "last_value"] * 2
+
+    # threads start at different positions of the same sequence
+    selector = workload.selector(offset=2)
+    assert next(selector).name == "hourly_avg"
+
+
+def test_workload_selector_random():
+    workload = Workload.from_dict({**workload_data, "mix": "random"})
+    selector = workload.selector(rng=random.Random(42))  # noqa: S311
+    counts = collections.Counter(next(selector).name for _ in range(10000))
+    assert counts["last_value"] / 10000 == pytest.approx(0.75, abs=0.02)
+
+
+def test_workload_single():
+    selector = Workload.single("SELECT 1").selector()
+    assert {next(selector).query for _ in range(3)} == {"SELECT 1"}
@@ -2,7 +2,7 @@ import statistics
 
 import pytest
 
-from tsperf.util.float_simulator import FloatSimulator
+from tsperf.util.float_simulator import FloatSimulator, FloatSimulatorArray
 
 float_schema = {
     "mean": 6.4,
@@ -79,3 +79,67 @@ def test_calculate_next_value_float_with_error():
     assert mean == pytest.approx(float_schema["mean"], abs=0.3)
     assert stdev == pytest.approx(float_schema["stdev"], abs=0.15)
     assert error_rate == pytest.approx(float_schema["error_rate"], abs=0.001)
+
+
+@pytest.mark.parametrize("with_error", [False, True])
+def test_next_values_float_array(with_error):
+    """
+    This function tests if the FloatSimulatorArray produces values that match the schema
+
+    Pre Condition: FloatSimulatorArray initialized with float_schema for 100 channels
+
+    Test Case 1: 1000 values for each of the channels are created
+    -> shape of each result == number of channels
+    -> mean of generated values == mean of schema +- 0.3
+    -> stdev of generated values == stdev of schema +- 0.15
+    -> error_rate of generated values == error_rate of schema +- 0.001, or 0 without error values
+    """
+    # Pre Condition:
+    error_rate = float_schema["error_rate"] if with_error else 0
+    error_length = float_schema["error_length"] if with_error else 0
+    float_sensors = FloatSimulatorArray(
+        100,
+        float_schema["mean"],
+        float_schema["min"],
+        float_schema["max"],
+        float_schema["stdev"],
+        float_schema["variance"],
+        error_rate,
+        error_length,
+    )
+    # Test Case 1:
+    results = []
+    for _ in range(0, 1000):
+        values = float_sensors.next_values()
+        assert values.shape == (100,)
+        results.extend(values.tolist())
+    mean = statistics.mean(results)
+    stdev = statistics.stdev(results)
+    error_rate_actual = float_sensors.error_count / (float_sensors.value_count + float_sensors.error_count)
+    assert mean == pytest.approx(float_schema["mean"], abs=0.3)
+    assert stdev == pytest.approx(float_schema["stdev"], abs=0.15)
+    assert error_rate_actual == pytest.approx(error_rate, abs=0.001)
+
+
+def test_calculate_next_value_float_seed():
+    """
+    Two FloatSimulator instances initialized with the same seed produce the same values.
+    """
+    arguments = [6.4, 6.0, 7.4, 0.2, 0.03, 0.1, 1.08]
+    first = FloatSimulator(*arguments, seed=42)
+    second = FloatSimulator(*arguments, seed=42)
+    other = FloatSimulator(*arguments, seed=43)
+    first_values = [first.calculate_next_value() for _ in range(0, 100)]
+    assert first_values == [second.calculate_next_value() for _ in range(0, 100)]
+    assert first_values != [other.calculate_next_value() for _ in range(0, 100)]
+
+
+def test_next_values_float_array_seed():
+    """
+    Two FloatSimulatorArray instances initialized with the same seed produce the same values.
+    """
+    arguments = [10, 6.4, 6.0, 7.4, 0.2, 0.03, 0.1, 1.08]
+    first = FloatSimulatorArray(*arguments, seed=42)
+    second = FloatSimulatorArray(*arguments, seed=42)
+    for _ in range(0, 100):
+        assert first.next_values().tolist() == second.next_values().tolist()
@@ -0,0 +1,99 @@
+import math
+import pickle
+import random
+import statistics
+
+import pytest
+
+from tsperf.util.histogram import Histogram
+
+
+def exact_percentile(values, percentile):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percentile / 100 * len(ordered))) - 1]
+
+
+def test_histogram_percentiles():
+    """
+    Percentiles are within the relative error defined by the number of significant digits,
+    or within the smallest discernible value.
+    """
+    generator = random.Random(42)
+    values = [generator.lognormvariate(-5, 1.5) for _ in range(10000)]
+    histogram = Histogram(significant_digits=3)
+    histogram.record_many(values)
+
+    assert len(histogram) == 10000
+    assert histogram.min == min(values)
+    assert histogram.max == max(values)
+    assert histogram.mean() == pytest.approx(statistics.mean(values))
+    assert histogram.stdev() == pytest.approx(statistics.stdev(values), rel=1e-3)
+    for percentile in [1, 25, 50, 90, 99, 99.9]:
+        assert histogram.percentile(percentile) == pytest.approx(
+            exact_percentile(values, percentile), rel=1e-3, abs=histogram.lowest
+        )
+    assert histogram.percentile(100) == max(values)
+    assert histogram.quantiles(4) == pytest.approx(statistics.quantiles(values, n=4), rel=2e-3)
+
+
+def test_histogram_bounded_memory():
+    histogram = Histogram()
+    assert len(histogram.counts) == 0
+    histogram.record(0.5)
+    assert len(histogram.counts) == 1
+    for i in range(100000):
+        histogram.record(i / 1000)
+    assert len(histogram.counts) <= histogram.size
+
+
+def test_histogram_out_of_range():
+    histogram = Histogram(lowest=0.001, highest=10)
+    histogram.record(0)
+    histogram.record(0.0001)
+    histogram.record(100)
+    assert histogram.min == 0
+    assert histogram.max == 100
+    # values below the smallest discernible value are not discerned from 0
+    assert histogram.percentile(50) == pytest.approx(0, abs=histogram.lowest)
+    assert histogram.percentile(100) == 100
+
+
+def test_histogram_merge():
+    first = Histogram()
+    second = Histogram()
+    both = Histogram()
+    for i in range(1, 1000):
+        (first if i % 2 else second).record(i / 100)
+        both.record(i / 100)
+
+    merged = first.copy().merge(second)
+    assert merged.counts == both.counts
+    assert (merged.count, merged.min, merged.max) == (both.count, both.min, both.max)
+    assert merged.total == pytest.approx(both.total)
+    assert first.count == 500
+
+    with pytest.raises(ValueError):
+        first.merge(Histogram(significant_digits=2))
+
+
+def test_histogram_reset_and_pickle():
+    histogram = Histogram()
+    histogram.record(1.5, count=3)
+    restored = pickle.loads(pickle.dumps(histogram))  # noqa: S301
+    assert restored.counts == histogram.counts
+    assert (restored.count, restored.total, restored.min, restored.max) == (3, 4.5, 1.5, 1.5)
+    # only the populated buckets are pickled
+    assert len(pickle.dumps(histogram)) < 1000
+    histogram.reset()
+    assert len(histogram) == 0
+    assert histogram.min is None
+    with pytest.raises(ValueError):
+        histogram.mean()
+    with pytest.raises(ValueError):
+        histogram.percentile(50)
+
+
+@pytest.mark.parametrize("arguments", [(0, 1, 3), (1, 1, 3), (1e-6, 1, 0), (1e-6, 1, 6)])
+def test_histogram_invalid(arguments):
+    with pytest.raises(ValueError):
+        Histogram(*arguments)
@@ -0,0 +1,105 @@
+import os
+import random
+import struct
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from datetime_truncate import truncate
+
+from tsperf.util.pgbinary import SIGNATURE, TRAILER, BinaryCopyEncoder, LocalTimestamps
+
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+
+
+def decode(data: bytes, formats: list) -> list:
+    """
+    Decode the binary COPY format, with timestamps as naive datetimes.
+    """
+    assert data.startswith(SIGNATURE)
+    assert data.endswith(TRAILER)
+    position = len(SIGNATURE)
+    rows = []
+    while position < len(data) - len(TRAILER):
+        (count,) = struct.unpack_from(">h", data, position)
+        assert count == len(formats)
+        position += 2
+        row = []
+        for fmt in formats:
+            (size,) = struct.unpack_from(">i", data, position)
+            position += 4
+            if size == -1:
+                row.append(None)
+                continue
+            value = data[position : position + size]
+            position += size
+            if fmt == "timestamp":
+                row.append(POSTGRES_EPOCH + timedelta(microseconds=struct.unpack(">q", value)[0]))
+            elif fmt == "s":
+                row.append(value.decode("utf-8"))
+            else:
+                row.append(struct.unpack(">" + fmt, value)[0])
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture(params=["UTC", "Europe/Berlin", "America/New_York"])
+def timezone(request):
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = request.param
+    time.tzset()
+    yield request.param
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+@pytest.mark.parametrize("partition", ["second", "minute", "hour", "day", "week", "month", "quarter", "year"])
+def test_local_timestamps_truncate(timezone, partition):
+    """
+    The truncated timestamps match `datetime_truncate`, which the INSERT statements use.
+    """
+    timestamps = LocalTimestamps(partition)
+    rng = random.Random(42)
+    # random timestamps between 2000 and 2030, and the hours around a daylight saving time change
+    values = [rng.randrange(946_684_800_000, 1_893_456_000_000) for _ in range(500)]
+    values += list(range(1_616_889_600_000, 1_616_904_000_000, 900_000))
+    for value in values:
+        t = datetime.fromtimestamp(value / 1000)
+        local = timestamps.local(value)
+        assert datetime(1970, 1, 1) + timedelta(milliseconds=local) == t
+        assert datetime(1970, 1, 1) + timedelta(milliseconds=timestamps.truncate(local)) == truncate(t, partition)
+
+
+def test_local_timestamps_invalid():
+    with pytest.raises(ValueError):
+        LocalTimestamps("decade")
+
+
+def test_binary_copy_encoder(timezone):
+    encoder = BinaryCopyEncoder(["INTEGER", "TEXT"], ["FLOAT", "BOOL", "INTEGER"], "day")
+    timestamps = [1_616_889_600_123, 1_616_976_000_000, 1_616_976_000_000]
+    tags = [(1, "a"), (1, "a"), (2, None)]
+    fields = [(1.5, True, 3), (None, False, 4), (2.5, True, 5.0)]
+
+    data = encoder.encode(timestamps, tags, fields)
+
+    rows = decode(data, ["timestamp", "timestamp", "d", "?", "i", "i", "s"])
+    first = datetime.fromtimestamp(timestamps[0] / 1000)
+    assert rows[0] == [first, truncate(first, "day"), 1.5, True, 3, 1, "a"]
+    assert rows[1][2:] == [None, False, 4, 1, "a"]
+    assert rows[2][2:] == [2.5, True, 5, 2, None]
+    assert len(encoder.tag_fragments) == 2
+
+
+def test_binary_copy_encoder_empty():
+    encoder = BinaryCopyEncoder([], ["FLOAT"], "week")
+    assert encoder.encode([], [], []) == SIGNATURE + TRAILER
+
+
+def test_binary_copy_encoder_unsupported_type():
+    with pytest.raises(ValueError) as ex:
+        BinaryCopyEncoder(["JSONB"], [], "week")
+    assert ex.match("Unsupported column type for binary COPY: JSONB")
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from tsperf.util.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def test_rate_limiter_on_schedule():
+    clock = FakeClock()
+    limiter = RateLimiter(100, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        assert limiter.acquire(10) == 0
+    # 100 rows at 100 rows/s are due after one second
+    assert clock.now == pytest.approx(1.0)
+    assert limiter.achieved_rate() == pytest.approx(100)
+    assert limiter.sustained()
+    assert limiter.max_lag == 0
+
+
+def test_rate_limiter_burst():
+    clock = FakeClock()
+    limiter = RateLimiter(100, burst=50, clock=clock, sleep=clock.sleep)
+    assert limiter.acquire(50) == 0
+    assert clock.now == 0
+    limiter.acquire(50)
+    assert clock.now == pytest.approx(0.5)
+
+
+def test_rate_limiter_behind_schedule():
+    """
+    The schedule is not reset when callers fall behind, the lag is reported instead.
+    """
+    clock = FakeClock()
+    limiter = RateLimiter(100, clock=clock, sleep=clock.sleep)
+    limiter.acquire(10)
+    # the insert takes longer than the schedule allows
+    clock.now += 0.5
+    assert limiter.acquire(10) == pytest.approx(0.4)
+    clock.now += 0.5
+    assert limiter.acquire(10) == pytest.approx(0.8)
+    assert limiter.max_lag == pytest.approx(0.8)
+    assert not limiter.sustained()
+
+    summary = limiter.summary()
+    assert summary["target_rate"] == 100
+    assert summary["achieved_rate"] == pytest.approx(30 / 1.1)
+    assert summary["sustained"] is False
+    assert summary["lag"] == pytest.approx(0.8)
+
+
+def test_rate_limiter_threads():
+    limiter = RateLimiter(10000)
+    threads = [threading.Thread(target=lambda: [limiter.acquire(100) for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.scheduled == 2000
+
+
+def test_rate_limiter_invalid():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+
+def test_rate_limiter_schedule():
+    clock = FakeClock()
+    clock.now = 10.0
+    limiter = RateLimiter(100, clock=clock, sleep=clock.sleep)
+    assert limiter.schedule() == pytest.approx(10.01)
+    assert limiter.schedule() == pytest.approx(10.02)
+    # the intended start times do not depend on when they are reserved
+    clock.now = 20.0
+    assert limiter.schedule() == pytest.approx(10.03)
+    assert limiter.lag == pytest.approx(9.97)
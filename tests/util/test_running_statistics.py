@@ -0,0 +1,46 @@
+import random
+import statistics
+
+import pytest
+
+from tsperf.util.running_statistics import RunningStatistics
+
+
+def test_running_statistics():
+    generator = random.Random(42)
+    values = [generator.gauss(10, 2) for _ in range(1000)]
+    running = RunningStatistics()
+    for value in values:
+        running.add(value)
+
+    assert running.count == 1000
+    assert running.mean == pytest.approx(statistics.mean(values))
+    assert running.variance() == pytest.approx(statistics.variance(values))
+    assert running.stdev() == pytest.approx(statistics.stdev(values))
+    assert running.min == min(values)
+    assert running.max == max(values)
+
+
+def test_running_statistics_merge():
+    values = [float(i) for i in range(1, 101)]
+    first = RunningStatistics()
+    second = RunningStatistics()
+    for value in values:
+        (first if value <= 30 else second).add(value)
+
+    merged = first.copy().merge(second).merge(RunningStatistics())
+    assert merged.count == 100
+    assert merged.mean == pytest.approx(statistics.mean(values))
+    assert merged.variance() == pytest.approx(statistics.variance(values))
+    assert (merged.min, merged.max) == (1, 100)
+    assert first.count == 30
+
+    empty = RunningStatistics().merge(first)
+    assert empty.mean == pytest.approx(first.mean)
+
+
+def test_running_statistics_not_enough_values():
+    running = RunningStatistics()
+    running.add(1)
+    with pytest.raises(ValueError):
+        running.variance()
@@ -1,9 +1,11 @@
 import statistics
+import threading
 from unittest import mock
 
 import pytest
 
 from tsperf.util import tictrack
+from tsperf.util.histogram import Histogram
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -14,9 +16,9 @@ def reset_tictoc_baseline():
 
 @pytest.fixture(scope="function", autouse=True)
 def reset_tictoc():
-    # to start each test function with a clean tictrack library we reset the dictionaries
-    tictrack.tic_toc = {}
-    tictrack.tic_toc_delta = {}
+    # to start each test function with a clean tictrack library we reset the result sets
+    tictrack.tic_toc.clear()
+    tictrack.tic_toc_delta.clear()
 
 
 @mock.patch("builtins.print", autospec=True)
@@ -486,3 +488,137 @@ def test_decorate_nested_functions():
     bar(1)
     assert "foo" in tictrack.tic_toc
     assert "bar" in tictrack.tic_toc
+
+
+def test_decorator_histogram():
+    @tictrack.timed_function()
+    def foo():
+        return 2
+
+    for _ in range(10):
+        foo()
+    assert isinstance(tictrack.tic_toc["foo"], Histogram)
+    assert len(tictrack.tic_toc["foo"]) == 10
+    assert len(tictrack.tic_toc_delta["foo"]) == 10
+    assert tictrack.timed_function_statistics("foo") == tictrack.tic_toc["foo"].mean()
+    assert tictrack.minimum(tictrack.tic_toc["foo"]) <= tictrack.maximum(tictrack.tic_toc["foo"])
+    assert len(tictrack.quantiles(tictrack.tic_toc["foo"], n=100)) == 99
+
+
+def test_decorator_list_mode():
+    @tictrack.timed_function()
+    def foo():
+        return 2
+
+    tictrack.list_mode = True
+    for _ in range(10):
+        foo()
+    tictrack.list_mode = False
+    assert isinstance(tictrack.tic_toc["foo"], list)
+    assert len(tictrack.tic_toc["foo"]) == 10
+    assert tictrack.timed_function_statistics("foo") == statistics.mean(tictrack.tic_toc["foo"])
+    assert tictrack.stdev(tictrack.tic_toc["foo"]) == statistics.stdev(tictrack.tic_toc["foo"])
+
+
+def test_result_sets_merged_across_threads():
+    @tictrack.timed_function()
+    def foo():
+        return 2
+
+    def worker():
+        for _ in range(1000):
+            foo()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(tictrack.tic_toc["foo"]) == 8000
+    assert len(tictrack.tic_toc_delta["foo"]) == 8000
+    assert list(tictrack.tic_toc.keys()) == ["foo"]
+
+
+def test_result_sets_of_ended_threads_retired():
+    """
+    The recorders of threads which have ended are folded into the retired recorder, so
+    they do not pile up, and their result sets are still counted.
+    """
+    result_sets = tictrack.ResultSets()
+
+    def worker():
+        for _ in range(10):
+            result_sets.record("foo", 0.5)
+
+    for i in range(1, 6):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert len(result_sets["foo"]) == 10 * i
+        assert len(result_sets._recorders) == 0
+
+    result_sets.record("foo", 0.5)
+    assert len(result_sets._all_recorders()) == 2
+    assert len(result_sets.snapshot(reset=True)["foo"]) == 51
+    assert "foo" not in result_sets
+
+
+def test_snapshot_delta_while_recording():
+    """
+    Taking and resetting the delta result sets while other threads are recording does not
+    lose any measurement.
+    """
+
+    @tictrack.timed_function()
+    def foo():
+        return 2
+
+    done = threading.Event()
+
+    def worker():
+        for _ in range(5000):
+            foo()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+
+    snapshots = []
+
+    def collect():
+        while not done.is_set():
+            snapshots.append(tictrack.snapshot_delta())
+
+    collector = threading.Thread(target=collect)
+    collector.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    collector.join()
+    snapshots.append(tictrack.snapshot_delta())
+
+    assert sum(len(snapshot["foo"]) for snapshot in snapshots if "foo" in snapshot) == 20000
+    assert "foo" not in tictrack.tic_toc_delta
+    assert len(tictrack.tic_toc["foo"]) == 20000
+
+
+def test_result_sets_merge():
+    """
+    Result sets recorded elsewhere, like in another process, are merged into the existing ones.
+    """
+
+    @tictrack.timed_function()
+    def foo():
+        return 2
+
+    foo()
+    remote = Histogram()
+    remote.record_many([0.5, 1.5])
+    tictrack.tic_toc.merge({"foo": remote, "bar": remote})
+
+    assert len(tictrack.tic_toc["foo"]) == 3
+    assert tictrack.maximum(tictrack.tic_toc["foo"]) == 1.5
+    assert len(tictrack.tic_toc["bar"]) == 2
+    # the merged result sets are copies
+    assert len(remote) == 2
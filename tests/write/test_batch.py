@@ -0,0 +1,41 @@
+from tsperf.write.model.batch import ColumnarBatch
+
+
+def test_columnar_batch_rows():
+    batch = ColumnarBatch({"plant": [1, 2], "value": [6.7, 6.8]})
+    assert len(batch) == 2
+    assert "plant" in batch
+    assert batch["value"] == [6.7, 6.8]
+    assert batch.keys() == ["plant", "value"]
+    assert batch.rows() == [{"plant": 1, "value": 6.7}, {"plant": 2, "value": 6.8}]
+
+
+def test_columnar_batch_empty():
+    batch = ColumnarBatch({})
+    assert len(batch) == 0
+    assert batch.rows() == []
+
+
+def test_columnar_batch_concat():
+    tags = [1, 2]
+    first = ColumnarBatch({"plant": tags, "value": [6.7, 6.8]})
+    second = ColumnarBatch({"plant": tags, "value": [6.9, 7.0]})
+
+    batch = ColumnarBatch.concat([first, second])
+    assert len(batch) == 4
+    assert batch["plant"] == [1, 2, 1, 2]
+    assert batch["value"] == [6.7, 6.8, 6.9, 7.0]
+
+    # shared columns are not modified
+    assert tags == [1, 2]
+    assert ColumnarBatch.concat([first]) is first
+
+
+def test_columnar_batch_concat_tag_values():
+    first = ColumnarBatch({"plant": [1], "value": [6.7]}, tag_values=[(1,)])
+    second = ColumnarBatch({"plant": [2], "value": [6.8]}, tag_values=[(2,)])
+    assert ColumnarBatch.concat([first, second]).tag_values == [(1,), (2,)]
+
+    # tag values are dropped if any batch lacks them
+    third = ColumnarBatch({"plant": [3], "value": [6.9]})
+    assert ColumnarBatch.concat([first, third]).tag_values is None
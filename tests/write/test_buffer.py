@@ -0,0 +1,87 @@
+import threading
+import time
+from queue import Empty, Full
+
+import pytest
+
+from tsperf.write.buffer import ValuesBuffer, estimate_row_bytes
+from tsperf.write.model.batch import ColumnarBatch
+
+
+def item(rows: int) -> dict:
+    return {"timestamps": [1] * rows, "batch": [{"plant": 1, "value": 6.7}] * rows}
+
+
+def test_values_buffer_counts_rows():
+    buffer = ValuesBuffer()
+    buffer.put(item(3))
+    buffer.put(item(2))
+    assert buffer.qsize() == 2
+    assert buffer.rows == 5
+    assert buffer.bytes == 5 * estimate_row_bytes(item(1)["batch"])
+
+    assert len(buffer.get_nowait()["batch"]) == 3
+    assert buffer.rows == 2
+    buffer.get_nowait()
+    assert buffer.rows == 0
+    assert buffer.bytes == 0
+    assert buffer.empty()
+
+
+def test_values_buffer_row_budget():
+    buffer = ValuesBuffer(max_rows=5)
+    # an item is admitted while the buffer is below its budget
+    buffer.put(item(4))
+    buffer.put(item(4))
+    assert buffer.rows == 8
+    assert buffer.full()
+    with pytest.raises(Full):
+        buffer.put(item(1), block=False)
+    with pytest.raises(Full):
+        buffer.put(item(1), timeout=0.01)
+
+
+def test_values_buffer_byte_budget():
+    row_bytes = estimate_row_bytes(item(1)["batch"])
+    buffer = ValuesBuffer(max_bytes=row_bytes * 10)
+    buffer.put(item(10))
+    assert buffer.full()
+    buffer.get_nowait()
+    assert not buffer.full()
+
+
+def test_values_buffer_backpressure():
+    """
+    A producer is blocked while the buffer is full, and the stall time is reported.
+    """
+    stalls = []
+    buffer = ValuesBuffer(max_rows=2, on_stall=stalls.append)
+    buffer.put(item(2))
+
+    producer = threading.Thread(target=buffer.put, args=(item(2),))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive()
+    assert buffer.qsize() == 1
+
+    buffer.get()
+    producer.join(timeout=1)
+    assert not producer.is_alive()
+    assert buffer.rows == 2
+    assert len(stalls) == 1
+    assert stalls[0] >= 0.04
+
+
+def test_values_buffer_plain_batch():
+    buffer = ValuesBuffer(max_rows=10)
+    buffer.put([{"value": 1}, {"value": 2}])
+    assert buffer.rows == 2
+    assert buffer.get(timeout=0.01) == [{"value": 1}, {"value": 2}]
+    with pytest.raises(Empty):
+        buffer.get(timeout=0.01)
+
+
+def test_estimate_row_bytes_columnar():
+    batch = ColumnarBatch({"plant": [1, 2], "value": [6.7, 6.8]})
+    assert estimate_row_bytes(batch) > 0
+    assert estimate_row_bytes(ColumnarBatch({})) == 0
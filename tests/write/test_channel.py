@@ -8,7 +8,7 @@ from tests.write.schema import (
     tag_schema_list,
     tag_schema_plant100_line5_sensorId,
 )
-from tsperf.write.model.channel import Channel
+from tsperf.write.model.channel import Channel, ChannelGroup, ChannelLayout, derive_seed
 from tsperf.write.model.sensor import BoolSensor
 
 
@@ -141,3 +141,77 @@ def test_calculate_next_value_tag_list():
         payload = channel.calculate_next_value()
         assert payload["plant"] == results[i - 1][0]
         assert payload["line"] == results[i - 1][1]
+
+
+def test_channel_group_calculate_next_batch():
+    """
+    This function tests if the ChannelGroup computes the same tags as the Channel objects in columnar representation
+
+    Pre Condition: ChannelGroup created for 15 channels with `tag_schema_list` and `channel_schema_float1_bool1`
+
+    Test Case 1: the next batch of the channel group is calculated twice
+    -> batch contains 15 rows
+    -> tag columns match the tags of the channel payloads
+    -> tag columns are shared between batches
+    -> field columns are computed for each batch
+    """
+    # Pre Condition:
+    channels = [Channel(i, tag_schema_list, channel_schema_float1_bool1) for i in range(1, 16)]
+    group = ChannelGroup(channels)
+    assert len(group) == 15
+
+    # Test Case 1:
+    batch = group.calculate_next_batch()
+    next_batch = group.calculate_next_batch()
+    assert len(batch) == 15
+    assert batch.keys() == ["plant", "line", "sensor_id", "value", "button_press"]
+    assert batch["plant"] == [channel.calculate_next_value()["plant"] for channel in channels]
+    assert batch["line"] == [channel.calculate_next_value()["line"] for channel in channels]
+    assert batch["plant"] is next_batch["plant"]
+    assert batch["value"] is not next_batch["value"]
+    assert None not in batch["value"]
+    assert batch.tag_values == [channel.tag_values for channel in channels]
+
+
+def test_channel_layout_tag_values():
+    """
+    This function tests if a Channel precomputes its tag values using the layout compiled from the schema
+
+    Pre Condition: ChannelLayout compiled from `tag_schema_list` and `channel_schema_float1_bool1`
+
+    Test Case 1: Channel with identifier 4 is created with the shared layout
+    -> layout holds tag keys and field keys in schema order
+    -> tag values are computed once and match the payload of the channel
+    """
+    # Pre Condition:
+    layout = ChannelLayout(tag_schema_list, channel_schema_float1_bool1)
+    assert layout.tag_keys == ("plant", "line", "sensor_id")
+    assert layout.field_keys == ("value", "button_press")
+
+    # Test Case 1:
+    channel = Channel(4, tag_schema_list, channel_schema_float1_bool1, layout=layout)
+    assert channel.layout is layout
+    payload = channel.calculate_next_value()
+    assert channel.tag_values == tuple(payload[key] for key in layout.tag_keys)
+
+
+def test_channel_seed():
+    """
+    Channels with the same seed and id produce the same values, independently of
+    other channels, while channels with different ids use different streams.
+    """
+    first = Channel(1, tag_schema_plant100_line5_sensorId, channel_schema_float1_bool1, seed=42)
+    other = Channel(2, tag_schema_plant100_line5_sensorId, channel_schema_float1_bool1, seed=42)
+    second = Channel(1, tag_schema_plant100_line5_sensorId, channel_schema_float1_bool1, seed=42)
+
+    first_values = [first.calculate_next_value() for _ in range(100)]
+    other_values = [other.calculate_next_value() for _ in range(100)]
+    assert first_values == [second.calculate_next_value() for _ in range(100)]
+    assert [row["value"] for row in first_values] != [row["value"] for row in other_values]
+
+
+def test_derive_seed():
+    assert derive_seed(42, 1, 0) == derive_seed(42, 1, 0)
+    assert derive_seed(42, 1, 0) != derive_seed(42, 1, 1)
+    assert derive_seed(42, 1, 0) != derive_seed(42, 2, 0)
+    assert derive_seed(42, 1, 0) != derive_seed(43, 1, 0)
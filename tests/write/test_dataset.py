@@ -0,0 +1,62 @@
+import pytest
+
+from tests.write.schema import channel_schema_float1_bool1, tag_schema_list
+from tsperf.write.dataset import ALIGNMENT, Dataset, DatasetWriter
+from tsperf.write.model.channel import Channel, ChannelGroup, ChannelLayout
+
+schema = {"test": {"tags": tag_schema_list, "fields": channel_schema_float1_bool1}}
+
+
+def create_group(count: int) -> ChannelGroup:
+    layout = ChannelLayout(tag_schema_list, channel_schema_float1_bool1)
+    return ChannelGroup(
+        Channel(i, tag_schema_list, channel_schema_float1_bool1, layout=layout) for i in range(1, count + 1)
+    )
+
+
+def test_dataset_roundtrip(tmp_path):
+    path = tmp_path / "dataset.bin"
+    group = create_group(4)
+    writer = DatasetWriter(path, schema, group, ticks=3)
+    batches = []
+    for tick in range(3):
+        batch = group.calculate_next_batch()
+        batches.append(batch)
+        writer.write_tick(1000 * tick, batch)
+    writer.close()
+    assert path.stat().st_size == writer.size
+
+    dataset = Dataset.open(path)
+    assert dataset.schema == schema
+    assert (dataset.id_start, dataset.id_end, dataset.ticks, len(dataset)) == (1, 4, 3, 4)
+    assert dataset.tag_values == group.tag_values
+    assert dataset.header["timestamps"] % ALIGNMENT == 0
+
+    ticks = list(dataset.iter_ticks())
+    assert [timestamp for timestamp, _ in ticks] == [0, 1000, 2000]
+    for (_, batch), expected in zip(ticks, batches):
+        assert batch.columns == expected.columns
+        assert batch.tag_values == expected.tag_values
+        assert isinstance(batch["button_press"][0], bool)
+        assert isinstance(batch["value"][0], float)
+
+
+def test_dataset_is_byte_identical_on_replay(tmp_path):
+    path = tmp_path / "dataset.bin"
+    group = create_group(2)
+    writer = DatasetWriter(path, schema, group, ticks=2)
+    for tick in range(2):
+        writer.write_tick(tick, group.calculate_next_batch())
+    writer.close()
+
+    first = [batch.rows() for _, batch in Dataset.open(path).iter_ticks()]
+    second = [batch.rows() for _, batch in Dataset.open(path).iter_ticks()]
+    assert first == second
+
+
+def test_dataset_open_invalid(tmp_path):
+    path = tmp_path / "dataset.bin"
+    path.write_bytes(b"foobar" * 10)
+    with pytest.raises(ValueError) as ex:
+        Dataset.open(path)
+    assert ex.match("Not a tsperf dataset")
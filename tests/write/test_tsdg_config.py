@@ -9,7 +9,7 @@ import tsperf.cli
 from tsperf.model.interface import DatabaseInterfaceType
 from tsperf.util.common import to_list
 from tsperf.write.config import DataGeneratorConfig
-from tsperf.write.model import IngestMode
+from tsperf.write.model import IngestMode, InsertEngine
 
 
 def mkconfig(cli_more_args=None):
@@ -106,6 +106,11 @@ def test_config_id_end_environ(config_environ):
     assert config_environ.id_end == 50
 
 
+@pytest.mark.parametrize("env_vars", ["GENERATOR_PROCESSES=4"])
+def test_config_generator_processes_environ(config_environ):
+    assert config_environ.generator_processes == 4
+
+
 @pytest.mark.parametrize("env_vars", ["INGEST_MODE=consecutive"])
 def test_config_ingest_mode_consecutive_environ(config_environ):
     assert config_environ.ingest_mode == IngestMode.CONSECUTIVE
@@ -116,6 +121,28 @@ def test_config_ingest_mode_fast_environ(config_environ):
     assert config_environ.ingest_mode == IngestMode.FAST
 
 
+@pytest.mark.parametrize("env_vars", [["INGEST_MODE=rate", "INGEST_RATE=5000"]])
+def test_config_ingest_mode_rate_environ(config_environ):
+    assert config_environ.ingest_mode == IngestMode.RATE
+    assert config_environ.ingest_rate == 5000
+
+
+@pytest.mark.parametrize("env_vars", [["QUEUE_MAX_ROWS=5000", "QUEUE_MAX_BYTES=1000000"]])
+def test_config_queue_budget_environ(config_environ):
+    assert config_environ.queue_max_rows == 5000
+    assert config_environ.queue_max_bytes == 1000000
+
+
+@pytest.mark.parametrize("env_vars", ["INSERT_ENGINE=asyncio"])
+def test_config_insert_engine_environ(config_environ):
+    assert config_environ.insert_engine == InsertEngine.ASYNCIO
+
+
+@pytest.mark.parametrize("env_vars", ["SEED=42"])
+def test_config_seed_environ(config_environ):
+    assert config_environ.seed == 42
+
+
 @pytest.mark.parametrize("env_vars", ["INGEST_SIZE=1000"])
 def test_config_ingest_size_environ(config_environ):
     assert config_environ.ingest_size == 1000
@@ -184,6 +211,11 @@ def test_config_replicas_environ(config_environ):
     assert config_environ.replicas == 2
 
 
+@pytest.mark.parametrize("env_vars", ["TIMESCALEDB_PGCOPY_CONNECTIONS=4"])
+def test_config_timescaledb_pgcopy_connections_environ(config_environ):
+    assert config_environ.timescaledb_pgcopy_connections == 4
+
+
 @pytest.mark.parametrize("env_vars", ["INFLUXDB_ORGANIZATION=testOrganization"])
 def test_config_influxdb_organization_environ(config_environ):
     assert config_environ.influxdb_organization == "testOrganization"
@@ -337,6 +369,16 @@ def test_validate_replicas_invalid(mock_isfile):
     assert "REPLICAS" in config.invalid_configs[0]
 
 
+@mock.patch("os.path.isfile")
+def test_validate_timescaledb_pgcopy_connections_invalid(mock_isfile):
+    mock_isfile.return_value = True
+    config = mkconfig()
+    config.timescaledb_pgcopy_connections = 0
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "TIMESCALEDB_PGCOPY_CONNECTIONS" in config.invalid_configs[0]
+
+
 @mock.patch("os.path.isfile")
 def test_validate_prometheus_port_invalid(mock_isfile):
     mock_isfile.return_value = True
@@ -361,6 +403,65 @@ def test_validate_concurrency_invalid(mock_isfile):
     assert "CONCURRENCY" in config.invalid_configs[0]
 
 
+@mock.patch("os.path.isfile")
+def test_validate_generator_processes_invalid(mock_isfile):
+    mock_isfile.return_value = True
+    config = mkconfig()
+    config.generator_processes = 0
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "GENERATOR_PROCESSES" in config.invalid_configs[0]
+
+    config = mkconfig(["--ingest-mode=consecutive", "--generator-processes=2"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "GENERATOR_PROCESSES" in config.invalid_configs[0]
+
+
+@mock.patch("os.path.isfile")
+def test_validate_ingest_rate_invalid(mock_isfile):
+    mock_isfile.return_value = True
+    config = mkconfig(["--ingest-rate=-1"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "INGEST_RATE" in config.invalid_configs[0]
+
+    config = mkconfig(["--ingest-mode=rate"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "INGEST_RATE" in config.invalid_configs[0]
+
+    config = mkconfig(["--ingest-mode=rate", "--ingest-rate=1000", "--generator-processes=2"])
+    assert config.validate_config()
+
+
+@mock.patch("os.path.isfile")
+def test_validate_queue_budget_invalid(mock_isfile):
+    mock_isfile.return_value = True
+    config = mkconfig(["--queue-max-rows=-1", "--queue-max-bytes=-1"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 2
+    assert "QUEUE_MAX_ROWS" in config.invalid_configs[0]
+    assert "QUEUE_MAX_BYTES" in config.invalid_configs[1]
+
+
+@mock.patch("os.path.isfile")
+def test_validate_insert_engine_invalid(mock_isfile):
+    mock_isfile.return_value = True
+    config = mkconfig(["--insert-engine=asyncio"])
+    assert config.validate_config()
+
+    config = mkconfig(["--insert-engine=asyncio", "--ingest-mode=consecutive"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "INSERT_ENGINE" in config.invalid_configs[0]
+
+    config = mkconfig(["--insert-engine=asyncio", "--adapter=mongodb"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "INSERT_ENGINE" in config.invalid_configs[0]
+
+
 @mock.patch("os.path.isfile")
 def test_load_args(mock_isfile):
     mock_isfile.return_value = True
@@ -396,3 +497,23 @@ def test_config_defaults_influxdb(mock_isfile):
     config.adapter = DatabaseInterfaceType.InfluxDB
     assert config.validate_config()
     assert config.address == "http://localhost:8086/"
+
+
+@mock.patch("os.path.isfile")
+def test_validate_replay_invalid(mock_isfile, tmp_path):
+    mock_isfile.return_value = True
+    dataset_path = tmp_path / "dataset.bin"
+    dataset_path.touch()
+    config = mkconfig([f"--replay={dataset_path}"])
+    assert config.validate_config()
+    assert config.replay == str(dataset_path)
+
+    config = mkconfig([f"--replay={dataset_path}", "--ingest-mode=consecutive"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "REPLAY" in config.invalid_configs[0]
+
+    config = mkconfig([f"--replay={dataset_path}", "--generator-processes=2"])
+    assert not config.validate_config()
+    assert len(config.invalid_configs) == 1
+    assert "REPLAY" in config.invalid_configs[0]
@@ -1,17 +1,26 @@
+import asyncio
+import dataclasses
+import json
 import time
 from pathlib import Path
-from queue import Empty
+from queue import Empty, Queue
+from threading import Thread
 from unittest import mock
 
 import pytest
+from prometheus_client import REGISTRY
 
 import tsperf
+from tests.write.schema import test_schema1
 from tsperf.engine import TsPerfEngine
 from tsperf.model.interface import DatabaseInterfaceType
 from tsperf.write import core as dg
 from tsperf.write.config import DataGeneratorConfig
 from tsperf.write.core import load_schema
+from tsperf.write.dataset import Dataset
 from tsperf.write.model import IngestMode
+from tsperf.write.model.batch import ColumnarBatch
+from tsperf.write.model.channel import Channel, ChannelGroup
 
 
 @pytest.fixture(scope="function")
@@ -20,6 +29,13 @@ def config():
     return config
 
 
+def drain(queue: Queue) -> list:
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
 def start_engine(config, adapter):
     config.adapter = adapter
     engine = TsPerfEngine(config=config)
@@ -105,6 +121,176 @@ def test_get_next_value_ingest():
     assert values["batch"][0] == 1
 
 
+def test_split_id_range():
+    assert dg.split_id_range(1, 10, 1) == [(1, 10)]
+    assert dg.split_id_range(1, 10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert dg.split_id_range(0, 1, 4) == [(0, 0), (1, 1)]
+
+
+def test_generator_process_shards_share_timestamps():
+    """
+    Generating the channel id range in two shards yields the same timestamps
+    per tick as generating it at once.
+    """
+    config = DataGeneratorConfig(
+        adapter=DatabaseInterfaceType.Dummy,
+        id_start=1,
+        id_end=4,
+        ingest_size=3,
+        timestamp_start=1586327807.0,
+    )
+
+    def generate(id_start, id_end):
+        values_queue = Queue()
+        shard_config = dataclasses.replace(config, id_start=id_start, id_end=id_end)
+        dg.generator_process(shard_config, test_schema1, values_queue)
+        items = []
+        while True:
+            item = values_queue.get_nowait()
+            if item is None:
+                break
+            items.append(item)
+        return items
+
+    single = generate(1, 4)
+    shards = [generate(id_start, id_end) for id_start, id_end in dg.split_id_range(1, 4, 2)]
+
+    assert len(single) == 3
+    for tick, values in enumerate(single):
+        assert len(values["batch"]) == 4
+        for shard in shards:
+            assert len(shard[tick]["batch"]) == 2
+            assert shard[tick]["timestamps"][0] == values["timestamps"][0]
+    assert [batch["sensor_id"] for shard in shards for batch in shard[0]["batch"]] == [1, 2, 3, 4]
+
+
+def test_generator_process_shards_seed():
+    """
+    With a seed, generating the channel id range in two shards yields the same values
+    as generating it at once.
+    """
+    config = DataGeneratorConfig(
+        adapter=DatabaseInterfaceType.Dummy,
+        id_start=1,
+        id_end=4,
+        ingest_size=5,
+        timestamp_start=1586327807.0,
+        seed=42,
+    )
+
+    def generate(id_start, id_end):
+        values_queue = Queue()
+        shard_config = dataclasses.replace(config, id_start=id_start, id_end=id_end)
+        dg.generator_process(shard_config, test_schema1, values_queue)
+        return list(iter(values_queue.get_nowait, None))
+
+    single = generate(1, 4)
+    shards = [generate(id_start, id_end) for id_start, id_end in dg.split_id_range(1, 4, 2)]
+    for tick, values in enumerate(single):
+        assert values["batch"] == shards[0][tick]["batch"] + shards[1][tick]["batch"]
+    assert single == generate(1, 4)
+
+
+def test_stoppable_queue_gives_up_when_stopped():
+    """
+    A generator process blocked on a full values queue gives up once it is stopped.
+    """
+    values_queue = Queue(maxsize=1)
+    stop_event = mock.Mock()
+    stop_event.is_set.side_effect = [False, False, True]
+    queue = dg.StoppableQueue(values_queue, stop_event)
+    assert queue.put(1) is True
+    assert queue.put(2) is False
+    assert drain(values_queue) == [1]
+
+
+def test_check_generator_processes():
+    """
+    A generator process which exited abnormally, e.g. killed by the OOM killer, is reported.
+    """
+    alive = mock.Mock(exitcode=None, is_alive=mock.Mock(return_value=True))
+    killed = mock.Mock(exitcode=-9, is_alive=mock.Mock(return_value=False))
+    finished = mock.Mock(exitcode=0, is_alive=mock.Mock(return_value=False))
+    dg.check_generator_processes([alive, finished], Queue())
+    with pytest.raises(RuntimeError, match="exited with code -9"):
+        dg.check_generator_processes([alive, killed], Queue())
+    with pytest.raises(RuntimeError, match="without finishing"):
+        dg.check_generator_processes([finished], Queue())
+
+
+def test_run_generator_processes_interrupted(config):
+    """
+    Stopping the parent while endless generator processes block on the full values
+    queue does not hang.
+    """
+    config.id_end = 10
+    config.ingest_size = 0
+    config.generator_processes = 2
+    dg.config = config
+    dg.schema = test_schema1
+    errors = []
+
+    def put(values):
+        # give the generator processes time to fill up the values queue
+        time.sleep(1)
+        raise KeyboardInterrupt()
+
+    values_queue = mock.Mock()
+    values_queue.put.side_effect = put
+
+    def run():
+        try:
+            dg.run_generator_processes()
+        except BaseException as e:
+            errors.append(e)
+
+    with mock.patch.object(dg, "current_values_queue", values_queue):
+        thread = Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=60)
+    assert not thread.is_alive()
+    assert isinstance(errors[0], KeyboardInterrupt)
+    dg.generator_stop = None
+
+
+def test_generate_and_replay(tmp_path):
+    """
+    A generated dataset is replayed with the timestamps and values of each tick.
+    """
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(test_schema1))
+    dataset_path = tmp_path / "dataset.bin"
+    config = DataGeneratorConfig(
+        adapter=None,
+        schema=str(schema_path),
+        id_start=1,
+        id_end=4,
+        ingest_size=3,
+        timestamp_start=1586327807.0,
+    )
+    dg.generate(config, str(dataset_path))
+
+    dataset = Dataset.open(dataset_path)
+    assert dataset.schema == test_schema1
+    assert dataset.ticks == 3
+    assert len(dataset) == 4
+
+    dg.config = dataclasses.replace(config, columnar=False)
+    dg.replay_values(dataset)
+    items = drain(dg.current_values_queue)
+    assert len(items) == 3
+    assert items[0]["timestamps"] == [1586327807500] * 4
+    assert items[2]["timestamps"] == [1586327808500] * 4
+    assert [row["sensor_id"] for row in items[0]["batch"]] == [1, 2, 3, 4]
+    assert set(items[0]["batch"][0].keys()) == {"plant", "line", "sensor_id", "value", "button_press"}
+
+    dg.config = dataclasses.replace(config, columnar=True)
+    dg.replay_values(dataset)
+    columnar_items = drain(dg.current_values_queue)
+    assert isinstance(columnar_items[0]["batch"], ColumnarBatch)
+    assert columnar_items[1]["batch"].rows() == items[1]["batch"]
+
+
 def test_get_next_value_continuous():
     dg.config.ingest_mode = 0
 
@@ -134,7 +320,7 @@ def test_log_statistics_interval(mock_log, mock_tictrack):
     dg.statistics_logger(time.time() - 2)
     mock_log.info.assert_not_called()
     # output when everything is ok
-    mock_tictrack.tic_toc_delta = {"foo": [1, 2, 3, 4, 5]}
+    mock_tictrack.snapshot_delta.return_value = {"foo": [1, 2, 3, 4, 5]}
     dg.statistics_logger(time.time() - 2)
     mock_log.info.assert_called()
 
@@ -175,10 +361,39 @@ def test_get_insert_values():
     assert tsperf.write.model.metrics.c_values_queue_was_empty._value.get() == 2
 
 
+def test_get_insert_values_columnar():
+    dg.current_values_queue.put({"timestamps": [1, 1], "batch": ColumnarBatch({"plant": [1, 2], "value": [6.7, 6.8]})})
+    dg.current_values_queue.put({"timestamps": [2, 2], "batch": ColumnarBatch({"plant": [1, 2], "value": [6.9, 7.0]})})
+    batch, timestamps = dg.get_insert_values(4)
+    assert isinstance(batch, ColumnarBatch)
+    assert len(batch) == 4
+    assert batch["value"] == [6.7, 6.8, 6.9, 7.0]
+    assert timestamps == [1, 1, 2, 2]
+
+
+def test_get_next_value_columnar(config):
+    dg.config = config
+    channels = {1: Channel(1, {"plant": 2}, {})}
+    dg.get_next_value(ChannelGroup(channels.values()))
+    values = dg.current_values_queue.get_nowait()
+    assert isinstance(values["batch"], ColumnarBatch)
+    assert values["batch"]["plant"] == [0]
+    assert len(values["timestamps"]) == 1
+
+
+@mock.patch("tsperf.write.core.logger", autospec=True)
+def test_do_insert_columnar(mock_log):
+    db_writer = mock.MagicMock()
+    batch = ColumnarBatch({"plant": [1]})
+    dg.do_insert(db_writer, [1], batch)
+    db_writer.insert_columnar.assert_called_once_with([1], batch)
+    db_writer.insert_stmt.assert_not_called()
+
+
 @mock.patch("tsperf.write.core.engine", autospec=True)
 def test_insert_routine_auto_batch_mode(mock_engine):
     # Immediately signal stop to not run indefinitely.
-    dg.stop_queue.put(True)
+    dg.stop_event.set()
     config = DataGeneratorConfig(
         adapter=DatabaseInterfaceType.Dummy,
         ingest_mode=IngestMode.FAST,
@@ -197,12 +412,120 @@ def test_insert_routine_auto_batch_mode(mock_engine):
     dg.insert_routine()
     mock_db_writer.insert_stmt.assert_called()
     mock_db_writer.close_connection.assert_called_once()
-    dg.stop_queue.get()  # resetting the stop queue
+    dg.stop_event.clear()  # resetting the stop event
+
+
+@mock.patch("tsperf.write.core.engine", autospec=True)
+def test_insert_routine_rate_limited(mock_engine, config):
+    dg.stop_event.set()  # we signal stop to not run indefinitely
+    config.batch_size = 2
+    config.ingest_mode = IngestMode.RATE
+    dg.config = config
+    dg.rate_limiter = mock.MagicMock()
+    dg.rate_limiter.acquire.return_value = 0.25
+
+    mock_db_writer = mock.MagicMock()
+    mock_engine.create_adapter.return_value = mock_db_writer
+
+    dg.current_values_queue.put({"timestamps": [1, 1], "batch": [1, 2]})
+    try:
+        dg.insert_routine()
+    finally:
+        limiter = dg.rate_limiter
+        dg.rate_limiter = None
+        dg.stop_event.clear()  # resetting the stop event
+    limiter.acquire.assert_called_once_with(2)
+    mock_db_writer.insert_stmt.assert_called_once()
+    mock_db_writer.set_batch_size.assert_called()
+    assert tsperf.write.model.metrics.g_schedule_lag._value.get() == 0.25
+
+
+@mock.patch("tsperf.write.core.engine", autospec=True)
+def test_async_insert_routine(mock_engine, config):
+    dg.stop_event.set()  # we signal stop to not run indefinitely
+    config.concurrency = 1
+    config.batch_size = 100
+    dg.config = config
+    batch_size = dg.create_batch_size_automator().get_next_batch_size()
+
+    mock_db_writer = mock.AsyncMock()
+    mock_db_writer.set_batch_size = mock.Mock()
+    mock_engine.create_async_adapter.return_value = mock_db_writer
+
+    # populate current values
+    dg.current_values_queue.put({"timestamps": [1, 1], "batch": [1, 2]})
+    try:
+        asyncio.run(dg.run_async_writers())
+    finally:
+        dg.stop_event.clear()  # resetting the stop event
+    mock_db_writer.connect.assert_awaited_once()
+    mock_db_writer.insert_stmt.assert_awaited_once_with([1, 1], [1, 2])
+    mock_db_writer.set_batch_size.assert_called_with(batch_size)
+    mock_db_writer.close_connection.assert_awaited_once()
+
+
+@mock.patch("tsperf.write.core.engine", autospec=True)
+def test_async_writers_share_forwarder(mock_engine, config):
+    """
+    All asynchronous writers await the values of a single forwarder, and finish once
+    the values are exhausted.
+    """
+    config.concurrency = 3
+    dg.config = config
+
+    adapters = []
+
+    def create_async_adapter():
+        adapter = mock.AsyncMock()
+        adapter.set_batch_size = mock.Mock()
+        adapters.append(adapter)
+        return adapter
+
+    mock_engine.create_async_adapter.side_effect = create_async_adapter
+
+    for i in range(4):
+        dg.current_values_queue.put({"timestamps": [i, i], "batch": [i, i]})
+    dg.stop_event.set()
+    try:
+        asyncio.run(dg.run_async_writers())
+    finally:
+        dg.stop_event.clear()
+    assert len(adapters) == 3
+    batches = [call.args[1] for adapter in adapters for call in adapter.insert_stmt.await_args_list]
+    assert sorted(value for batch in batches for value in batch) == [0, 0, 1, 1, 2, 2, 3, 3]
+    for adapter in adapters:
+        adapter.close_connection.assert_awaited_once()
+
+
+@mock.patch("tsperf.write.core.logger", autospec=True)
+def test_do_insert_async(mock_log):
+    db_writer = mock.AsyncMock()
+    db_writer.insert_stmt.side_effect = Exception("mocked exception")
+    failed = tsperf.write.model.metrics.c_inserts_failed._value.get()
+    asyncio.run(dg.do_insert_async(db_writer, [1], [1]))
+    assert tsperf.write.model.metrics.c_inserts_failed._value.get() == failed + 1
+    mock_log.error.assert_called_once()
+
+
+@mock.patch("tsperf.write.core.logger", autospec=True)
+def test_report_rate(mock_log):
+    limiter = mock.MagicMock()
+    limiter.summary.return_value = {
+        "target_rate": 100,
+        "achieved_rate": 80.0,
+        "sustained": False,
+        "lag": 0.5,
+        "max_lag": 0.75,
+    }
+    assert dg.report_rate(limiter)["sustained"] is False
+    message = mock_log.info.call_args.args[0]
+    assert "NOT sustained" in message
+    assert "0.750s" in message
 
 
 @mock.patch("tsperf.write.core.engine", autospec=True)
 def test_insert_routine_fixed_batch_mode(mock_engine, config):
-    dg.stop_queue.put(True)  # we signal stop to not run indefinitely
+    dg.stop_event.set()  # we signal stop to not run indefinitely
 
     dg.config.batch_size = 5
     dg.config.ingest_mode = 1
@@ -219,15 +542,15 @@ def test_insert_routine_fixed_batch_mode(mock_engine, config):
     dg.insert_routine()
     mock_db_writer.insert_stmt.assert_called()
     mock_db_writer.close_connection.assert_called_once()
-    dg.stop_queue.get()  # resetting the stop queue
+    dg.stop_event.clear()  # resetting the stop event
 
 
 @mock.patch("tsperf.write.core.engine", autospec=True)
 @mock.patch("tsperf.write.core.current_values_queue", autospec=True)
 def test_insert_routine_empty_batch(mock_current_values_queue, mock_engine, config):
-    dg.stop_queue.put(True)  # we signal stop to not run indefinitely
+    dg.stop_event.set()  # we signal stop to not run indefinitely
     mock_current_values_queue.empty.side_effect = [False, True]
-    mock_current_values_queue.get_nowait.side_effect = Empty()
+    mock_current_values_queue.get.side_effect = Empty()
 
     config.batch_size = 5
     config.ingest_mode = 1
@@ -242,15 +565,15 @@ def test_insert_routine_empty_batch(mock_current_values_queue, mock_engine, conf
     dg.insert_routine()
     mock_db_writer.insert_stmt.assert_not_called()
     mock_db_writer.close_connection.assert_called_once()
-    dg.stop_queue.get()  # resetting the stop queue
+    dg.stop_event.clear()  # resetting the stop event
 
 
 @mock.patch("tsperf.write.core.engine", autospec=True)
 @mock.patch("tsperf.write.core.current_values_queue", autospec=True)
 def test_consecutive_insert_queue_empty(mock_current_values_queue, mock_engine, config):
-    dg.stop_queue.put(True)  # we signal stop to not run indefinitely
+    dg.stop_event.set()  # we signal stop to not run indefinitely
     mock_current_values_queue.empty.side_effect = [False, True]
-    mock_current_values_queue.get_nowait.side_effect = Empty()
+    mock_current_values_queue.get.side_effect = Empty()
 
     config.ingest_mode = 0
     config.id_start = 0
@@ -264,13 +587,13 @@ def test_consecutive_insert_queue_empty(mock_current_values_queue, mock_engine,
     dg.consecutive_insert()
     mock_db_writer.insert_stmt.assert_not_called()
     mock_db_writer.close_connection.assert_called_once()
-    dg.stop_queue.get()  # resetting the stop queue
-    dg.insert_finished_queue.get()
+    dg.stop_event.clear()  # resetting the stop event
+    assert drain(dg.inserted_values_queue)[-1] is None  # insert finished sentinel
 
 
 @mock.patch("tsperf.write.core.engine", autospec=True)
 def test_consecutive_insert(mock_engine, config):
-    dg.stop_queue.put(True)  # we signal stop to not run indefinitely
+    dg.stop_event.set()  # we signal stop to not run indefinitely
 
     config.ingest_mode = 0
     config.id_start = 0
@@ -287,17 +610,70 @@ def test_consecutive_insert(mock_engine, config):
     dg.consecutive_insert()
     mock_db_writer.insert_stmt.assert_called()
     mock_db_writer.close_connection.assert_called_once()
-    dg.stop_queue.get()  # resetting the stop queue
-    dg.insert_finished_queue.get()
+    dg.stop_event.clear()  # resetting the stop event
+    assert drain(dg.inserted_values_queue)[-1] is None  # insert finished sentinel
+
+
+def test_statistics_thread_stops_immediately(config):
+    config.statistics_interval = 60
+    dg.config = config
+    dg.stop_event.set()
+    start = time.monotonic()
+    try:
+        dg.statistics_thread()
+    finally:
+        dg.stop_event.clear()  # resetting the stop event
+    assert time.monotonic() - start < 1
+
+
+def test_prometheus_insert_percentage(config):
+    config.ingest_size = 10
+    config.id_start = 1
+    config.id_end = 10
+    dg.config = config
+    drain(dg.inserted_values_queue)
+    inserted = tsperf.write.model.metrics.c_inserted_values._value.get()
+    dg.inserted_values_queue.put(5)
+    dg.inserted_values_queue.put(None)
+    dg.prometheus_insert_percentage()
+    assert tsperf.write.model.metrics.c_inserted_values._value.get() == inserted + 5
+    assert dg.inserted_values_queue.empty()
+
+
+def test_wait_for_thread_reraises():
+    def fail():
+        raise ValueError("mocked exception")
+
+    errors = Queue()
+    thread = Thread(target=dg.report_exceptions(fail, errors))
+    thread.start()
+    with pytest.raises(ValueError, match="mocked exception"):
+        dg.wait_for_thread(thread, errors)
+
+    thread = Thread(target=dg.report_exceptions(lambda: None, errors))
+    thread.start()
+    dg.wait_for_thread(thread, errors)
+    assert not thread.is_alive()
+
+
+def test_create_values_queue(config):
+    config.queue_max_rows = 10
+    config.queue_max_bytes = 0
+    dg.config = config
+    values_queue = dg.create_values_queue()
+    assert values_queue.max_rows == 10
+    values_queue.put({"timestamps": [1] * 10, "batch": [{"value": 1}] * 10})
+    assert values_queue.full()
+    assert REGISTRY.get_sample_value("tsperf_values_queue_rows") == 10
 
 
 def test_stop_process():
     # default stop process returns false
     assert not dg.stop_process()
-    # if stop_queue is not empty it returns true
-    dg.stop_queue.put(1)
+    # if stop_event is set it returns true
+    dg.stop_event.set()
     assert dg.stop_process()
-    dg.stop_queue.get()  # resetting the stop queue
+    dg.stop_event.clear()  # resetting the stop event
 
 
 def test_load_schema_from_file_valid():
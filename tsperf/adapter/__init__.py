@@ -18,18 +18,33 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
-from typing import Dict
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
 
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.model.interface import AbstractAsyncDatabaseInterface, AbstractDatabaseInterface, DatabaseInterfaceType
 
 
 class AdapterManager:
     registry: Dict[DatabaseInterfaceType, object] = {}
+    async_registry: Dict[DatabaseInterfaceType, object] = {}
 
     @classmethod
     def register(cls, interface, factory):
         cls.registry[interface] = factory
 
+    @classmethod
+    def register_async(cls, interface, factory):
+        cls.async_registry[interface] = factory
+
+    @classmethod
+    def supports_async(cls, interface) -> bool:
+        return interface in cls.async_registry
+
+    @classmethod
+    def create_async(cls, interface, config, schema=None):
+        factory: AbstractAsyncDatabaseInterface = cls.async_registry[interface]
+        return factory(config, schema)
+
     @classmethod
     def get(cls, interface):
         factory: AbstractDatabaseInterface = cls.registry[interface]
@@ -41,6 +56,85 @@ class AdapterManager:
         return factory(config, schema)
 
 
+class TagFragmentCache(dict):
+    """
+    Cache serialized tag fragments, keyed by the tag value tuple of a channel.
+
+    Tag values of a channel never change, so each distinct tag tuple only needs
+    to be serialized once by the given `serialize` function.
+    """
+
+    def __init__(self, serialize: Callable[[tuple], object]):
+        super().__init__()
+        self.serialize = serialize
+
+    def __missing__(self, tag_values: tuple):
+        fragment = self[tag_values] = self.serialize(tag_values)
+        return fragment
+
+
+class TimestampCache(dict):
+    """
+    Cache values derived from a timestamp, keyed by the timestamp in milliseconds.
+
+    In FAST mode, all rows of a tick share one timestamp, so each distinct timestamp
+    only needs to be converted once by the given `convert` function. Timestamps keep
+    increasing, so the cache is emptied once it holds `capacity` entries.
+    """
+
+    def __init__(self, convert: Callable[[int], object], capacity: int = 4096):
+        super().__init__()
+        self.convert = convert
+        self.capacity = capacity
+
+    def __missing__(self, timestamp: int):
+        if len(self) >= self.capacity:
+            self.clear()
+        value = self[timestamp] = self.convert(timestamp)
+        return value
+
+
+class PreparedStatementCache(OrderedDict):
+    """
+    Cache prepared statements, keyed by the number of rows of a multi-row statement.
+
+    Statements are prepared by the given `prepare` function on first use, or added by the
+    caller, when they need to be prepared asynchronously. The batch size
+    automator tries many batch sizes, so only the `capacity` most recently used statements
+    are kept, the others are released by the given `deallocate` function.
+    """
+
+    def __init__(
+        self,
+        prepare: Optional[Callable[[int], object]] = None,
+        deallocate: Optional[Callable[[int], None]] = None,
+        capacity: int = 32,
+    ):
+        super().__init__()
+        self.prepare = prepare
+        self.deallocate = deallocate
+        self.capacity = capacity
+
+    def __getitem__(self, rows: int):
+        statement = super().__getitem__(rows)
+        self.move_to_end(rows)
+        return statement
+
+    def __missing__(self, rows: int):
+        if self.prepare is None:
+            raise KeyError(rows)
+        statement = self.prepare(rows)
+        self.add(rows, statement)
+        return statement
+
+    def add(self, rows: int, statement: object):
+        self[rows] = statement
+        while len(self) > self.capacity:
+            evicted, _ = self.popitem(last=False)
+            if self.deallocate is not None:
+                self.deallocate(evicted)
+
+
 # ruff: noqa: F401
 def load_adapters():
     """
@@ -24,18 +24,31 @@ from typing import Dict, Optional, Union
 from crate import client
 
 from tsperf.adapter import AdapterManager
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.model.interface import (
+    AbstractAsyncDatabaseInterface,
+    AbstractDatabaseInterface,
+    DatabaseInterfaceType,
+    QueryProfile,
+)
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
+from tsperf.write.model.batch import ColumnarBatch
 
 logger = logging.getLogger(__name__)
 
+# Column types used by schemas, which are spelled differently by CrateDB. `FLOAT` is single
+# precision in CrateDB, while dynamic objects store floats as `DOUBLE`, so both layouts store
+# the same values.
+COLUMN_TYPES = {"BOOL": "BOOLEAN", "STRING": "TEXT", "FLOAT": "DOUBLE PRECISION"}
+
 
 class CrateDbAdapter(AbstractDatabaseInterface):
     default_address = "localhost:4200"
     default_username = "crate"
     default_query = "SELECT 1;"
+    paramstyle = "qmark"
+    typed_columns = False
 
     def __init__(
         self,
@@ -49,10 +62,19 @@ class CrateDbAdapter(AbstractDatabaseInterface):
         self.schema = schema
         self.table_name = (config.table, self._get_schema_table_name())[config.table is None or config.table == ""]
         self.partition = config.partition
+        self._setup_typed_columns(config)
 
         logger.info(f"Configuring CrateDB with {config.shards} shards and {config.replicas} replicas")
         self.shards = config.shards
         self.replicas = config.replicas
+        if self.typed_columns:
+            logger.info("Using table layout »typed columns«")
+        else:
+            logger.info("Using table layout »OBJECT(DYNAMIC)«")
+
+    def _setup_typed_columns(self, config: Union[DataGeneratorConfig, QueryTimerConfig]):
+        self.typed_columns = config.cratedb_typed_columns is not None and config.cratedb_typed_columns or False
+        self.columns = list(self._get_tags_and_fields().keys()) if self.typed_columns else []
 
     def close_connection(self):
         self.cursor.close()
@@ -64,9 +86,16 @@ class CrateDbAdapter(AbstractDatabaseInterface):
         self.cursor.execute(stmt)
 
         # Create table.
+        if self.typed_columns:
+            columns = ",\n".join(
+                f""" "{key}" {COLUMN_TYPES.get(value.upper(), value)}"""
+                for key, value in self._get_tags_and_fields().items()
+            )
+        else:
+            columns = """ "payload" OBJECT(DYNAMIC)"""
         stmt = f"""CREATE TABLE {self.table_name} ("ts" TIMESTAMP WITH TIME ZONE,
  "g_ts_{self.partition}" TIMESTAMP WITH TIME ZONE GENERATED ALWAYS AS date_trunc('{self.partition}', "ts"),
- "payload" OBJECT(DYNAMIC))
+{columns})
  CLUSTERED INTO {self.shards} SHARDS
  PARTITIONED BY ("g_ts_{self.partition}")
  WITH (number_of_replicas = {self.replicas})"""
@@ -75,16 +104,50 @@ class CrateDbAdapter(AbstractDatabaseInterface):
 
     @timed_function()
     def insert_stmt(self, timestamps: list, batch: list):
-        stmt = f"""INSERT INTO {self.table_name} (ts, payload) (SELECT col1, col2 FROM UNNEST(?,?))"""  # noqa: S608
-        self.cursor.execute(stmt, (timestamps, batch))
+        stmt = self._prepare_insert_stmt()
+        self.cursor.execute(stmt, self._get_insert_arguments(timestamps, batch))
 
     @timed_function()
-    def execute_query(self, query: str) -> list:
-        return self.run_query(query)
+    def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        if not self.typed_columns:
+            super().insert_columnar(timestamps, batch)
+            return
+        stmt = self._prepare_insert_stmt()
+        self.cursor.execute(stmt, self._get_insert_arguments_columnar(timestamps, batch))
+
+    def _prepare_insert_stmt(self) -> str:
+        if self.typed_columns:
+            columns = ", ".join(f'"{column}"' for column in self.columns)
+            placeholders = ",".join(["?"] * (len(self.columns) + 1))
+            return f"""INSERT INTO {self.table_name} (ts, {columns}) (SELECT * FROM UNNEST({placeholders}))"""  # noqa: S608
+        return f"""INSERT INTO {self.table_name} (ts, payload) (SELECT col1, col2 FROM UNNEST(?,?))"""  # noqa: S608
+
+    def _get_insert_arguments(self, timestamps: list, batch: list) -> tuple:
+        """
+        With typed columns, the rows of a batch are transposed into one array per column.
+        """
+        if self.typed_columns:
+            return (timestamps, *([row[column] for row in batch] for column in self.columns))
+        return timestamps, batch
+
+    def _get_insert_arguments_columnar(self, timestamps: list, batch: ColumnarBatch) -> tuple:
+        return (timestamps, *(batch[column] for column in self.columns))
 
-    def run_query(self, query: str) -> list:
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+    @timed_function()
+    def execute_query(self, query: str, parameters: list = None) -> list:
+        return self.run_query(query, parameters)
+
+    def run_query(self, query: str, parameters: list = None) -> list:
+        profile = self.profile = QueryProfile()
+        with profile.phase("submit"):
+            if parameters is None:
+                self.cursor.execute(query)
+            else:
+                self.cursor.execute(query, parameters)
+        with profile.phase("fetch"):
+            result = self.cursor.fetchall()
+        profile.count(result)
+        return result
 
     def _get_schema_table_name(self) -> str:
         for key in self.schema.keys():
@@ -93,4 +156,54 @@ class CrateDbAdapter(AbstractDatabaseInterface):
         raise ValueError("Unable to determine table name")
 
 
+class CrateDbAsyncAdapter(AbstractAsyncDatabaseInterface, CrateDbAdapter):
+    """
+    Insert into CrateDB using its HTTP endpoint, with `aiohttp`.
+    """
+
+    def __init__(
+        self,
+        config: Union[DataGeneratorConfig, QueryTimerConfig],
+        schema: Optional[Dict] = None,
+    ):
+        import aiohttp
+
+        self.config = config
+        self.schema = schema
+        self.table_name = (config.table, self._get_schema_table_name())[config.table is None or config.table == ""]
+        self.partition = config.partition
+        self._setup_typed_columns(config)
+
+        address = config.address
+        if "://" not in address:
+            address = f"http://{address}"
+        self.url = f"{address.rstrip('/')}/_sql"
+        self.auth = config.username and aiohttp.BasicAuth(config.username, config.password or "") or None
+        self.session = None
+
+    async def connect(self):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(auth=self.auth)
+
+    async def close_connection(self):
+        await self.session.close()
+
+    async def insert_stmt(self, timestamps: list, batch: list):
+        await self._post_insert(list(self._get_insert_arguments(timestamps, batch)))
+
+    async def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        if not self.typed_columns:
+            await super().insert_columnar(timestamps, batch)
+            return
+        await self._post_insert(list(self._get_insert_arguments_columnar(timestamps, batch)))
+
+    async def _post_insert(self, arguments: list):
+        payload = {"stmt": self._prepare_insert_stmt(), "args": arguments}
+        async with self.session.post(self.url, json=payload) as response:
+            if response.status >= 400:
+                raise RuntimeError(f"Inserting into CrateDB failed: {await response.text()}")
+
+
 AdapterManager.register(interface=DatabaseInterfaceType.CrateDB, factory=CrateDbAdapter)
+AdapterManager.register_async(interface=DatabaseInterfaceType.CrateDB, factory=CrateDbAsyncAdapter)
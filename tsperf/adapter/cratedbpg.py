@@ -25,7 +25,7 @@ import psycopg2
 
 from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin
 from tsperf.adapter.cratedb import CrateDbAdapter
-from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.model.interface import DatabaseInterfaceType, QueryProfile
 from tsperf.read.config import QueryTimerConfig
 from tsperf.write.config import DataGeneratorConfig
 
@@ -36,6 +36,7 @@ class CrateDbPgWireAdapter(CrateDbAdapter, DatabaseInterfaceMixin):
     default_address = "localhost:5432"
     default_username = "crate"
     default_query = "SELECT 1;"
+    paramstyle = "pyformat"
 
     def __init__(
         self,
@@ -60,5 +61,18 @@ class CrateDbPgWireAdapter(CrateDbAdapter, DatabaseInterfaceMixin):
         self.shards = config.shards
         self.replicas = config.replicas
 
+    def run_query(self, query: str, parameters: dict = None) -> list:
+        profile = self.profile = QueryProfile()
+        with profile.phase("submit"):
+            if parameters is None:
+                self.cursor.execute(query)
+            else:
+                self.cursor.execute(query, parameters)
+        # psycopg2 receives the whole result in `execute`, and converts it in `fetchall`
+        with profile.phase("decode"):
+            result = self.cursor.fetchall()
+        profile.count(result)
+        return result
+
 
 AdapterManager.register(interface=DatabaseInterfaceType.CrateDBpg, factory=CrateDbPgWireAdapter)
@@ -22,7 +22,7 @@ import logging
 from typing import Dict, Optional, Union
 
 from tsperf.adapter import AdapterManager
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.model.interface import AbstractAsyncDatabaseInterface, AbstractDatabaseInterface, DatabaseInterfaceType
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
@@ -52,14 +52,33 @@ class DummyDbAdapter(AbstractDatabaseInterface):
         pass
 
     @timed_function()
-    def execute_query(self, query: str) -> list:
+    def insert_columnar(self, timestamps: list, batch):
         pass
 
-    def run_query(self, query: str) -> list:
+    @timed_function()
+    def execute_query(self, query: str, parameters: Union[list, dict] = None) -> list:
+        pass
+
+    def run_query(self, query: str, parameters: Union[list, dict] = None) -> list:
         pass
 
     def _get_schema_table_name(self) -> str:
         pass
 
 
+class DummyDbAsyncAdapter(AbstractAsyncDatabaseInterface, DummyDbAdapter):
+    async def connect(self):
+        pass
+
+    async def close_connection(self):
+        pass
+
+    async def insert_stmt(self, timestamps: list, batch: list):
+        pass
+
+    async def insert_columnar(self, timestamps: list, batch):
+        pass
+
+
 AdapterManager.register(interface=DatabaseInterfaceType.Dummy, factory=DummyDbAdapter)
+AdapterManager.register_async(interface=DatabaseInterfaceType.Dummy, factory=DummyDbAsyncAdapter)
@@ -22,20 +22,27 @@ import logging
 from datetime import datetime
 from typing import Dict, Optional, Tuple, Union
 
-from influxdb_client import Bucket, InfluxDBClient
+from influxdb_client import Bucket, InfluxDBClient, WritePrecision
 from influxdb_client.client.write_api import SYNCHRONOUS, Point
 
-from tsperf.adapter import AdapterManager
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.adapter import AdapterManager, TagFragmentCache
+from tsperf.model.interface import (
+    AbstractAsyncDatabaseInterface,
+    AbstractDatabaseInterface,
+    DatabaseInterfaceType,
+    QueryProfile,
+)
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
+from tsperf.write.model.batch import ColumnarBatch
 
 logger = logging.getLogger(__name__)
 
 
 class InfluxDbAdapter(AbstractDatabaseInterface):
     default_address = "http://localhost:8086/"
+    paramstyle = "flux"
 
     def __init__(
         self,
@@ -57,6 +64,7 @@ class InfluxDbAdapter(AbstractDatabaseInterface):
         self.query_api = self.client.query_api()
         self.organization = config.influxdb_organization
         self.schema = schema or {}
+        self.tag_fragments = TagFragmentCache(self._serialize_tag_set)
         self.bucket = None
 
         database_name = config.database
@@ -114,11 +122,53 @@ class InfluxDbAdapter(AbstractDatabaseInterface):
         return data
 
     @timed_function()
-    def execute_query(self, query: str) -> list:
-        return self.run_query(query)
+    def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        data = self._prepare_influx_lines(timestamps, batch)
+        self.write_api.write(
+            bucket=self.database_name, org=self.organization, record=data, write_precision=WritePrecision.MS
+        )
+
+    @timed_function()
+    def _prepare_influx_lines(self, timestamps: list, batch: ColumnarBatch) -> list:
+        """
+        Serialize the batch into InfluxDB line protocol, straight from its columns.
+        """
+        tags, fields = self._get_tags_and_fields()
+        tag_values = batch.tag_values
+        if tag_values is None:
+            tag_values = list(zip(*[batch[tag] for tag in tags]))
+        tag_sets = [self.tag_fragments[values] for values in tag_values]
+        field_sets = [[f"{_escape_key(field)}={_field_value(value)}" for value in batch[field]] for field in fields]
+        return [
+            f"{tag_set} {','.join(field_set)} {timestamp}"
+            for tag_set, field_set, timestamp in zip(tag_sets, zip(*field_sets), timestamps)
+        ]
 
-    def run_query(self, query: str) -> list:
-        return self.query_api.query(query, org=self.organization)
+    def _serialize_tag_set(self, tag_values: tuple) -> str:
+        """
+        Serialize the measurement and tag set of a line, e.g. `measurement,tag1=a,tag2=b`.
+        """
+        tags, _ = self._get_tags_and_fields()
+        measurement = _escape_measurement(self.database_name)
+        tag_set = "".join(f",{_escape_key(tag)}={_escape_key(str(value))}" for tag, value in zip(tags, tag_values))
+        return f"{measurement}{tag_set}"
+
+    @timed_function()
+    def execute_query(self, query: str, parameters: dict = None) -> list:
+        return self.run_query(query, parameters)
+
+    def run_query(self, query: str, parameters: dict = None) -> list:
+        profile = self.profile = QueryProfile()
+        # the client parses the response while receiving it
+        with profile.phase("submit"):
+            if parameters is None:
+                result = self.query_api.query(query, org=self.organization)
+            else:
+                result = self.query_api.query(query, org=self.organization, params=parameters)
+        rows = sum(len(table.records) for table in result)
+        sample = next((table.records[0].values for table in result if table.records), None)  # noqa: PD011
+        profile.count_rows(rows, sample=sample)
+        return result
 
     def _get_tags_and_fields(self) -> Tuple[dict, dict]:
         key = self._get_schema_database_name()
@@ -141,4 +191,72 @@ class InfluxDbAdapter(AbstractDatabaseInterface):
         raise ValueError("Unable to determine database name")
 
 
+def _escape_measurement(value: str) -> str:
+    return value.replace(",", "\\,").replace(" ", "\\ ")
+
+
+def _escape_key(value: str) -> str:
+    return value.replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def _field_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value)
+    value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{value}"'
+
+
+class InfluxDbAsyncAdapter(AbstractAsyncDatabaseInterface, InfluxDbAdapter):
+    """
+    Insert into InfluxDB with the `InfluxDBClientAsync`, based on `aiohttp`.
+    """
+
+    def __init__(
+        self,
+        config: Union[DataGeneratorConfig, QueryTimerConfig],
+        schema: Optional[Dict] = None,
+    ):
+        import aiohttp  # noqa: F401
+
+        self.config = config
+        self.client = None
+        self.write_api = None
+        self.organization = config.influxdb_organization
+        self.schema = schema or {}
+        self.tag_fragments = TagFragmentCache(self._serialize_tag_set)
+
+        database_name = config.database
+        self.database_name = (database_name, self._get_schema_database_name())[
+            database_name is None or database_name == ""
+        ]
+
+    async def connect(self):
+        from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+
+        self.client = InfluxDBClientAsync(
+            url=self.config.address,
+            token=self.config.influxdb_token,
+            org=self.config.influxdb_organization,
+        )
+        self.write_api = self.client.write_api()
+
+    async def close_connection(self):
+        await self.client.close()
+
+    async def insert_stmt(self, timestamps: list, batch: list):
+        data = self._prepare_influx_stmt(timestamps, batch)
+        await self.write_api.write(bucket=self.database_name, org=self.organization, record=data)
+
+    async def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        data = self._prepare_influx_lines(timestamps, batch)
+        await self.write_api.write(
+            bucket=self.database_name, org=self.organization, record=data, write_precision=WritePrecision.MS
+        )
+
+
 AdapterManager.register(interface=DatabaseInterfaceType.InfluxDB, factory=InfluxDbAdapter)
+AdapterManager.register_async(interface=DatabaseInterfaceType.InfluxDB, factory=InfluxDbAsyncAdapter)
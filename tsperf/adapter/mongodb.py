@@ -18,6 +18,7 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
+import itertools
 import json
 import logging
 from datetime import datetime
@@ -26,7 +27,7 @@ from typing import Dict, Optional, Tuple, Union
 from pymongo import MongoClient
 
 from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType, QueryProfile
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
@@ -121,8 +122,15 @@ class MongoDbAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
             pass
         else:
             query = json.loads(query)
+        profile = self.profile = QueryProfile()
         cursor = self.collection.find(query).limit(10)
-        return list(cursor)
+        # the cursor is lazy, the first batch is requested with the first document
+        with profile.phase("submit"):
+            result = list(itertools.islice(cursor, 1))
+        with profile.phase("fetch"):
+            result.extend(cursor)
+        profile.count(result)
+        return result
 
     def _get_tags_and_fields(self) -> Tuple[dict, dict]:
         key = self._get_schema_collection_name()
@@ -23,7 +23,7 @@ from datetime import datetime
 from typing import Dict, Optional, Tuple, Union
 
 from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType, QueryProfile
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
@@ -36,6 +36,7 @@ class MsSQLDbAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
     default_username = "sa"
     default_password = "yayRirr3"  # noqa: S105
     default_query = "SELECT 1;"
+    paramstyle = "qmark"
 
     def __init__(
         self,
@@ -117,12 +118,17 @@ class MsSQLDbAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
         return stmt, params
 
     @timed_function()
-    def execute_query(self, query: str) -> list:
-        return self.run_query(query)
-
-    def run_query(self, query: str) -> list:
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+    def execute_query(self, query: str, parameters: list = None) -> list:
+        return self.run_query(query, parameters)
+
+    def run_query(self, query: str, parameters: list = None) -> list:
+        profile = self.profile = QueryProfile()
+        with profile.phase("submit"):
+            self.cursor.execute(query, *(parameters or []))
+        with profile.phase("fetch"):
+            result = self.cursor.fetchall()
+        profile.count(result)
+        return result
 
     def _get_tags_and_fields(self) -> dict:
         key = self._get_schema_table_name()
@@ -18,25 +18,138 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
-
+import io
+import logging
+import operator
 from datetime import datetime
-from typing import Dict, Optional, Union
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
 
 import psycopg2
 import psycopg2.extras
 from datetime_truncate import truncate
 
-from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.adapter import (
+    AdapterManager,
+    DatabaseInterfaceMixin,
+    PreparedStatementCache,
+    TagFragmentCache,
+    TimestampCache,
+)
+from tsperf.model.interface import (
+    AbstractAsyncDatabaseInterface,
+    AbstractDatabaseInterface,
+    DatabaseInterfaceType,
+    QueryProfile,
+)
 from tsperf.read.config import QueryTimerConfig
+from tsperf.util.pgbinary import BinaryCopyEncoder
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
+from tsperf.write.model.batch import ColumnarBatch
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedInsertMixin:
+    """
+    Insert batches with server-side prepared multi-row INSERT statements, binding the
+    values as parameters, so the server parses and plans each statement only once per
+    connection, instead of once per batch.
+
+    A statement inserts a fixed number of rows, the batch size announced by the batch
+    size automator. Statements for other sizes are prepared lazily and cached. Smaller
+    batches are split into powers of two, so only few statements are needed for them.
+
+    Used by the PostgreSQL and TimescaleDB adapters, which share the table layout.
+    """
+
+    # PostgreSQL binds at most 65535 parameters per statement.
+    max_parameters = 65535
+
+    def _setup_prepared(self, config: Union[DataGeneratorConfig, QueryTimerConfig], asynchronous: bool = False):
+        self.use_prepared = config.postgresql_prepared is not None and config.postgresql_prepared or False
+        self.batch_size = 0
+        self.insert_columns = ["ts", f"ts_{self.partition}", *self._get_tags_and_fields().keys()]
+        if asynchronous:
+            # Statements are prepared explicitly by `_prepare_insert_async`, instead of relying on
+            # the statement cache of `asyncpg`, which skips statements longer than its
+            # `max_cacheable_statement_size`, i.e. most multi-row statements.
+            self.prepared_statements = PreparedStatementCache()
+        else:
+            self.prepared_statements = PreparedStatementCache(self._prepare_insert, self._deallocate_insert)
+
+    def set_batch_size(self, batch_size: int):
+        self.batch_size = batch_size
+
+    def _get_insert_widths(self, rows: int) -> List[int]:
+        """
+        Split a batch into the numbers of rows of the statements inserting it.
+        """
+        max_rows = self.max_parameters // len(self.insert_columns)
+        width = min(self.batch_size or rows, max_rows) or 1
+        widths = [width] * (rows // width)
+        remainder = rows % width
+        bit = 1 << remainder.bit_length()
+        while remainder:
+            bit >>= 1
+            if remainder & bit:
+                widths.append(bit)
+                remainder -= bit
+        return widths
+
+    def _get_insert_sql(self, rows: int) -> str:
+        width = len(self.insert_columns)
+        values = ", ".join(
+            "(" + ", ".join(f"${row * width + column + 1}" for column in range(width)) + ")" for row in range(rows)
+        )
+        return f"INSERT INTO {self.table_name} ({', '.join(self.insert_columns)}) VALUES {values}"  # noqa: S608
+
+    def _prepare_insert(self, rows: int) -> str:
+        self.cursor.execute(f"PREPARE tsperf_insert_{rows} AS {self._get_insert_sql(rows)}")
+        placeholders = ", ".join(["%s"] * (rows * len(self.insert_columns)))
+        return f"EXECUTE tsperf_insert_{rows} ({placeholders})"
+
+    def _deallocate_insert(self, rows: int):
+        self.cursor.execute(f"DEALLOCATE tsperf_insert_{rows}")
+
+    async def _prepare_insert_async(self, rows: int):
+        if rows not in self.prepared_statements:
+            # `asyncpg` deallocates statements once they are garbage collected
+            self.prepared_statements.add(rows, await self.conn.prepare(self._get_insert_sql(rows)))
+        return self.prepared_statements[rows]
+
+    def _get_insert_parameters(self, timestamps: list, batch: list) -> list:
+        getter = _tuple_getter(self.insert_columns[2:])
+        parameters = []
+        for timestamp, row in zip(timestamps, batch):
+            parameters += self.timestamps[timestamp]
+            parameters += getter(row)
+        return parameters
 
+    def _iter_prepared(self, timestamps: list, batch: list):
+        parameters = self._get_insert_parameters(timestamps, batch)
+        width = len(self.insert_columns)
+        position = 0
+        for rows in self._get_insert_widths(len(batch)):
+            yield rows, parameters[position : position + rows * width]
+            position += rows * width
 
-class PostgreSQLAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
+    @timed_function()
+    def _insert_prepared(self, timestamps: list, batch: list):
+        for rows, parameters in self._iter_prepared(timestamps, batch):
+            self.cursor.execute(self.prepared_statements[rows], parameters)
+
+    async def _insert_prepared_async(self, timestamps: list, batch: list):
+        for rows, parameters in self._iter_prepared(timestamps, batch):
+            statement = await self._prepare_insert_async(rows)
+            await statement.fetch(*parameters)
+
+
+class PostgreSQLAdapter(PreparedInsertMixin, AbstractDatabaseInterface, DatabaseInterfaceMixin):
     default_address = "localhost:5432"
     default_username = "postgres"
     default_query = "SELECT 1;"
+    paramstyle = "pyformat"
 
     def __init__(
         self,
@@ -57,6 +170,32 @@ class PostgreSQLAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
         self.schema = schema
         self.table_name = (config.table, self._get_schema_table_name())[config.table is None or config.table == ""]
         self.partition = config.partition
+        self.tag_fragments = TagFragmentCache(self._serialize_tag_literals)
+        self.timestamps = TimestampCache(self._convert_timestamp)
+        self.timestamp_literals = TimestampCache(self._serialize_timestamp_literals)
+        self._setup_copy(config)
+        self._setup_prepared(config)
+        if self.use_copy:
+            logger.info("Using strategy »COPY binary«")
+        elif self.use_prepared:
+            logger.info("Using strategy »prepared INSERT«")
+        else:
+            logger.info("Using strategy »INSERT«")
+
+    def _setup_copy(self, config: Union[DataGeneratorConfig, QueryTimerConfig]):
+        self.use_copy = config.postgresql_copy is not None and config.postgresql_copy or False
+        self.copy_encoder = None
+        if not self.use_copy:
+            return
+        columns = self._get_tags_and_fields()
+        self.copy_tags = self._get_tag_keys()
+        self.copy_fields = [column for column in columns if column not in self.copy_tags]
+        self.copy_columns = ["ts", f"ts_{self.partition}", *self.copy_fields, *self.copy_tags]
+        self.copy_encoder = BinaryCopyEncoder(
+            [columns[tag] for tag in self.copy_tags],
+            [columns[field] for field in self.copy_fields],
+            self.partition,
+        )
 
     def close_connection(self):
         self.cursor.close()
@@ -84,36 +223,92 @@ ts_{self.partition} TIMESTAMP NOT NULL,
 
     @timed_function()
     def insert_stmt(self, timestamps: list, batch: list):
-        stmt = self._prepare_postgres_stmt(timestamps, batch)
-        self.cursor.execute(stmt)
+        if self.use_copy:
+            self._copy(timestamps, batch)
+        elif self.use_prepared:
+            self._insert_prepared(timestamps, batch)
+        else:
+            stmt = self._prepare_postgres_stmt(timestamps, batch)
+            self.cursor.execute(stmt)
+        self.conn.commit()
+
+    @timed_function()
+    def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        if not self.use_copy:
+            super().insert_columnar(timestamps, batch)
+            return
+        self._copy_columnar(timestamps, batch)
         self.conn.commit()
 
+    @timed_function()
+    def _copy(self, timestamps: list, batch: list):
+        data = self._prepare_copy_data(timestamps, batch)
+        stmt = f"COPY {self.table_name} ({', '.join(self.copy_columns)}) FROM STDIN (FORMAT binary)"
+        self.cursor.copy_expert(stmt, io.BytesIO(data))
+
+    @timed_function()
+    def _copy_columnar(self, timestamps: list, batch: ColumnarBatch):
+        data = self._prepare_copy_data_columnar(timestamps, batch)
+        stmt = f"COPY {self.table_name} ({', '.join(self.copy_columns)}) FROM STDIN (FORMAT binary)"
+        self.cursor.copy_expert(stmt, io.BytesIO(data))
+
+    def _prepare_copy_data(self, timestamps: Iterable[int], batch: list) -> bytes:
+        tags = map(_tuple_getter(self.copy_tags), batch)
+        fields = map(_tuple_getter(self.copy_fields), batch)
+        return self.copy_encoder.encode(timestamps, tags, fields)
+
+    def _prepare_copy_data_columnar(self, timestamps: Iterable[int], batch: ColumnarBatch) -> bytes:
+        tags = batch.tag_values
+        if tags is None:
+            tags = list(zip(*[batch[tag] for tag in self.copy_tags]))
+        fields = zip(*[batch[field] for field in self.copy_fields])
+        return self.copy_encoder.encode(timestamps, tags, fields)
+
     @timed_function()
     def _prepare_postgres_stmt(self, timestamps: list, batch: list) -> str:
         columns = self._get_tags_and_fields().keys()
+        tags = self._get_tag_keys()
+        fields = [column for column in columns if column not in tags]
         stmt = f"""INSERT INTO {self.table_name} (ts, ts_{self.partition},"""
         for column in columns:
             stmt += f"""{column}, """
 
         stmt = stmt.rstrip(", ") + ") VALUES"
+        values = []
         for i in range(0, len(batch)):
-            t = datetime.fromtimestamp(timestamps[i] / 1000)
-            trunc = truncate(t, self.partition)
-            stmt = f"""{stmt} ('{t}', '{trunc}', """
-            for column in columns:
-                stmt += f"""'{batch[i][column]}',"""
-            stmt = stmt.rstrip(",") + "),"
-        stmt = stmt.rstrip(",")
-        return stmt
+            timestamp_literals = self.timestamp_literals[timestamps[i]]
+            tag_literals = self.tag_fragments[tuple(batch[i][tag] for tag in tags)]
+            field_literals = ",".join(f"""'{batch[i][field]}'""" for field in fields)
+            values.append(f"""({timestamp_literals}{tag_literals}{field_literals})""")
+        return f"""{stmt} {", ".join(values)}"""
+
+    def _convert_timestamp(self, timestamp: int) -> tuple:
+        t = datetime.fromtimestamp(timestamp / 1000)
+        return t, truncate(t, self.partition)
+
+    def _serialize_timestamp_literals(self, timestamp: int) -> str:
+        t, trunc = self.timestamps[timestamp]
+        return f"""'{t}', '{trunc}', """
+
+    def _serialize_tag_literals(self, tag_values: tuple) -> str:
+        return "".join(f"""'{value}',""" for value in tag_values)
 
     @timed_function()
-    def execute_query(self, query: str) -> list:
-        return self.run_query(query)
+    def execute_query(self, query: str, parameters: dict = None) -> list:
+        return self.run_query(query, parameters)
 
-    def run_query(self, query: str) -> list:
-        self.cursor.execute(query)
+    def run_query(self, query: str, parameters: dict = None) -> list:
+        profile = self.profile = QueryProfile()
+        with profile.phase("submit"):
+            if parameters is None:
+                self.cursor.execute(query)
+            else:
+                self.cursor.execute(query, parameters)
         # self.conn.commit()  # noqa: ERA001
-        return self.cursor.fetchall()
+        with profile.phase("decode"):
+            result = self.cursor.fetchall()
+        profile.count(result)
+        return result
 
     def _get_schema_table_name(self) -> str:
         for key in self.schema.keys():
@@ -122,4 +317,76 @@ ts_{self.partition} TIMESTAMP NOT NULL,
         raise ValueError("Unable to determine table name")
 
 
+def _tuple_getter(keys: Sequence[str]) -> Callable[[dict], tuple]:
+    """
+    Like `operator.itemgetter`, but always returning a tuple.
+    """
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda row: (row[key],)
+    if not keys:
+        return lambda row: ()
+    return operator.itemgetter(*keys)
+
+
+class PostgreSQLAsyncAdapter(AbstractAsyncDatabaseInterface, PostgreSQLAdapter):
+    """
+    Insert into PostgreSQL with `asyncpg`.
+    """
+
+    def __init__(
+        self,
+        config: Union[DataGeneratorConfig, QueryTimerConfig],
+        schema: Optional[Dict] = None,
+    ):
+        import asyncpg  # noqa: F401
+
+        DatabaseInterfaceMixin.__init__(self, config=config)
+        self.conn = None
+        self.schema = schema
+        self.table_name = (config.table, self._get_schema_table_name())[config.table is None or config.table == ""]
+        self.partition = config.partition
+        self.tag_fragments = TagFragmentCache(self._serialize_tag_literals)
+        self.timestamps = TimestampCache(self._convert_timestamp)
+        self.timestamp_literals = TimestampCache(self._serialize_timestamp_literals)
+        self._setup_copy(config)
+        self._setup_prepared(config, asynchronous=True)
+
+    async def connect(self):
+        import asyncpg
+
+        self.conn = await asyncpg.connect(
+            database=self.config.database,
+            user=self.username,
+            password=self.config.password,
+            host=self.host,
+            port=self.port,
+        )
+
+    async def close_connection(self):
+        await self.conn.close()
+
+    async def insert_stmt(self, timestamps: list, batch: list):
+        if self.use_copy:
+            await self._copy_async(self._prepare_copy_data(timestamps, batch))
+            return
+        if self.use_prepared:
+            await self._insert_prepared_async(timestamps, batch)
+            return
+        stmt = self._prepare_postgres_stmt(timestamps, batch)
+        await self.conn.execute(stmt)
+
+    async def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        if not self.use_copy:
+            await super().insert_columnar(timestamps, batch)
+            return
+        await self._copy_async(self._prepare_copy_data_columnar(timestamps, batch))
+
+    async def _copy_async(self, data: bytes):
+        await self.conn.copy_to_table(
+            self.table_name, source=io.BytesIO(data), columns=self.copy_columns, format="binary"
+        )
+
+
 AdapterManager.register(interface=DatabaseInterfaceType.PostgreSQL, factory=PostgreSQLAdapter)
+AdapterManager.register_async(interface=DatabaseInterfaceType.PostgreSQL, factory=PostgreSQLAsyncAdapter)
@@ -19,27 +19,42 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 import logging
-from datetime import datetime
-from typing import Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
 
 import psycopg2
 import psycopg2.extras
 from datetime_truncate import truncate
 from pgcopy import CopyManager
 
-from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin, TagFragmentCache, TimestampCache
+from tsperf.adapter.postgresql import PreparedInsertMixin, _tuple_getter
+from tsperf.model.interface import (
+    AbstractAsyncDatabaseInterface,
+    AbstractDatabaseInterface,
+    DatabaseInterfaceType,
+    QueryProfile,
+)
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
+from tsperf.write.model.batch import ColumnarBatch
 
 logger = logging.getLogger(__name__)
 
+# The `ts` column stores local wall-clock time, so chunks are aligned to the epoch in local time.
+LOCAL_EPOCH = datetime(1970, 1, 1)
 
-class TimescaleDbAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
+
+class TimescaleDbAdapter(PreparedInsertMixin, AbstractDatabaseInterface, DatabaseInterfaceMixin):
     default_address = "localhost:5432"
     default_username = "postgres"
     default_query = "SELECT 1;"
+    paramstyle = "pyformat"
+
+    # The default `chunk_time_interval` of hypertables.
+    chunk_time_interval = timedelta(days=7)
 
     def __init__(
         self,
@@ -49,27 +64,57 @@ class TimescaleDbAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin):
         DatabaseInterfaceMixin.__init__(self, config=config)
         super().__init__()
 
-        self.conn = psycopg2.connect(
-            dbname=config.database,
-            user=self.username,
-            password=config.password,
-            host=self.host,
-            port=self.port,
-        )
+        self.conn = self._connect()
         self.cursor = self.conn.cursor()
         self.schema = schema
         self.table_name = (config.table, self._get_schema_table_name())[config.table is None or config.table == ""]
         self.partition = config.partition
+        self.tag_fragments = TagFragmentCache(self._serialize_tag_literals)
+        self.timestamps = TimestampCache(self._convert_timestamp)
+        self.timestamp_literals = TimestampCache(self._serialize_timestamp_literals)
 
         self.distributed = config.timescaledb_distributed
         self.use_pgcopy = config.timescaledb_pgcopy is not None and config.timescaledb_pgcopy or False
+        self._setup_prepared(config)
+        self._setup_copy_pool(config)
 
-        if self.use_pgcopy:
+        if self.use_pgcopy and self.copy_executor is not None:
+            logger.info(f"Using strategy »pgcopy« with {len(self.copy_connections)} connections")
+        elif self.use_pgcopy:
             logger.info("Using strategy »pgcopy«")
+        elif self.use_prepared:
+            logger.info("Using strategy »prepared INSERT«")
         else:
             logger.info("Using strategy »INSERT«")
 
+    def _connect(self):
+        return psycopg2.connect(
+            dbname=self.config.database,
+            user=self.username,
+            password=self.config.password,
+            host=self.host,
+            port=self.port,
+        )
+
+    def _setup_copy_pool(self, config: Union[DataGeneratorConfig, QueryTimerConfig]):
+        """
+        With more than one pgcopy connection, open the additional connections of this
+        writer, and a thread for each connection, which streams its part of a batch.
+        """
+        self.copy_connections = [self.conn]
+        self.copy_executor = None
+        if self.use_pgcopy and config.timescaledb_pgcopy_connections > 1:
+            for _ in range(config.timescaledb_pgcopy_connections - 1):
+                self.copy_connections.append(self._connect())
+            self.copy_executor = ThreadPoolExecutor(
+                max_workers=len(self.copy_connections), thread_name_prefix="tsperf-pgcopy"
+            )
+
     def close_connection(self):
+        if self.copy_executor is not None:
+            self.copy_executor.shutdown()
+            for conn in self.copy_connections[1:]:
+                conn.close()
         self.cursor.close()
         self.conn.close()
 
@@ -107,57 +152,182 @@ ts_{self.partition} TIMESTAMP NOT NULL,
 
     @timed_function()
     def insert_stmt(self, timestamps: list, batch: list):
+        if self.use_pgcopy and self.copy_executor is not None:
+            # the parts are committed by `_stream_chunks`
+            self._copy_chunks(timestamps, batch)
+            return
         if self.use_pgcopy:
             self._prepare_copy(timestamps, batch)
+        elif self.use_prepared:
+            self._insert_prepared(timestamps, batch)
         else:
             stmt = self._prepare_timescale_stmt(timestamps, batch)
             self.cursor.execute(stmt)
         self.conn.commit()
 
+    @timed_function()
+    def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        if not self.use_pgcopy:
+            super().insert_columnar(timestamps, batch)
+            return
+        if self.copy_executor is not None:
+            self._copy_chunks_columnar(timestamps, batch)
+            return
+        self._prepare_copy_columnar(timestamps, batch)
+        self.conn.commit()
+
+    @timed_function()
+    def _prepare_copy_columnar(self, timestamps: list, batch: ColumnarBatch):
+        copy_manager = CopyManager(self.conn, self.table_name, self._get_copy_columns())
+        copy_manager.copy(self._get_copy_records_columnar(timestamps, batch))
+
     @timed_function()
     def _prepare_copy(self, timestamps: list, batch: list):
+        copy_manager = CopyManager(self.conn, self.table_name, self._get_copy_columns())
+        copy_manager.copy(self._get_copy_records(timestamps, batch))
+
+    def _copy_chunks(self, timestamps: list, batch: list):
+        getter = _tuple_getter(list(self._get_tags_and_fields().keys()))
+        tag = self._get_partition_tag()
+        space = [row[tag] for row in batch] if self.distributed else None
+        self._stream_chunks(timestamps, space, lambda i: getter(batch[i]))
+
+    def _copy_chunks_columnar(self, timestamps: list, batch: ColumnarBatch):
+        columns = [batch[column] for column in self._get_tags_and_fields().keys()]
+        space = batch[self._get_partition_tag()] if self.distributed else None
+        self._stream_chunks(timestamps, space, lambda i: [column[i] for column in columns])
+
+    @timed_function()
+    def _stream_chunks(self, timestamps: list, space: Optional[Sequence], values: Callable[[int], Sequence]):
+        """
+        Stream the rows of a batch concurrently, one part per connection. Each connection
+        encodes its rows while sending them, instead of materializing them first.
+
+        The parts are only committed when all of them have been copied, otherwise all of
+        them are rolled back. The commits are not atomic across the connections, so when
+        one of them fails, the parts committed before it remain.
+        """
+        converted = [self.timestamps[timestamp] for timestamp in timestamps]
+        parts = self._split_chunks(converted, space)
+        streams = [
+            (
+                conn,
+                self.copy_executor.submit(self._stream_records, conn, self._iter_copy_records(converted, part, values)),
+            )
+            for conn, part in zip(self.copy_connections, parts)
+            if part
+        ]
+        errors = [future.exception() for _, future in streams]
+        if any(errors):
+            for conn, _ in streams:
+                conn.rollback()
+            raise next(error for error in errors if error is not None)
+        for conn, _ in streams:
+            conn.commit()
+
+    def _split_chunks(self, converted: list, space: Optional[Sequence]) -> List[List[int]]:
+        """
+        Split the row indices of a batch into one part per connection.
+
+        The rows are ordered by hypertable chunk, i.e. by time bucket and by the value of
+        the space partitioning column, and cut into contiguous parts of equal size, so
+        each connection writes into as few chunks as possible. The time buckets are based
+        on the local wall-clock time stored in the `ts` column.
+        """
+        if space is None:
+            space = [trunc for _, trunc in converted]
+        buckets = {}
+        for t, _ in converted:
+            if t not in buckets:
+                buckets[t] = (t - LOCAL_EPOCH) // self.chunk_time_interval
+        keys = [(buckets[t], value) for (t, _), value in zip(converted, space)]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        size, remainder = divmod(len(order), len(self.copy_connections))
+        parts = []
+        start = 0
+        for index in range(len(self.copy_connections)):
+            end = start + size + (index < remainder)
+            parts.append(order[start:end])
+            start = end
+        return parts
+
+    @staticmethod
+    def _iter_copy_records(converted: list, indices: Iterable[int], values: Callable[[int], Sequence]):
+        for i in indices:
+            yield (*converted[i], *values(i))
+
+    def _stream_records(self, conn, records: Iterable[tuple]):
+        copy_manager = CopyManager(conn, self.table_name, self._get_copy_columns())
+        copy_manager.threading_copy(records)
+
+    def _get_copy_columns(self) -> list:
+        cols = ["ts", f"ts_{self.partition}"]
+        for column in self._get_tags_and_fields().keys():
+            cols.append(column)
+        return cols
+
+    def _get_copy_records(self, timestamps: list, batch: list) -> list:
         columns = self._get_tags_and_fields().keys()
         values = []
 
         for i in range(0, len(timestamps)):
-            t = datetime.fromtimestamp(timestamps[i] / 1000)
-            trunc = truncate(t, self.partition)
-            data = [t, trunc]
+            data = list(self.timestamps[timestamps[i]])
             for column in columns:
                 data.append(batch[i][column])
             values.append(data)
+        return values
 
-        cols = ["ts", f"ts_{self.partition}"]
-        for column in columns:
-            cols.append(column)
-        copy_manager = CopyManager(self.conn, self.table_name, cols)
-        copy_manager.copy(values)
+    def _get_copy_records_columnar(self, timestamps: list, batch: ColumnarBatch):
+        columns = self._get_tags_and_fields().keys()
+        converted = [self.timestamps[timestamp] for timestamp in timestamps]
+        times = [t for t, _ in converted]
+        truncs = [trunc for _, trunc in converted]
+        return zip(times, truncs, *[batch[column] for column in columns])
 
     @timed_function()
     def _prepare_timescale_stmt(self, timestamps: list, batch: list) -> str:
         columns = self._get_tags_and_fields().keys()
+        tags = self._get_tag_keys()
+        fields = [column for column in columns if column not in tags]
         stmt = f"""INSERT INTO {self.table_name} (ts, ts_{self.partition},"""
         for column in columns:
             stmt += f"""{column}, """
 
         stmt = stmt.rstrip(", ") + ") VALUES"
+        values = []
         for i in range(0, len(batch)):
-            t = datetime.fromtimestamp(timestamps[i] / 1000)
-            trunc = truncate(t, self.partition)
-            stmt = f"""{stmt} ('{t}', '{trunc}', """
-            for column in columns:
-                stmt += f"""'{batch[i][column]}',"""
-            stmt = stmt.rstrip(",") + "),"
-        stmt = stmt.rstrip(",")
-        return stmt
+            timestamp_literals = self.timestamp_literals[timestamps[i]]
+            tag_literals = self.tag_fragments[tuple(batch[i][tag] for tag in tags)]
+            field_literals = ",".join(f"""'{batch[i][field]}'""" for field in fields)
+            values.append(f"""({timestamp_literals}{tag_literals}{field_literals})""")
+        return f"""{stmt} {", ".join(values)}"""
+
+    def _convert_timestamp(self, timestamp: int) -> tuple:
+        t = datetime.fromtimestamp(timestamp / 1000)
+        return t, truncate(t, self.partition)
+
+    def _serialize_timestamp_literals(self, timestamp: int) -> str:
+        t, trunc = self.timestamps[timestamp]
+        return f"""'{t}', '{trunc}', """
+
+    def _serialize_tag_literals(self, tag_values: tuple) -> str:
+        return "".join(f"""'{value}',""" for value in tag_values)
 
     @timed_function()
-    def execute_query(self, query: str) -> list:
-        return self.run_query(query)
+    def execute_query(self, query: str, parameters: dict = None) -> list:
+        return self.run_query(query, parameters)
 
-    def run_query(self, query: str) -> list:
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+    def run_query(self, query: str, parameters: dict = None) -> list:
+        profile = self.profile = QueryProfile()
+        with profile.phase("submit"):
+            if parameters is None:
+                self.cursor.execute(query)
+            else:
+                self.cursor.execute(query, parameters)
+        with profile.phase("decode"):
+            result = self.cursor.fetchall()
+        profile.count(result)
+        return result
 
     def _get_schema_table_name(self) -> str:
         for key in self.schema.keys():
@@ -173,4 +343,65 @@ ts_{self.partition} TIMESTAMP NOT NULL,
         return tags[0] if top_level else tags[-1]
 
 
+class TimescaleDbAsyncAdapter(AbstractAsyncDatabaseInterface, TimescaleDbAdapter):
+    """
+    Insert into TimescaleDB with `asyncpg`. With `pgcopy`, the binary COPY
+    protocol of `asyncpg` is used.
+    """
+
+    def __init__(
+        self,
+        config: Union[DataGeneratorConfig, QueryTimerConfig],
+        schema: Optional[Dict] = None,
+    ):
+        import asyncpg  # noqa: F401
+
+        DatabaseInterfaceMixin.__init__(self, config=config)
+        self.conn = None
+        self.schema = schema
+        self.table_name = (config.table, self._get_schema_table_name())[config.table is None or config.table == ""]
+        self.partition = config.partition
+        self.tag_fragments = TagFragmentCache(self._serialize_tag_literals)
+        self.timestamps = TimestampCache(self._convert_timestamp)
+        self.timestamp_literals = TimestampCache(self._serialize_timestamp_literals)
+        self.distributed = config.timescaledb_distributed
+        self.use_pgcopy = config.timescaledb_pgcopy is not None and config.timescaledb_pgcopy or False
+        self._setup_prepared(config, asynchronous=True)
+
+    async def connect(self):
+        import asyncpg
+
+        self.conn = await asyncpg.connect(
+            database=self.config.database,
+            user=self.username,
+            password=self.config.password,
+            host=self.host,
+            port=self.port,
+        )
+
+    async def close_connection(self):
+        await self.conn.close()
+
+    async def insert_stmt(self, timestamps: list, batch: list):
+        if self.use_pgcopy:
+            await self.conn.copy_records_to_table(
+                self.table_name, records=self._get_copy_records(timestamps, batch), columns=self._get_copy_columns()
+            )
+        elif self.use_prepared:
+            await self._insert_prepared_async(timestamps, batch)
+        else:
+            await self.conn.execute(self._prepare_timescale_stmt(timestamps, batch))
+
+    async def insert_columnar(self, timestamps: list, batch: ColumnarBatch):
+        if not self.use_pgcopy:
+            await super().insert_columnar(timestamps, batch)
+            return
+        await self.conn.copy_records_to_table(
+            self.table_name,
+            records=list(self._get_copy_records_columnar(timestamps, batch)),
+            columns=self._get_copy_columns(),
+        )
+
+
 AdapterManager.register(interface=DatabaseInterfaceType.TimescaleDB, factory=TimescaleDbAdapter)
+AdapterManager.register_async(interface=DatabaseInterfaceType.TimescaleDB, factory=TimescaleDbAsyncAdapter)
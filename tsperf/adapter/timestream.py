@@ -19,6 +19,7 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 
+import itertools
 import logging
 import math
 from typing import Dict, Optional, Tuple, Union
@@ -27,8 +28,8 @@ import boto3
 import numpy
 from botocore.config import Config
 
-from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin
-from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType
+from tsperf.adapter import AdapterManager, DatabaseInterfaceMixin, TagFragmentCache
+from tsperf.model.interface import AbstractDatabaseInterface, DatabaseInterfaceType, QueryProfile
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.tictrack import timed_function
 from tsperf.write.config import DataGeneratorConfig
@@ -50,6 +51,7 @@ class AmazonTimestreamAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin)
         self.schema = schema
         self.database_name = self.database
         self.table_name = self._get_schema_collection_name()
+        self.common_attributes = TagFragmentCache(self._serialize_common_attributes)
 
         logger.info(f"Connecting to AWS region »{config.aws_region_name}« with key id »{config.aws_access_key_id}«")
         self.session = boto3.session.Session(
@@ -94,12 +96,10 @@ class AmazonTimestreamAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin)
         tags, fields = self._get_tags_and_fields()
         for i in range(0, len(batch)):
             record = {"Time": str(timestamps[i])}
-            common_attributes = {"Dimensions": []}
-            for tag in tags:
-                common_attributes["Dimensions"].append({"Name": tag, "Value": str(batch[i][tag])})
-            if str(common_attributes) not in data:
-                data[str(common_attributes)] = {
-                    "common_attributes": common_attributes,
+            tag_values = tuple(batch[i][tag] for tag in tags)
+            if tag_values not in data:
+                data[tag_values] = {
+                    "common_attributes": self.common_attributes[tag_values],
                     "records": [],
                 }
             for field in fields:
@@ -111,20 +111,30 @@ class AmazonTimestreamAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin)
                         "MeasureValueType": field["type"],
                     }
                 )
-                data[str(common_attributes)]["records"].append(record)
+                data[tag_values]["records"].append(record)
         return data
 
+    def _serialize_common_attributes(self, tag_values: tuple) -> dict:
+        tags, _ = self._get_tags_and_fields()
+        return {"Dimensions": [{"Name": tag, "Value": str(value)} for tag, value in zip(tags, tag_values)]}
+
     @timed_function()
     def execute_query(self, query: str, retry: bool = True) -> list:
         return self.run_query(query)
 
     def run_query(self, query: str, retry: bool = True) -> list:
         result = []
+        profile = self.profile = QueryProfile()
         try:
             paginator = self.query_client.get_paginator("query")
-            page_iterator = paginator.paginate(QueryString=query)
-            for page in page_iterator:
-                result.append(page)
+            page_iterator = iter(paginator.paginate(QueryString=query))
+            with profile.phase("submit"):
+                result.extend(itertools.islice(page_iterator, 1))
+            with profile.phase("fetch"):
+                result.extend(page_iterator)
+            rows = sum(len(page.get("Rows", [])) for page in result)
+            sample = next((page["Rows"][0] for page in result if page.get("Rows")), None)
+            profile.count_rows(rows, sample=sample, size=sum(self._get_response_size(page) for page in result) or None)
         except Exception as ex:
             if retry:
                 result = self.execute_query(query, False)
@@ -132,6 +142,11 @@ class AmazonTimestreamAdapter(AbstractDatabaseInterface, DatabaseInterfaceMixin)
                 raise RuntimeError(ex) from ex
         return result
 
+    @staticmethod
+    def _get_response_size(page: dict) -> int:
+        headers = page.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+        return int(headers.get("content-length", 0))
+
     def _get_tags_and_fields(self) -> Tuple[dict, dict]:
         key = self._get_schema_collection_name()
         tags_ = self.schema[key]["tags"]
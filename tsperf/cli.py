@@ -18,6 +18,7 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
+import dataclasses
 import glob
 import json
 import logging
@@ -28,31 +29,21 @@ import click
 import cloup
 from blessed import Terminal
 
+import tsperf.mixed.core
 import tsperf.read.core
 import tsperf.write.core
+from tsperf.model.configuration import enrich_options
 from tsperf.model.interface import DatabaseInterfaceType
 from tsperf.read.config import QueryTimerConfig
 from tsperf.util.common import setup_logging
 from tsperf.write.config import DataGeneratorConfig
-from tsperf.write.model import IngestMode
+from tsperf.write.model import IngestMode, InsertEngine
 
 logger = logging.getLogger(__name__)
 
 TSPERF_README_URL = "https://github.com/crate/tsperf"
 
 
-general_options = cloup.option_group(
-    "General options",
-    cloup.option(
-        "--schema",
-        envvar="SCHEMA",
-        type=str,
-        help="A reference to a schema in JSON format. It can either be the name of a Python resource in "
-        "full-qualified dotted `pkg_resources`-compatible notation, or an absolute or relative path.",
-    ),
-)
-
-
 adapter_options = cloup.option_group(
     "Adapter",
     click.option(
@@ -175,6 +166,30 @@ performance_options = cloup.option_group(
         default=1,
         help="Number of replicas for the CrateDB table",
     ),
+    cloup.option(
+        "--cratedb-typed-columns",
+        envvar="CRATEDB_TYPED_COLUMNS",
+        type=click.BOOL,
+        is_flag=True,
+        default=False,
+        help="Use one typed column per tag and field with CrateDB, instead of an OBJECT(DYNAMIC) column",
+    ),
+    cloup.option(
+        "--postgresql-copy",
+        envvar="POSTGRESQL_COPY",
+        type=click.BOOL,
+        is_flag=True,
+        default=False,
+        help="Use binary COPY with PostgreSQL",
+    ),
+    cloup.option(
+        "--postgresql-prepared",
+        envvar="POSTGRESQL_PREPARED",
+        type=click.BOOL,
+        is_flag=True,
+        default=False,
+        help="Use server-side prepared multi-row INSERT statements with PostgreSQL and TimescaleDB",
+    ),
     cloup.option(
         "--timescaledb-distributed",
         envvar="TIMESCALEDB_DISTRIBUTED",
@@ -191,16 +206,22 @@ performance_options = cloup.option_group(
         default=False,
         help="Use pgcopy with TimescaleDB",
     ),
+    cloup.option(
+        "--timescaledb-pgcopy-connections",
+        envvar="TIMESCALEDB_PGCOPY_CONNECTIONS",
+        type=click.INT,
+        default=1,
+        help="Number of connections per writer, which stream the chunks of a batch with pgcopy concurrently",
+    ),
 )
 
 
-write_options = cloup.option_group(
-    "Write options",
+dataset_options = cloup.option_group(
+    "Dataset options",
     cloup.option(
         "--schema",
         envvar="SCHEMA",
         type=str,
-        required=True,
         help="A reference to a schema in JSON format. It can either be the name of a Python resource in "
         "full-qualified dotted `pkg_resources`-compatible notation, or an absolute or relative path.",
     ),
@@ -232,6 +253,32 @@ write_options = cloup.option_group(
         help="A positive number to define the interval between timestamps of generated values. "
         "With `ingest_mode = False`, this is the actual time between inserts.",
     ),
+    cloup.option(
+        "--ingest-size",
+        envvar="INGEST_SIZE",
+        type=click.INT,
+        default=1000,
+        help="Number of values per object to create. If set to 0, an infinite amount of values will be created.",
+    ),
+    cloup.option(
+        "--seed",
+        envvar="SEED",
+        type=click.INT,
+        help="Seed for generating reproducible values. Each sensor of each channel uses an independent random "
+        "number generator stream, derived from the seed and the channel id. If not provided, values are random.",
+    ),
+)
+
+
+write_options = cloup.option_group(
+    "Write options",
+    cloup.option(
+        "--replay",
+        envvar="REPLAY",
+        type=click.Path(exists=True, dir_okay=False),
+        help="Replay a dataset created by `tsperf generate` instead of generating values while writing. "
+        "Schema, channels, ingest size, and timestamps are taken from the dataset.",
+    ),
     cloup.option(
         "--ingest-mode",
         envvar="INGEST_MODE",
@@ -243,14 +290,29 @@ write_options = cloup.option_group(
         help="Which ingest mode to use. "
         "consecutive: For each record, an individual SQL statement will be submitted. "
         "fast: Many records will be submitted in batches using a single SQL statement. "
+        "rate: Like fast, but holding the target rate defined by `ingest_rate`. "
         "Default: fast",
     ),
     cloup.option(
-        "--ingest-size",
-        envvar="INGEST_SIZE",
-        type=click.INT,
-        default=1000,
-        help="Number of values per object to create. If set to 0, an infinite amount of values will be created.",
+        "--ingest-rate",
+        envvar="INGEST_RATE",
+        type=click.FLOAT,
+        default=0,
+        help="The target number of rows per second across all database writer threads with `ingest_mode = rate`.",
+    ),
+    cloup.option(
+        "--insert-engine",
+        envvar="INSERT_ENGINE",
+        type=click.Choice(
+            [item.value for item in InsertEngine],
+            case_sensitive=False,
+        ),
+        default="threads",
+        help="How to run the database writers. "
+        "threads: Each writer is a thread with a blocking database connection. "
+        "asyncio: Each writer is a coroutine with an asynchronous database connection, "
+        "all running on a single event loop. Use `concurrency` to define the number of writers. "
+        "Available for CrateDB, InfluxDB, PostgreSQL and TimescaleDB. Default: threads",
     ),
     cloup.option(
         "--batch-size",
@@ -260,6 +322,40 @@ write_options = cloup.option_group(
         help="The batch size used when `ingest_mode = True`. A value smaller or equal to 0 in combination with "
         "`ingest_mode` turns on auto batch mode using the batch size automator library.",
     ),
+    cloup.option(
+        "--columnar",
+        envvar="COLUMNAR",
+        type=click.BOOL,
+        is_flag=True,
+        default=False,
+        help="Pass values from the generator to the database adapters in columnar representation, "
+        "one list of values per tag and field, instead of one dictionary per row",
+    ),
+    cloup.option(
+        "--queue-max-rows",
+        envvar="QUEUE_MAX_ROWS",
+        type=click.INT,
+        default=1_000_000,
+        help="Maximum number of rows buffered between the value generator and the database writer threads. "
+        "When reached, the value generator is blocked until the database writer threads made room. "
+        "0 means no limit. Default: 1000000",
+    ),
+    cloup.option(
+        "--queue-max-bytes",
+        envvar="QUEUE_MAX_BYTES",
+        type=click.INT,
+        default=0,
+        help="Maximum number of bytes, estimated, buffered between the value generator and the database writer "
+        "threads. 0 means no limit. Default: 0",
+    ),
+    cloup.option(
+        "--generator-processes",
+        envvar="GENERATOR_PROCESSES",
+        type=click.INT,
+        default=1,
+        help="Number of processes generating values. The channel id range will be split evenly across them. "
+        "Only available with `ingest_mode = fast` or `ingest_mode = rate`. Default: 1",
+    ),
     cloup.option(
         "--prometheus-enable",
         envvar="PROMETHEUS_ENABLE",
@@ -286,6 +382,14 @@ read_options = cloup.option_group(
         default=None,
         help="The query that will be timed. It must be a valid query in string format for the chosen database",
     ),
+    cloup.option(
+        "--workload",
+        envvar="WORKLOAD",
+        type=click.STRING,
+        default=None,
+        help="A JSON file with a weighted mix of named queries, which is timed instead of `--query`. "
+        "Either a path, or a Python resource reference like `--schema`",
+    ),
     cloup.option(
         "--iterations",
         envvar="ITERATIONS",
@@ -293,6 +397,39 @@ read_options = cloup.option_group(
         default=None,
         help="How many times each thread executes the query",
     ),
+    cloup.option(
+        "--processes",
+        envvar="PROCESSES",
+        type=click.INT,
+        default=1,
+        help="How many processes to spread the `--concurrency` worker threads over, "
+        "to run queries beyond the capacity of a single Python interpreter",
+    ),
+    cloup.option(
+        "--rate",
+        envvar="RATE",
+        type=click.FLOAT,
+        default=0,
+        help="The target number of queries per second across all threads. "
+        "Queries are started on a fixed schedule, and their latency is also measured from "
+        "the scheduled start time. Default: 0, run queries back to back.",
+    ),
+    cloup.option(
+        "--duration",
+        envvar="DURATION",
+        type=click.FLOAT,
+        default=0,
+        help="How many seconds each thread executes the query, used instead of `--iterations`. "
+        "Default: 0, run `--iterations` queries.",
+    ),
+    cloup.option(
+        "--sweep",
+        envvar="SWEEP",
+        type=click.STRING,
+        default=None,
+        help="Concurrency levels to step through, separated by ',', e.g. `1,2,4,8,16`. Each level runs "
+        "`--iterations` or `--duration`, and the report shows the throughput/latency curve and its knee",
+    ),
     click.option(
         "--quantiles",
         envvar="QUANTILES",
@@ -303,6 +440,33 @@ read_options = cloup.option_group(
 )
 
 
+mixed_options = cloup.option_group(
+    "Mixed workload options",
+    cloup.option(
+        "--read-concurrency",
+        envvar="READ_CONCURRENCY",
+        type=click.INT,
+        default=4,
+        help="How many threads are running queries, while `--concurrency` threads are writing",
+    ),
+    cloup.option(
+        "--timeline-interval",
+        envvar="TIMELINE_INTERVAL",
+        type=click.FLOAT,
+        default=1.0,
+        help="Interval in seconds to sample ingest throughput and query percentiles on the timeline",
+    ),
+    cloup.option(
+        "--baseline",
+        envvar="BASELINE",
+        type=click.FLOAT,
+        default=0.0,
+        help="How many seconds to run queries before starting to write, to measure their latency without "
+        "concurrent writes",
+    ),
+)
+
+
 misc_options = cloup.option_group(
     "Miscellaneous options",
     click.option(
@@ -320,7 +484,7 @@ def main():
 
 
 @main.command("write")
-@general_options
+@dataset_options
 @adapter_options
 @authentication_options
 @performance_options
@@ -334,6 +498,9 @@ def main():
 )
 @misc_options
 def write(**kwargs):
+    if kwargs["schema"] is None and kwargs["replay"] is None:
+        raise click.UsageError("Missing option '--schema', or '--replay'")
+
     # Run workload.
     adapter = kwargs["adapter"]
     logger.info(f"Invoking write workload on time-series database »{adapter}«")
@@ -341,8 +508,28 @@ def write(**kwargs):
     tsperf.write.core.start(config)
 
 
+@main.command("generate")
+@dataset_options
+@click.option(
+    "--output",
+    envvar="OUTPUT",
+    type=click.Path(dir_okay=False, writable=True),
+    required=True,
+    help="The dataset file to write, which can be replayed using `tsperf write --replay`",
+)
+@misc_options
+def generate(**kwargs):
+    if kwargs["schema"] is None:
+        raise click.UsageError("Missing option '--schema'")
+    output = kwargs.pop("output")
+    logger.info(f"Generating dataset »{output}«")
+    # generating a dataset does not need a database adapter
+    config = DataGeneratorConfig(adapter=None, **enrich_options(kwargs))
+    tsperf.write.core.generate(config, output)
+
+
 @main.command("read")
-@general_options
+@dataset_options
 @adapter_options
 @authentication_options
 @performance_options
@@ -367,6 +554,43 @@ def read(**kwargs):
     tsperf.read.core.start(config)
 
 
+@main.command("mixed")
+@dataset_options
+@adapter_options
+@authentication_options
+@performance_options
+@write_options
+@read_options
+@mixed_options
+@click.option(
+    "--statistics-interval",
+    envvar="STATISTICS_INTERVAL",
+    type=click.FLOAT,
+    default=30,
+    help="Interval in seconds to emit statistic outputs to the log",
+)
+@misc_options
+def mixed(read_concurrency: int, timeline_interval: float, baseline: float, **kwargs):
+    if kwargs["schema"] is None and kwargs["replay"] is None:
+        raise click.UsageError("Missing option '--schema', or '--replay'")
+
+    # Run workload.
+    adapter = kwargs["adapter"]
+    logger.info(f"Invoking mixed read and write workload on time-series database »{adapter}«")
+    write_config = DataGeneratorConfig.create(**select_options(DataGeneratorConfig, kwargs))
+    read_config = QueryTimerConfig.create(**select_options(QueryTimerConfig, kwargs))
+    read_config.concurrency = read_concurrency
+    tsperf.mixed.core.start(write_config, read_config, interval=timeline_interval, baseline=baseline)
+
+
+def select_options(config_class, kwargs: dict) -> dict:
+    """
+    Select the options which apply to the given configuration class.
+    """
+    names = {field.name for field in dataclasses.fields(config_class)}
+    return {key: value for key, value in kwargs.items() if key in names}
+
+
 @main.command("schema")
 @click.option(
     "--list",
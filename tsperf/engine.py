@@ -56,6 +56,15 @@ class TsPerfEngine:
         logger.info(f"Database adapter »{adapter}« loaded successfully")
         return adapter
 
+    def create_async_adapter(self):
+        adapter = AdapterManager.create_async(
+            interface=DatabaseInterfaceType(self.config.adapter),
+            config=self.config,
+            schema=self.schema,
+        )
+        logger.info(f"Async database adapter »{adapter}« loaded successfully")
+        return adapter
+
     def bootstrap(self):
         # Load and validate configuration.
         valid_config = self.config.validate_config()
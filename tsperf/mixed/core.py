@@ -0,0 +1,189 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import dataclasses
+import io
+import logging
+import time
+from contextlib import redirect_stdout
+from queue import Queue
+from threading import Thread
+from typing import Dict, List
+
+import tsperf.read.core as read_core
+import tsperf.write.core as write_core
+from tsperf.read.config import QueryTimerConfig
+from tsperf.util.histogram import Histogram
+from tsperf.write.config import DataGeneratorConfig
+from tsperf.write.model.metrics import c_inserted_values
+
+logger = logging.getLogger(__name__)
+
+PHASE_BASELINE = "baseline"
+PHASE_INGEST = "ingest"
+
+
+@dataclasses.dataclass
+class TimelineSample:
+    """
+    Ingest throughput and query latencies of one interval of the timeline.
+    """
+
+    elapsed: float
+    duration: float
+    phase: str
+    rows: float
+    failures: int
+    latency: Histogram
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def queries_per_second(self) -> float:
+        return self.latency.count / self.duration if self.duration > 0 else 0.0
+
+    def format(self) -> str:
+        line = (
+            f"{self.elapsed:8.1f}s {self.phase:<8} rows/s: {self.rows_per_second:12.1f}  "
+            f"qps: {self.queries_per_second:9.1f}  failures: {self.failures}"
+        )
+        if self.latency.count > 0:
+            p50, p99 = self.latency.percentiles([50, 99])
+            line += f"  p50: {p50 * 1000:.3f}ms  p99: {p99 * 1000:.3f}ms"
+        return line
+
+
+class Timeline:
+    """
+    Sample the ingest throughput of the Data Generator and the query latencies of the
+    Query Timer on a shared timeline, and aggregate them by phase, so that the query
+    latencies while writing can be compared to the ones without concurrent writes.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.last = self.start
+        self.last_rows = c_inserted_values._value.get()
+        self.last_failures = read_core.failure
+        self.samples: List[TimelineSample] = []
+        self.phases: Dict[str, TimelineSample] = {}
+
+    def sample(self, phase: str) -> TimelineSample:
+        now = time.monotonic()
+        rows = c_inserted_values._value.get()
+        failures = read_core.failure
+        sample = TimelineSample(
+            elapsed=now - self.start,
+            duration=now - self.last,
+            phase=phase,
+            rows=rows - self.last_rows,
+            failures=failures - self.last_failures,
+            latency=read_core.snapshot_intervals(),
+        )
+        self.last, self.last_rows, self.last_failures = now, rows, failures
+        self.samples.append(sample)
+
+        total = self.phases.setdefault(
+            phase, TimelineSample(elapsed=0, duration=0, phase=phase, rows=0, failures=0, latency=Histogram())
+        )
+        total.duration += sample.duration
+        total.rows += sample.rows
+        total.failures += sample.failures
+        total.latency.merge(sample.latency)
+        return sample
+
+    def report(self, quantiles: List[str]) -> str:
+        f = io.StringIO()
+        # ruff: noqa: T201
+        with redirect_stdout(f):
+            for phase, total in self.phases.items():
+                print(f"{phase}:")
+                print(f"  duration: {round(total.duration, 3)}s")
+                print(f"  rows/s  : {round(total.rows_per_second, 3)}")
+                print(f"  qps     : {round(total.queries_per_second, 3)}")
+                print(f"  failures: {total.failures}")
+                if total.latency.count == 0:
+                    continue
+                for quantile in quantiles:
+                    label = f"p{quantile}".ljust(8)
+                    print(f"  {label}: {round(total.latency.percentile(float(quantile)) * 1000, 3)}ms")
+        return f.getvalue()
+
+
+def start(
+    write_configuration: DataGeneratorConfig,
+    read_configuration: QueryTimerConfig,
+    interval: float = 1.0,
+    baseline: float = 0.0,
+) -> Timeline:
+    """
+    Run the Data Generator and the Query Timer in one process, against the same table.
+
+    The query workers start `baseline` seconds before the database writers, and stop when
+    the database writers are finished, or when they have done their iterations.
+    """
+    write_core.setup(write_configuration)
+    # the queries draw their parameters from the dataset actually written
+    write_config = write_core.config
+    read_configuration = dataclasses.replace(
+        read_configuration,
+        id_start=write_config.id_start,
+        id_end=write_config.id_end,
+        timestamp_start=write_config.timestamp_start,
+        timestamp_delta=write_config.timestamp_delta,
+        ingest_size=write_config.ingest_size,
+    )
+    read_core.setup(read_configuration, schema_=write_core.schema)
+
+    timeline = Timeline()
+    reader = Thread(target=read_core.run_workers, name="QueryTimer")
+    reader.start()
+
+    ticks = 0
+    for ticks in range(1, int(round(baseline / interval, 6)) + 1):
+        time.sleep(max(0.0, timeline.start + ticks * interval - time.monotonic()))
+        logger.info(timeline.sample(PHASE_BASELINE).format())
+
+    logger.info("Starting database writers")
+    write_errors = Queue()
+    writer = Thread(
+        target=write_core.report_exceptions(write_core.run_dg, write_errors),
+        name="DataGenerator",
+    )
+    writer.start()
+    try:
+        while True:
+            ticks += 1
+            writer.join(timeout=max(0.0, timeline.start + ticks * interval - time.monotonic()))
+            if not writer.is_alive():
+                break
+            logger.info(timeline.sample(PHASE_INGEST).format())
+        write_core.wait_for_thread(writer, write_errors)
+    finally:
+        read_core.stop_event.set()
+        reader.join()
+    # the last interval also covers the queries which finished after the writers
+    logger.info(timeline.sample(PHASE_INGEST).format())
+
+    report = timeline.report(read_core.config.quantiles)
+    logger.info(f"Statistics per phase:\n{report}")
+    return timeline
@@ -3,7 +3,7 @@ from typing import Dict
 
 from tsperf.adapter import AdapterManager
 from tsperf.model.interface import DatabaseInterfaceType
-from tsperf.write.model import IngestMode
+from tsperf.write.model import IngestMode, InsertEngine
 
 
 @dataclasses.dataclass
@@ -28,14 +28,20 @@ class DatabaseConnectionConfiguration:
     # Configuration variables for CrateDB.
     shards: int = 4
     replicas: int = 1
+    cratedb_typed_columns: bool = False
 
     # Configuration variables for InfluxDB.
     influxdb_organization: str = None
     influxdb_token: str = None
 
+    # Configuration variables for PostgreSQL.
+    postgresql_copy: bool = False
+    postgresql_prepared: bool = False
+
     # Configuration variables for TimescaleDB.
     timescaledb_distributed: bool = False
     timescaledb_pgcopy: bool = False
+    timescaledb_pgcopy_connections: int = 1
 
     # Configuration variables for AWS Timestream.
     aws_access_key_id: str = None
@@ -55,7 +61,7 @@ class DatabaseConnectionConfiguration:
             if not DatabaseInterfaceType(self.adapter):
                 raise Exception(f"Invalid database interface: {self.adapter}")
 
-        if self.address is None:
+        if self.address is None and self.adapter is not None:
             adapter = AdapterManager.get(self.adapter)
             self.address = adapter.default_address
 
@@ -65,6 +71,8 @@ def enrich_options(kwargs):
         kwargs["adapter"] = DatabaseInterfaceType(kwargs["adapter"])
     if "ingest_mode" in kwargs:
         kwargs["ingest_mode"] = IngestMode(kwargs["ingest_mode"])
+    if "insert_engine" in kwargs:
+        kwargs["insert_engine"] = InsertEngine(kwargs["insert_engine"])
     if "debug" in kwargs:
         del kwargs["debug"]
     kwargs = {k: v for k, v in kwargs.items() if v is not None}
@@ -18,8 +18,11 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
+import time
 from abc import abstractmethod
+from contextlib import contextmanager
 from enum import Enum
+from typing import Iterator, Sequence, Union
 
 
 class DatabaseInterfaceType(Enum):
@@ -34,12 +37,81 @@ class DatabaseInterfaceType(Enum):
     Timestream = "timestream"
 
 
+class QueryProfile:
+    """
+    The timing breakdown and the result size of the last query run by an adapter.
+
+    The phases are measured where the driver exposes them separately:
+
+    - submit: until the driver returns from submitting the query, which is the time to the
+      first row. Drivers receiving the whole result at once include its transfer here.
+    - fetch: retrieving the rows from the driver, iterating a cursor or pages.
+    - decode: converting the buffered result into Python values.
+
+    The bytes are the size of the response where the driver reports it, and an estimate
+    from the size of the first row otherwise.
+    """
+
+    PHASES = ("submit", "fetch", "decode")
+
+    def __init__(self):
+        self.submit = 0.0
+        self.fetch = 0.0
+        self.decode = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            setattr(self, name, getattr(self, name) + time.monotonic() - start)
+
+    def count(self, rows: Sequence, size: int = None):
+        self.count_rows(len(rows), sample=rows[0] if rows else None, size=size)
+
+    def count_rows(self, rows: int, sample=None, size: int = None):
+        """
+        Record the result size from a row count, for results which are not a flat list of
+        rows, without materializing one. The size is estimated from the `sample` row.
+        """
+        self.rows = rows
+        if size is not None:
+            self.bytes = size
+        elif self.rows:
+            self.bytes = estimate_size(sample) * self.rows
+
+
+def estimate_size(value) -> int:
+    """
+    Estimate the size of a decoded value on the wire, without serializing it.
+    """
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    if value is None or isinstance(value, bool):
+        return 1
+    return 8
+
+
 class AbstractDatabaseInterface:
     default_address = None
     default_username = None
     default_database = None
     default_query = None
 
+    # How the database driver binds query parameters, `qmark`, `pyformat` or `flux`.
+    # None renders the parameters into the query text, see `QueryTemplate`.
+    paramstyle = None
+
+    # The phases and the result size of the last query, see `run_query`.
+    profile: QueryProfile = None
+
     @abstractmethod
     def __init__(self):
         pass
@@ -60,13 +132,32 @@ class AbstractDatabaseInterface:
     def insert_stmt(self, timestamps: list, batch: list):  # pragma: no cover
         pass
 
+    def insert_columnar(self, timestamps: list, batch):
+        """
+        Insert a batch in columnar representation, see `ColumnarBatch`.
+
+        Adapters which are able to serialize columns natively override this method,
+        all others receive the batch converted to rows.
+        """
+        self.insert_stmt(timestamps, batch.rows())
+
+    def set_batch_size(self, batch_size: int):
+        """
+        Announce the batch size chosen by the batch size automator for the next batches.
+        Batches can still be smaller, e.g. when the generated values run out.
+        """
+
     @abstractmethod
-    def execute_query(self, query: str):  # pragma: no cover
+    def execute_query(self, query: str, parameters: Union[list, dict] = None):  # pragma: no cover
         pass
 
     def _get_schema_table_name(self) -> str:
         pass
 
+    def _get_tag_keys(self) -> list:
+        key = self._get_schema_table_name()
+        return [key for key in self.schema[key]["tags"].keys() if key != "description"]
+
     def _get_tags_and_fields(self):
         key = self._get_schema_table_name()
         tags = self.schema[key]["tags"]
@@ -82,3 +173,32 @@ class AbstractDatabaseInterface:
             if key != "description":
                 columns[value["key"]["value"]] = value["type"]["value"]
         return columns
+
+
+class AbstractAsyncDatabaseInterface:
+    """
+    Asynchronous variant of the insert operations of a database adapter, used by
+    the `asyncio` insert engine.
+
+    Async adapters derive from their synchronous counterpart to share the statement
+    preparation, but do not connect in `__init__`. Preparing the database is left to
+    the synchronous adapter.
+    """
+
+    @abstractmethod
+    async def connect(self):  # pragma: no cover
+        pass
+
+    @abstractmethod
+    async def close_connection(self):  # pragma: no cover
+        pass
+
+    @abstractmethod
+    async def insert_stmt(self, timestamps: list, batch: list):  # pragma: no cover
+        pass
+
+    async def insert_columnar(self, timestamps: list, batch):
+        """
+        Insert a batch in columnar representation, see `ColumnarBatch`.
+        """
+        await self.insert_stmt(timestamps, batch.rows())
@@ -21,24 +21,51 @@
 import dataclasses
 import os
 import shutil
+import time
 from argparse import Namespace
-from typing import List
+from typing import List, Tuple
 
 from tsperf.adapter import AdapterManager
 from tsperf.model.configuration import DatabaseConnectionConfiguration
+from tsperf.read.workload import Workload
 
 
 @dataclasses.dataclass
 class QueryTimerConfig(DatabaseConnectionConfiguration):
+    # Describing the dataset written by the Data Generator, to draw query parameters from.
+    id_start: int = 1
+    id_end: int = 500
+    timestamp_start: float = None
+    timestamp_delta: float = 0.5
+    ingest_size: int = 1000
+
+    # Seed for the random number generators of the query parameters, None for random values.
+    seed: int = None
+
     # The query to invoke against the database.
     query: str = None
 
+    # A workload file with a weighted mix of named queries, used instead of `query`.
+    workload: str = None
+
     # The concurrency level.
     concurrency: int = 4
 
+    # How many processes to spread the worker threads over.
+    processes: int = 1
+
     # How many times each thread executes the query.
     iterations: int = 1000
 
+    # The target number of queries per second across all threads, 0 runs a closed loop.
+    rate: float = 0
+
+    # How many seconds each thread executes the query, used instead of `iterations`, 0 to disable.
+    duration: float = 0
+
+    # The concurrency levels to step through, each running `iterations` or `duration`.
+    sweep: List[int] = None
+
     refresh_interval: float = 0.1
     quantiles: List[str] = "50,60,75,90,99"
 
@@ -62,16 +89,32 @@ class QueryTimerConfig(DatabaseConnectionConfiguration):
         if isinstance(self.query, str):
             self.query = self.query.format(**self.__dict__)
 
+        if self.workload is not None:
+            try:
+                self.load_workload()
+            except (OSError, ValueError, KeyError) as ex:
+                self.invalid_configs.append(f"WORKLOAD: {self.workload}. {ex}")
+
         if "PYTEST_CURRENT_TEST" not in os.environ:
             if self.address is None or self.address.strip() == "":
                 self.invalid_configs.append("--address parameter or ADDRESS environment variable required")
 
-        if self.concurrency * self.iterations < 100:
+        if not self.duration and self.concurrency * self.iterations < 100:
             self.invalid_configs.append(
                 f"CONCURRENCY: {self.concurrency}; ITERATIONS: {self.iterations}. At least "
                 f"100 queries must be run. The current configuration results "
                 f"in {self.concurrency * self.iterations} queries (concurrency * iterations)"
             )
+        if self.processes < 1:
+            self.invalid_configs.append(f"PROCESSES: {self.processes} < 1")
+        elif self.processes > self.concurrency:
+            self.invalid_configs.append(f"PROCESSES: {self.processes} > CONCURRENCY: {self.concurrency}")
+        if self.rate < 0:
+            self.invalid_configs.append(f"RATE: {self.rate} < 0")
+        if self.duration < 0:
+            self.invalid_configs.append(f"DURATION: {self.duration} < 0")
+        if self.sweep is not None:
+            self.validate_sweep()
         terminal_size = shutil.get_terminal_size()
         if len(self.quantiles) > terminal_size.lines - 12:
             self.invalid_configs.append(
@@ -83,6 +126,46 @@ class QueryTimerConfig(DatabaseConnectionConfiguration):
 
         return len(self.invalid_configs) == 0
 
+    def validate_sweep(self):
+        if isinstance(self.sweep, str):
+            try:
+                self.sweep = [int(level) for level in self.sweep.split(",")]
+            except ValueError:
+                self.invalid_configs.append(f"SWEEP: {self.sweep}. Concurrency levels must be integers")
+                return
+        if not self.sweep or min(self.sweep) < 1:
+            self.invalid_configs.append(f"SWEEP: {self.sweep}. Concurrency levels must be at least 1")
+        elif any(a >= b for a, b in zip(self.sweep, self.sweep[1:])):
+            self.invalid_configs.append(f"SWEEP: {self.sweep}. Concurrency levels must be ascending")
+        elif self.processes > self.sweep[0]:
+            self.invalid_configs.append(f"PROCESSES: {self.processes} > SWEEP: {self.sweep[0]}")
+        if self.rate:
+            self.invalid_configs.append(f"SWEEP: {self.sweep}; RATE: {self.rate}. A sweep runs a closed loop")
+
+    def time_range(self) -> Tuple[float, float]:
+        """
+        The time range of the dataset written by the Data Generator. Without a start
+        timestamp, the dataset is assumed to end now.
+        """
+        duration = self.ingest_size * self.timestamp_delta
+        if self.timestamp_start is None:
+            end = time.time()
+            return end - duration, end
+        if self.ingest_size == 0:
+            return self.timestamp_start, max(self.timestamp_start, time.time())
+        return self.timestamp_start, self.timestamp_start + duration
+
+    def load_workload(self) -> Workload:
+        """
+        The queries to run, either from the workload file, or the single `query`.
+        """
+        # `tsperf.engine` imports the adapters, which import this module.
+        from tsperf.engine import load_schema
+
+        if self.workload is None:
+            return Workload.single(self.query)
+        return Workload.from_dict(load_schema(self.workload)).format(**self.__dict__)
+
     def load_args(self, args: Namespace):
         for element in vars(self):
             if element in args:
@@ -19,22 +19,32 @@
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
 import io
+import itertools
 import logging
+import multiprocessing
+import random
 import shutil
-import statistics
 import sys
 import time
 from contextlib import redirect_stdout
-from queue import Queue
-from threading import Thread
+from queue import Empty, Queue
+from threading import Event, Lock, Thread, Timer
+from typing import Dict, List, Optional, Tuple, Union
 
-import numpy
 from blessed import Terminal
 
 from tsperf.engine import TsPerfEngine, load_schema
-from tsperf.model.interface import AbstractDatabaseInterface
+from tsperf.model.interface import AbstractDatabaseInterface, QueryProfile
 from tsperf.read.config import QueryTimerConfig
+from tsperf.read.sweep import SweepLevel, report_sweep
+from tsperf.read.template import ParameterGenerator, QueryTemplate
+from tsperf.read.workload import Workload, WorkloadQuery
+from tsperf.util import tictrack
+from tsperf.util.histogram import Histogram
+from tsperf.util.rate_limiter import RateLimiter
+from tsperf.util.running_statistics import RunningStatistics
 from tsperf.util.tictrack import tic_toc, timed_function
+from tsperf.write.model.channel import derive_seed
 
 terminal = Terminal()
 logger = logging.getLogger(__name__)
@@ -47,7 +57,171 @@ schema = {"value": "none"}
 start_time = time.time()
 success = 0
 failure = 0
+end_time = None
 queries_done = Queue(1)
+stop_event = Event()
+workload: Workload = None
+rate_limiter: Optional[RateLimiter] = None
+# the rate summaries submitted by the worker processes, keyed by process index
+process_rates: Dict[int, dict] = {}
+
+
+class WorkerStatistics:
+    """
+    Streaming aggregates of the durations of a single query of a single worker thread, read
+    by the progress monitor. The lock is only contended while the progress monitor reads.
+
+    With a target rate, the response times are recorded as well. They are measured from
+    the intended start time of a query, so they include the time a query was delayed
+    because the database did not keep up with the schedule (coordinated omission).
+
+    When the adapter profiles its queries, the durations of their phases, and the number of
+    rows and bytes of their results are recorded as well, see `QueryProfile`.
+    """
+
+    def __init__(self, name: str = None):
+        self.name = name
+        self.lock = Lock()
+        self.statistics = RunningStatistics()
+        # two significant digits are precise enough for the display, and cheap to merge
+        self.histogram = Histogram(significant_digits=2)
+        self.response_times = Histogram()
+        # the latencies since the last interval snapshot, see `snapshot_intervals`
+        self.interval = Histogram()
+        self.failure = 0
+        self.profiles = {name: RunningStatistics() for name in (*QueryProfile.PHASES, "rows", "bytes")}
+
+    def record(self, duration: float, response_time: float = None):
+        with self.lock:
+            self.statistics.add(duration)
+            self.histogram.record(duration)
+            if response_time is not None:
+                self.response_times.record(response_time)
+            self.interval.record(duration if response_time is None else response_time)
+
+    def record_profile(self, profile: QueryProfile):
+        with self.lock:
+            for name, statistics in self.profiles.items():
+                statistics.add(getattr(profile, name))
+
+    def record_failure(self):
+        with self.lock:
+            self.failure += 1
+
+    def take(self) -> "WorkerStatistics":
+        """
+        Take the aggregates recorded so far, and start over with empty ones.
+        """
+        delta = WorkerStatistics(self.name)
+        with self.lock:
+            delta.statistics, self.statistics = self.statistics, delta.statistics
+            delta.histogram, self.histogram = self.histogram, delta.histogram
+            delta.response_times, self.response_times = self.response_times, delta.response_times
+            delta.interval, self.interval = self.interval, delta.interval
+            delta.failure, self.failure = self.failure, 0
+            delta.profiles, self.profiles = self.profiles, delta.profiles
+        return delta
+
+    def merge(self, other: "WorkerStatistics"):
+        with self.lock:
+            self.statistics.merge(other.statistics)
+            self.histogram.merge(other.histogram)
+            self.response_times.merge(other.response_times)
+            self.interval.merge(other.interval)
+            self.failure += other.failure
+            for name, statistics in other.profiles.items():
+                self.profiles[name].merge(statistics)
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+
+worker_statistics: List[WorkerStatistics] = []
+worker_statistics_lock = Lock()
+
+
+def create_worker_statistics(name: str = None) -> WorkerStatistics:
+    statistics = WorkerStatistics(name)
+    with worker_statistics_lock:
+        worker_statistics.append(statistics)
+    return statistics
+
+
+def get_worker_statistics(name: str = None) -> List[WorkerStatistics]:
+    with worker_statistics_lock:
+        return [worker for worker in worker_statistics if name is None or worker.name == name]
+
+
+def merge_worker_statistics(name: str = None) -> Tuple[RunningStatistics, Histogram]:
+    """
+    Merge the query duration aggregates of all worker threads, optionally only those of
+    the query with the given name. The cost only depends on the number of workers and
+    queries in the workload, not on the number of executed queries.
+    """
+    statistics = RunningStatistics()
+    histogram = Histogram(significant_digits=2)
+    for worker in get_worker_statistics(name):
+        with worker.lock:
+            statistics.merge(worker.statistics)
+            histogram.merge(worker.histogram)
+    return statistics, histogram
+
+
+def merge_profiles(name: str = None) -> Dict[str, RunningStatistics]:
+    """
+    Merge the query phases and result sizes of all worker threads, optionally only those
+    of the query with the given name.
+    """
+    profiles = {}
+    for worker in get_worker_statistics(name):
+        with worker.lock:
+            for key, statistics in worker.profiles.items():
+                profiles.setdefault(key, RunningStatistics()).merge(statistics)
+    return profiles
+
+
+def snapshot_intervals() -> Histogram:
+    """
+    Merge the latencies of all worker threads since the previous snapshot, and start a new
+    interval. The latencies are the response times with a target rate, and the query
+    durations otherwise.
+    """
+    histogram = Histogram()
+    for worker in get_worker_statistics():
+        with worker.lock:
+            interval, worker.interval = worker.interval, Histogram()
+        histogram.merge(interval)
+    return histogram
+
+
+def merge_response_times(name: str = None) -> Histogram:
+    """
+    Merge the response times of all worker threads, measured from the intended start times.
+    """
+    histogram = Histogram()
+    for worker in get_worker_statistics(name):
+        with worker.lock:
+            histogram.merge(worker.response_times)
+    return histogram
+
+
+def get_rate() -> Optional[Tuple[float, float]]:
+    """
+    The achieved rate and the lag of the current run with a target rate, summed up and the
+    largest over the worker processes respectively, when running them.
+    """
+    if rate_limiter is not None:
+        return rate_limiter.achieved_rate(), rate_limiter.lag
+    if process_rates:
+        summaries = list(process_rates.values())
+        return sum(summary["achieved_rate"] for summary in summaries), max(summary["lag"] for summary in summaries)
+    return None
 
 
 def get_database_adapter_old() -> AbstractDatabaseInterface:  # pragma: no cover
@@ -138,9 +312,8 @@ def print_progressbar(iteration, total, prefix="", suffix="", decimals=1, length
     filled_length = int(length * iteration // total)
     bar = fill * filled_length + "-" * (length - filled_length)
 
-    if "execute_query" in tic_toc:
-        values = tic_toc["execute_query"]
-
+    statistics, histogram = merge_worker_statistics()
+    if statistics.count > 0:
         f = io.StringIO()
         # ruff: noqa: T201
         with redirect_stdout(f):
@@ -150,15 +323,22 @@ def print_progressbar(iteration, total, prefix="", suffix="", decimals=1, length
                 f"{suffix} {round(duration, 2)}s"
             )
             print(f"time left: {round(((duration / percent) * 100) - duration, 2)}s                              ")
-            if len(values) > 1:
-                print(
-                    terminal.move_y(screen_position_y + 3)
-                    + f"rate   : {round((1 / numpy.mean(values)) * config.concurrency, 3)}qps       "
-                )
-                print(f"mean   : {round(numpy.mean(values) * 1000, 3)}ms       ")
-                print(f"stdev  : {round(numpy.std(values) * 1000, 3)}ms      ")
-                print(f"min    : {round(min(values) * 1000, 3)}ms       ")
-                print(f"max    : {round(max(values) * 1000, 3)}ms       ")
+            if statistics.count > 1:
+                p50, p99 = histogram.percentiles([50, 99])
+                achieved = get_rate()
+                if achieved is not None:
+                    rate = f"{round(achieved[0], 3)}qps of {config.rate}qps"
+                else:
+                    rate = f"{round((1 / statistics.mean) * config.concurrency, 3)}qps"
+                print(terminal.move_y(screen_position_y + 3) + f"rate   : {rate}       ")
+                print(f"mean   : {round(statistics.mean * 1000, 3)}ms       ")
+                print(f"stdev  : {round(statistics.stdev() * 1000, 3)}ms      ")
+                print(f"min    : {round(statistics.min * 1000, 3)}ms       ")
+                print(f"max    : {round(statistics.max * 1000, 3)}ms       ")
+                print(f"p50    : {round(p50 * 1000, 3)}ms       ")
+                print(f"p99    : {round(p99 * 1000, 3)}ms       ")
+                if achieved is not None:
+                    print(f"lag    : {round(achieved[1] * 1000, 3)}ms       ")
                 print(f"success: {terminal.green}{success}{terminal.normal}      ")
                 print(f"failure: {terminal.red}{failure}{terminal.normal}        ")
         report = f.getvalue()
@@ -166,35 +346,110 @@ def print_progressbar(iteration, total, prefix="", suffix="", decimals=1, length
         sys.stderr.flush()
 
 
+def get_schema_tags() -> dict:
+    for key, value in (schema or {}).items():
+        if key != "description":
+            return value.get("tags", {})
+    return {}
+
+
+def create_templates(paramstyle: Optional[str], rng: random.Random) -> Dict[str, QueryTemplate]:
+    """
+    Compile the queries of the workload which have parameters, for the parameter style of
+    the database driver. The parameter values are drawn from the dataset described by the
+    schema, the id range, and the time range.
+    """
+    templates = {}
+    for query in workload.queries:
+        if query.parameters:
+            generator = ParameterGenerator(
+                query.parameters,
+                tags=get_schema_tags(),
+                id_range=(config.id_start, config.id_end),
+                time_range=config.time_range(),
+                rng=rng,
+            )
+            templates[query.name] = QueryTemplate(query.query, generator, paramstyle=paramstyle)
+    return templates
+
+
+def render_query(query: WorkloadQuery, template: Optional[QueryTemplate]) -> Tuple[str, Union[list, dict, None]]:
+    if template is None:
+        return query.query, None
+    return template.render()
+
+
 def probe_query():
-    try:
-        engine.create_adapter().run_query(config.query)
-        return True
-    except Exception:
-        logger.exception(f"Failure executing query '{config.query}'")
-        return False
+    adapter = engine.create_adapter()
+    templates = create_templates(adapter.paramstyle, random.Random())  # noqa: S311
+    for query in workload.queries:
+        try:
+            text, parameters = render_query(query, templates.get(query.name))
+            if parameters is None:
+                adapter.run_query(text)
+            else:
+                adapter.run_query(text, parameters)
+        except Exception:
+            logger.exception(f"Failure executing query »{query.name}« '{query.query}'")
+            return False
+    return True
 
 
-def start_query_run():
+def start_query_run(index: int = 0):
     global success, failure
     adapter = engine.create_adapter()
-    for _ in range(0, config.iterations):
+    statistics = {query.name: create_worker_statistics(query.name) for query in workload.queries}
+    rng = random.Random(None if config.seed is None else derive_seed(config.seed, index))  # noqa: S311
+    selector = workload.selector(offset=index, rng=rng)
+    templates = create_templates(adapter.paramstyle, rng)
+    for _ in itertools.count() if config.duration else range(0, config.iterations):
+        if stop_event.is_set():
+            break
+        query = next(selector)
+        text, parameters = render_query(query, templates.get(query.name))
+        intended = None
+        if rate_limiter is not None:
+            # Open loop: Take the next slot of the shared schedule, regardless of how
+            # long the previous queries took.
+            intended = rate_limiter.schedule()
+            wait = intended - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
         try:
-            adapter.execute_query(config.query)
+            start = time.monotonic()
+            if parameters is None:
+                adapter.execute_query(text)
+            else:
+                adapter.execute_query(text, parameters)
+            end = time.monotonic()
+            statistics[query.name].record(end - start, None if intended is None else end - intended)
+            if isinstance(adapter.profile, QueryProfile):
+                statistics[query.name].record_profile(adapter.profile)
             success += 1
         except Exception:
             failure += 1
-            logger.exception(f"Failure executing query '{config.query}'")
+            statistics[query.name].record_failure()
+            logger.exception(f"Failure executing query »{query.name}« '{query.query}'")
+
+
+def get_progress() -> Tuple[float, float]:
+    """
+    The progress of the current run, either in executed queries, or in elapsed seconds
+    when running for a duration.
+    """
+    if config.duration:
+        return min(time.time() - start_time, config.duration), config.duration
+    return success + failure, config.concurrency * config.iterations
 
 
 def print_progress_thread():
     while queries_done.empty():
         time.sleep(config.refresh_interval)
-        total_queries = success + failure
+        done, total = get_progress()
         terminal_size = shutil.get_terminal_size()
         print_progressbar(
-            total_queries,
-            config.concurrency * config.iterations,
+            done,
+            total,
             prefix="Progress:",
             suffix="Complete",
             length=(terminal_size.columns - 40),
@@ -203,51 +458,245 @@ def print_progress_thread():
 
 def run_qt():
     logger.info(f"Starting query timer with {config} and schema {config.schema}")
-    global start_time
-    start_time = time.time()
 
     logger.info("Starting progress monitor thread")
     progress_thread = Thread(target=print_progress_thread, name="ProgressMonitor")
     progress_thread.start()
 
-    logger.info("Starting worker threads")
-    threads = []
-    logger.info(f"Invoking query »{config.query}«")
-    for i in range(0, config.concurrency):
-        thread = Thread(target=start_query_run, name=f"WorkerThread-{i}")
-        threads.append(thread)
-    for thread in threads:
-        thread.start()
-
-    logger.info("Waiting for worker threads")
-    for thread in threads:
-        thread.join()
+    run_workers()
     queries_done.put_nowait(True)
 
     logger.info("Waiting for progress monitor thread")
     progress_thread.join()
+    queries_done.get_nowait()
 
 
-def start(configuration: QueryTimerConfig):
-    global engine, schema, config
+def run_workers():
+    """
+    Run the worker threads until they have done their iterations, until the duration has
+    elapsed, or until `stop_event` is set.
+    """
+    global start_time, end_time
+    start_time = time.time()
+
+    for query in workload.queries:
+        logger.info(f"Invoking query »{query.name}« with weight {query.weight}: {query.query}")
+    timer = None
+    if config.duration:
+        timer = Timer(config.duration, stop_event.set)
+        timer.daemon = True
+        timer.start()
+    try:
+        if config.processes > 1:
+            run_worker_processes()
+        else:
+            threads = start_worker_threads(range(config.concurrency), config.rate)
+            logger.info("Waiting for worker threads")
+            for thread in threads:
+                thread.join()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    end_time = time.time()
+
+
+def run_sweep() -> List[SweepLevel]:
+    """
+    Run the workload at each concurrency level of `config.sweep`, one after another, and
+    measure the throughput and latency of each level from the worker aggregates.
+    """
+    global success, failure
+    levels = []
+    concurrency = config.concurrency
+    try:
+        for level in config.sweep:
+            logger.info(f"Sweep: Running concurrency level {level}")
+            config.concurrency = level
+            with worker_statistics_lock:
+                worker_statistics.clear()
+            success = failure = 0
+            stop_event.clear()
+            run_qt()
+
+            statistics, histogram = merge_worker_statistics()
+            result = SweepLevel(
+                concurrency=level,
+                duration=max(end_time - start_time, 1e-9),
+                success=statistics.count,
+                failure=failure,
+            )
+            if statistics.count > 0:
+                result.mean = statistics.mean
+                result.p50, result.p99 = histogram.percentiles([50, 99])
+            levels.append(result)
+            logger.info(f"Sweep: Concurrency level {level} ran {round(result.rate, 3)} queries/s")
+    finally:
+        config.concurrency = concurrency
+    return levels
+
+
+def start_worker_threads(indices: range, rate: float) -> List[Thread]:
+    global rate_limiter
+    if rate:
+        logger.info(f"Using a target rate of {rate} queries/s")
+        rate_limiter = RateLimiter(rate)
+
+    logger.info(f"Starting {len(indices)} worker threads")
+    threads = [Thread(target=start_query_run, args=(i,), name=f"WorkerThread-{i}") for i in indices]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def run_worker_processes():
+    """
+    Spread the worker threads over `config.processes` processes, to run queries beyond the
+    capacity of a single interpreter, e.g. with drivers decoding results in Python. The
+    processes submit the aggregates of their workers periodically, which are merged into
+    local proxies, so the progress display and the final report work like with threads.
+    With a target rate, they submit the summaries of their rate limiters along with them.
+    """
+    global success, failure
+    logger.info(f"Starting {config.processes} worker processes")
+    process_rates.clear()
+
+    # Use the `spawn` start method, because forking a process which already runs
+    # threads is not safe.
+    context = multiprocessing.get_context("spawn")
+    messages = context.Queue()
+    process_stop = context.Event()
+    processes = []
+    for i in range(config.processes):
+        process = context.Process(
+            target=worker_process,
+            args=(config, schema, workload, i, range(i, config.concurrency, config.processes), messages, process_stop),
+            name=f"QueryProcess-{i}",
+        )
+        processes.append(process)
+    for process in processes:
+        process.start()
+
+    proxies: Dict[Tuple[int, int], WorkerStatistics] = {}
+    try:
+        finished = 0
+        while finished < len(processes):
+            if stop_event.is_set():
+                process_stop.set()
+            try:
+                message = messages.get(timeout=config.refresh_interval)
+            except Empty:
+                continue
+            if message is None:
+                finished += 1
+                continue
+            kind, payload = message
+            if kind == "statistics":
+                index, deltas, rate = payload
+                if rate is not None:
+                    process_rates[index] = rate
+                for key, delta in deltas:
+                    if key not in proxies:
+                        proxies[key] = create_worker_statistics(delta.name)
+                    proxies[key].merge(delta)
+                    success += delta.statistics.count
+                    failure += delta.failure
+            elif kind == "tictrack":
+                tic_toc.merge(payload)
+    finally:
+        process_stop.set()
+        for process in processes:
+            process.join()
+
+
+def worker_process(
+    configuration: QueryTimerConfig,
+    schema_: dict,
+    workload_: Workload,
+    index: int,
+    indices: range,
+    messages,
+    process_stop,
+):
+    """
+    Entrypoint of a worker process. It runs the worker threads with the given indices, and
+    submits the aggregates of their workers to `messages` every `refresh_interval` seconds,
+    and its `tictrack` result sets at the end.
+
+    When done, a `None` sentinel is submitted to signal the end of the process.
+    """
+    global config, schema, workload, engine
+    config = configuration
+    schema = schema_
+    workload = workload_
+    engine = TsPerfEngine(config=config, schema=schema)
+    try:
+        # the processes share the target rate evenly
+        threads = start_worker_threads(indices, config.rate / config.processes)
+        while any(thread.is_alive() for thread in threads):
+            if process_stop.wait(config.refresh_interval):
+                stop_event.set()
+                break
+            submit_worker_statistics(index, messages)
+        for thread in threads:
+            thread.join()
+        submit_worker_statistics(index, messages)
+        messages.put(("tictrack", tic_toc.snapshot()))
+    except Exception as e:
+        logger.exception(e)
+    finally:
+        messages.put(None)
+
+
+def submit_worker_statistics(index: int, messages):
+    deltas = []
+    for local_index, worker in enumerate(get_worker_statistics()):
+        delta = worker.take()
+        if delta.statistics.count or delta.failure:
+            deltas.append(((index, local_index), delta))
+    rate = rate_limiter.summary() if rate_limiter is not None else None
+    if deltas or rate is not None:
+        messages.put(("statistics", (index, deltas, rate)))
+
+
+def setup(configuration: QueryTimerConfig, schema_: dict = None):
+    """
+    Load the schema and the workload, validate the configuration, and probe the queries,
+    without starting to run them.
+    """
+    global engine, schema, config, workload
 
     # TODO: Move schema loading to engine.
-    schema = load_schema(configuration.schema)
+    schema = schema_ if schema_ is not None else load_schema(configuration.schema)
     engine = TsPerfEngine(config=configuration, schema=schema)
     engine.bootstrap()
     config = engine.config
+    workload = config.load_workload()
 
-    logger.info(f"Probing query »{config.query}«")
+    logger.info("Probing queries")
     if not probe_query():
         raise RuntimeError("Error probing database. Not starting machinery.")
+    stop_event.clear()
 
-    logger.info(f"Running {config.iterations} iterations with concurrency {config.concurrency}")
+
+def start(configuration: QueryTimerConfig):
+    setup(configuration)
+    if config.sweep:
+        logger.info(f"Sweeping concurrency levels {config.sweep}")
+        with terminal.hidden_cursor():
+            levels = run_sweep()
+        logger.info(f"Sweep:\n{report_sweep(levels)}")
+        return
+
+    if config.duration:
+        logger.info(f"Running for {config.duration} seconds with concurrency {config.concurrency}")
+    else:
+        logger.info(f"Running {config.iterations} iterations with concurrency {config.concurrency}")
 
     with terminal.hidden_cursor():
         terminal_size = shutil.get_terminal_size()
         print_progressbar(
             0,
-            config.concurrency * config.iterations,
+            get_progress()[1],
             prefix="Progress:",
             suffix="Complete",
             length=(terminal_size.columns - 40),
@@ -256,13 +705,84 @@ def start(configuration: QueryTimerConfig):
         run_qt()
 
         if "execute_query" in tic_toc:
-            values = tic_toc["execute_query"]
-            qus = statistics.quantiles(values, n=100, method="inclusive")
-            f = io.StringIO()
-            with redirect_stdout(f):
-                for i in range(0, len(qus)):
-                    if str(i + 1) in config.quantiles:
-                        print(f"p{i+1}  : {round(qus[i]*1000, 3)}ms")
-            report = f.getvalue()
+            report = report_quantiles()
             logger.info("\n")
             logger.info(f"Statistics:\n{report}")
+
+        profiles = report_profiles()
+        if profiles:
+            logger.info(f"Phases:\n{profiles}")
+
+        if len(workload.queries) > 1:
+            logger.info(f"Statistics per query:\n{report_workload()}")
+
+
+def report_quantiles() -> str:
+    """
+    Format the chosen quantiles of the query durations. With a target rate, the quantiles of
+    the response times, corrected for coordinated omission, are reported next to them.
+    """
+    qus = tictrack.quantiles(tic_toc["execute_query"], n=100)
+    corrected = None
+    # the response times are merged from the worker processes, when running them
+    if config.rate:
+        response_times = merge_response_times()
+        if response_times.count > 0:
+            corrected = response_times.quantiles(n=100)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        for i in range(0, len(qus)):
+            if str(i + 1) in config.quantiles:
+                if corrected is None:
+                    print(f"p{i+1}  : {round(qus[i]*1000, 3)}ms")
+                else:
+                    print(f"p{i+1}  : {round(qus[i]*1000, 3)}ms (corrected: {round(corrected[i]*1000, 3)}ms)")
+    return f.getvalue()
+
+
+def report_workload() -> str:
+    """
+    Format the success and failure counts, the rate, and the chosen quantiles of each query
+    of the workload.
+    """
+    duration = max((end_time or time.time()) - start_time, 1e-9)
+    f = io.StringIO()
+    with redirect_stdout(f):
+        for query in workload.queries:
+            statistics, histogram = merge_worker_statistics(query.name)
+            failures = sum(worker.failure for worker in get_worker_statistics(query.name))
+            print(f"{query.name}:")
+            print(f"  success: {statistics.count}")
+            print(f"  failure: {failures}")
+            print(f"  rate   : {round(statistics.count / duration, 3)}qps")
+            if statistics.count == 0:
+                continue
+            print(f"  mean   : {round(statistics.mean * 1000, 3)}ms")
+            response_times = merge_response_times(query.name)
+            for quantile in config.quantiles:
+                label = f"p{quantile}".ljust(7)
+                line = f"  {label}: {round(histogram.percentile(float(quantile)) * 1000, 3)}ms"
+                if response_times.count > 0:
+                    line += f" (corrected: {round(response_times.percentile(float(quantile)) * 1000, 3)}ms)"
+                print(line)
+            print(report_profiles(query.name, indent="  "), end="")
+    return f.getvalue()
+
+
+def report_profiles(name: str = None, indent: str = "") -> str:
+    """
+    Format the mean and maximum duration of each query phase, and the mean and total number
+    of rows and bytes per query, if the adapter profiles its queries.
+    """
+    profiles = merge_profiles(name)
+    if not profiles or profiles["rows"].count == 0:
+        return ""
+    f = io.StringIO()
+    with redirect_stdout(f):
+        for phase in QueryProfile.PHASES:
+            mean, maximum = profiles[phase].mean * 1000, profiles[phase].max * 1000
+            print(f"{indent}{phase:<7}: mean {round(mean, 3)}ms, max {round(maximum, 3)}ms")
+        for key in ("rows", "bytes"):
+            mean, total = profiles[key].mean, profiles[key].mean * profiles[key].count
+            print(f"{indent}{key:<7}: mean {round(mean, 1)}, total {round(total)}")
+    return f.getvalue()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import dataclasses
+import io
+from contextlib import redirect_stdout
+from typing import List, Optional
+
+
+@dataclasses.dataclass
+class SweepLevel:
+    """
+    Throughput and latency of the queries at one concurrency level of a sweep.
+    """
+
+    concurrency: int
+    duration: float
+    success: int
+    failure: int
+    mean: float = None
+    p50: float = None
+    p99: float = None
+
+    @property
+    def rate(self) -> float:
+        return self.success / self.duration if self.duration > 0 else 0.0
+
+    def format(self) -> str:
+        line = f"{self.concurrency:>11}  {self.rate:>12.3f}"
+        for value in (self.mean, self.p50, self.p99):
+            line += "  " + (f"{value * 1000:>10.3f}" if value is not None else f"{'-':>10}")
+        return line + f"  {self.failure:>8}"
+
+
+def find_knee(levels: List[SweepLevel]) -> Optional[int]:
+    """
+    Find the knee of the throughput curve, the concurrency level beyond which adding more
+    concurrency yields diminishing returns, using the Kneedle algorithm for concave
+    increasing curves: After normalizing both axes to [0, 1], the knee is the level with
+    the largest distance above the straight line between the first and the last level.
+
+    :return: the index of the knee level, None when the curve does not bend (yet)
+    """
+    if len(levels) < 3:
+        return None
+    xs = [level.concurrency for level in levels]
+    ys = [level.rate for level in levels]
+    x_range = xs[-1] - xs[0]
+    y_low, y_high = min(ys), max(ys)
+    if x_range <= 0 or y_high <= y_low:
+        return None
+    differences = [(y - y_low) / (y_high - y_low) - (x - xs[0]) / x_range for x, y in zip(xs, ys)]
+    knee = max(range(len(levels)), key=differences.__getitem__)
+    if differences[knee] <= 0:
+        return None
+    return knee
+
+
+def report_sweep(levels: List[SweepLevel]) -> str:
+    """
+    Format the throughput/latency curve of a sweep, and its knee.
+    """
+    f = io.StringIO()
+    # ruff: noqa: T201
+    with redirect_stdout(f):
+        header = [f"{'concurrency':>11}", f"{'rate [qps]':>12}"]
+        header += [f"{label:>10}" for label in ("mean [ms]", "p50 [ms]", "p99 [ms]")]
+        print("  ".join(header) + f"  {'failure':>8}")
+        for level in levels:
+            print(level.format())
+        knee = find_knee(levels)
+        if knee is None:
+            print("No knee found, the throughput does not level off within the sweep")
+        else:
+            level = levels[knee]
+            latency = f", p99 {round(level.p99 * 1000, 3)}ms" if level.p99 is not None else ""
+            print(f"Knee at concurrency {level.concurrency}: {round(level.rate, 3)}qps{latency}")
+    return f.getvalue()
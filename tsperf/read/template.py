@@ -0,0 +1,171 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import datetime
+import random
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+# Named placeholders like `:sensor_id`, but not PostgreSQL type casts like `::text`.
+PLACEHOLDER = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+
+class ParameterGenerator:
+    """
+    Draw fresh values for the parameters of a query template on each execution, so that
+    repeated executions do not hit the same cached results.
+
+    The parameter types are:
+
+    - `tag`: A value of a tag of the write schema, `tag` defaults to the parameter name.
+    - `time_window`: A random window within the ingested time range, of the given `length`
+      in seconds, or a random length from a `[min, max]` range. It binds two values,
+      `<name>_start` and `<name>_end`.
+    - `integer`: A random integer between `min` and `max`, inclusive.
+    - `choice`: One of the given `values`.
+    """
+
+    def __init__(
+        self,
+        parameters: Dict[str, dict],
+        tags: dict = None,
+        id_range: Tuple[int, int] = (1, 500),
+        time_range: Tuple[float, float] = (0.0, 0.0),
+        rng: Optional[random.Random] = None,
+    ):
+        self.rng = rng or random.Random()  # noqa: S311
+        self.id_range = id_range
+        self.time_range = time_range
+        self.names = []
+        self.generators = []
+        tags = tags or {}
+        for name, spec in parameters.items():
+            kind = spec.get("type")
+            if kind == "tag":
+                tag = spec.get("tag", name)
+                if tag not in tags or tag == "description":
+                    raise ValueError(f"Parameter »{name}«: Unknown tag »{tag}«")
+                self.names.append(name)
+                self.generators.append(self._tag_generator(tags[tag]))
+            elif kind == "time_window":
+                self.names.append((f"{name}_start", f"{name}_end"))
+                self.generators.append(self._time_window_generator(spec.get("length", 3600)))
+            elif kind == "integer":
+                if "max" not in spec:
+                    raise ValueError(f"Parameter »{name}«: No `max` value")
+                self.names.append(name)
+                low, high = int(spec.get("min", 0)), int(spec["max"])
+                self.generators.append(lambda low=low, high=high: self.rng.randint(low, high))
+            elif kind == "choice":
+                values = list(spec.get("values") or [])
+                if not values:
+                    raise ValueError(f"Parameter »{name}«: No values to choose from")
+                self.names.append(name)
+                self.generators.append(lambda values=values: self.rng.choice(values))
+            else:
+                raise ValueError(f"Parameter »{name}«: Unknown type »{kind}«")
+
+    @property
+    def bound_names(self) -> List[str]:
+        names = []
+        for name in self.names:
+            names.extend(name if isinstance(name, tuple) else [name])
+        return names
+
+    def _tag_generator(self, definition):
+        if definition == "id":
+            low, high = self.id_range
+            return lambda: self.rng.randint(low, high)
+        if isinstance(definition, list):
+            return lambda: self.rng.choice(definition)
+        return lambda: self.rng.randrange(int(definition))
+
+    def _time_window_generator(self, length: Union[float, List[float]]):
+        start, end = self.time_range
+
+        def generate():
+            if isinstance(length, list):
+                duration = self.rng.uniform(*length)
+            else:
+                duration = float(length)
+            window_start = self.rng.uniform(start, max(start, end - duration))
+            return (
+                datetime.datetime.fromtimestamp(window_start, tz=datetime.timezone.utc),
+                datetime.datetime.fromtimestamp(window_start + duration, tz=datetime.timezone.utc),
+            )
+
+        return generate
+
+    def generate(self) -> dict:
+        values = {}
+        for name, generator in zip(self.names, self.generators):
+            if isinstance(name, tuple):
+                values.update(zip(name, generator()))
+            else:
+                values[name] = generator()
+        return values
+
+
+class QueryTemplate:
+    """
+    A query with named placeholders like `:sensor_id`, compiled once for the parameter style
+    of the database driver, see `AbstractDatabaseInterface.paramstyle`. Adapters without
+    parameter support receive the values rendered into the query text as SQL literals.
+    """
+
+    def __init__(self, query: str, generator: ParameterGenerator, paramstyle: Optional[str] = None):
+        self.generator = generator
+        self.paramstyle = paramstyle
+        self.names = PLACEHOLDER.findall(query)
+        unknown = set(self.names) - set(generator.bound_names)
+        if unknown:
+            raise ValueError(f"Query placeholders without parameter: {sorted(unknown)}")
+
+        if paramstyle == "qmark":
+            self.text = PLACEHOLDER.sub("?", query)
+        elif paramstyle == "pyformat":
+            self.text = PLACEHOLDER.sub(r"%(\1)s", query.replace("%", "%%"))
+        elif paramstyle == "flux":
+            self.text = PLACEHOLDER.sub(r"params.\1", query)
+        elif paramstyle is None:
+            self.text = query
+        else:
+            raise ValueError(f"Unknown parameter style: {paramstyle}")
+
+    def render(self) -> Tuple[str, Optional[Union[list, dict]]]:
+        """
+        Draw new parameter values, and return the query text and its driver parameters.
+        """
+        values = self.generator.generate()
+        if self.paramstyle == "qmark":
+            return self.text, [values[name] for name in self.names]
+        if self.paramstyle is None:
+            return PLACEHOLDER.sub(lambda match: sql_literal(values[match.group(1)]), self.text), None
+        return self.text, {name: values[name] for name in self.names}
+
+
+def sql_literal(value) -> str:
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
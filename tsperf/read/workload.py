@@ -0,0 +1,140 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import dataclasses
+import random
+from enum import Enum
+from typing import Dict, Iterator, List, Optional
+
+
+class WorkloadMix(Enum):
+    RANDOM = "random"
+    RATIO = "ratio"
+
+
+@dataclasses.dataclass
+class WorkloadQuery:
+    name: str
+    query: str
+    weight: float = 1
+    # Generators for the named placeholders of the query, see `ParameterGenerator`.
+    parameters: Dict[str, dict] = None
+
+
+class Workload:
+    """
+    A mix of named queries with weights, run by the Query Timer.
+
+    With the `random` mix, each thread picks the next query at random, with a probability
+    proportional to its weight. With the `ratio` mix, each thread runs the queries in a fixed
+    sequence which holds the ratio of the weights.
+    """
+
+    def __init__(self, queries: List[WorkloadQuery], mix: WorkloadMix = WorkloadMix.RANDOM):
+        if not queries:
+            raise ValueError("Workload needs at least one query")
+        names = [query.name for query in queries]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Workload query names must be unique: {names}")
+        for query in queries:
+            if not query.query:
+                raise ValueError(f"Workload query »{query.name}« is empty")
+            if query.parameters is not None and not isinstance(query.parameters, dict):
+                raise ValueError(f"Workload query »{query.name}« needs `parameters` as an object")
+            if query.weight <= 0:
+                raise ValueError(f"Workload query »{query.name}« has weight {query.weight} <= 0")
+        self.queries = queries
+        self.mix = WorkloadMix(mix)
+
+    @classmethod
+    def single(cls, query: str) -> "Workload":
+        return cls([WorkloadQuery(name="query", query=query)])
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Workload":
+        """
+        Create a workload from its JSON representation::
+
+            {
+                "mix": "random",
+                "queries": [
+                    {"name": "last_value", "query": "SELECT ...", "weight": 10},
+                    {
+                        "name": "hourly_avg",
+                        "query": "SELECT ... WHERE ts >= :window_start AND ts < :window_end",
+                        "parameters": {"window": {"type": "time_window", "length": 3600}}
+                    }
+                ]
+            }
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("queries"), list):
+            raise ValueError("Workload needs a list of `queries`")
+        queries = []
+        for index, item in enumerate(data["queries"]):
+            if isinstance(item, str):
+                item = {"query": item}
+            queries.append(
+                WorkloadQuery(
+                    name=str(item.get("name", f"query-{index}")),
+                    query=item.get("query"),
+                    weight=float(item.get("weight", 1)),
+                    parameters=item.get("parameters"),
+                )
+            )
+        return cls(queries, mix=data.get("mix", WorkloadMix.RANDOM.value))
+
+    def format(self, **kwargs) -> "Workload":
+        """
+        Substitute configuration values into the query strings, like `QUERY`.
+        """
+        queries = [dataclasses.replace(query, query=query.query.format(**kwargs)) for query in self.queries]
+        return Workload(queries, mix=self.mix)
+
+    def selector(self, offset: int = 0, rng: Optional[random.Random] = None) -> Iterator[WorkloadQuery]:
+        """
+        Endless sequence of queries according to the mix.
+
+        :param offset: with the `ratio` mix, where to start in the sequence, so that the
+                       threads do not run the same query at the same time
+        :param rng: with the `random` mix, the random number generator to use
+        """
+        if len(self.queries) == 1:
+            query = self.queries[0]
+            while True:
+                yield query
+
+        if self.mix == WorkloadMix.RANDOM:
+            rng = rng or random.Random()  # noqa: S311
+            weights = [query.weight for query in self.queries]
+            while True:
+                yield from rng.choices(self.queries, weights=weights, k=64)
+
+        # Smooth weighted round-robin: Spreads the queries evenly across the sequence.
+        total = sum(query.weight for query in self.queries)
+        current = [0.0] * len(self.queries)
+        position = 0
+        while True:
+            for index, query in enumerate(self.queries):
+                current[index] += query.weight
+            selected = max(range(len(current)), key=current.__getitem__)
+            current[selected] -= total
+            if position >= offset:
+                yield self.queries[selected]
+            position += 1
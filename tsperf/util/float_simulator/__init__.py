@@ -20,6 +20,9 @@
 # software solely pursuant to the terms of the relevant commercial agreement.
 
 import random
+from typing import Optional
+
+import numpy
 
 
 class FloatSimulator:
@@ -39,6 +42,7 @@ class FloatSimulator:
         variance: float,
         error_rate: float = 0,
         error_length: float = 0,
+        seed: Optional[int] = None,
     ):
         """
         :param mean: the average value of the simulator
@@ -55,7 +59,11 @@ class FloatSimulator:
             2.3 means at least a length of 2, with a 30% chance of a length of 3
             51.01 means at least a length of 51, with a 1% chance of a length of 52
             there is always a 1% chance the error will continue longer
+        :param seed: optional. Seed for the random number generator of this instance.
+            default None -> the shared generator of the `random` module
         """
+        # a generator of its own holds about 2.5 KB of state, so it is only created when seeded
+        self.random = random if seed is None else random.Random(seed)
         self.value_count = 0
         self.error_count = 0
         self.last_none_error_value = 0
@@ -69,7 +77,7 @@ class FloatSimulator:
         self.current_error_length = error_length
         self.variance = variance
         self.current_error = False
-        self.value = round(random.uniform(self.mean - self.variance, self.mean + self.variance), 2)
+        self.value = round(self.random.uniform(self.mean - self.variance, self.mean + self.variance), 2)
         self.factors = [-1, 1]
 
     def calculate_next_value(self) -> float:
@@ -89,7 +97,7 @@ class FloatSimulator:
 
         # this calculates if the next value is an error it takes the percentage of the error_rate variable and
         # multiplies it by 1000 and then checks if a random value in range 0 - 1000 is below the resulting value
-        is_error = random.randint(0, 1000) < (self.current_error_rate * 1000)
+        is_error = self.random.randint(0, 1000) < (self.current_error_rate * 1000)
 
         # if the next value is not an error the new value is calculated and the error variables reset
         # otherwise a new error is calculated
@@ -113,7 +121,7 @@ class FloatSimulator:
         # value change is calculated by adding a value within the variance range to the current value
         # by multiplying `factors[random.randint(0,1)]` to the value_change variable it is either
         # added or subtracted from the last value
-        value_change = random.uniform(0, self.variance)
+        value_change = self.random.uniform(0, self.variance)
 
         # chance of going up or down is also influenced how far from the mean we are
         factor = self.factors[self._decide_factor()]
@@ -135,7 +143,9 @@ class FloatSimulator:
         chance = (50 * self.standard_deviation) - distance
 
         return (
-            continue_direction if random.randint(0, int(100 * self.standard_deviation)) < chance else change_direction
+            continue_direction
+            if self.random.randint(0, int(100 * self.standard_deviation)) < chance
+            else change_direction
         )
 
     def _new_error_value(self):
@@ -146,10 +156,107 @@ class FloatSimulator:
         # otherwise a new error is calculated and chosen randomly from the upper or lower values
         if not self.current_error:
             if self.value < self.mean:
-                self.value = round(random.uniform(self.minimum, self.mean - self.standard_deviation), 2)
+                self.value = round(self.random.uniform(self.minimum, self.mean - self.standard_deviation), 2)
             else:
-                self.value = round(random.uniform(self.mean + self.standard_deviation, self.maximum), 2)
+                self.value = round(self.random.uniform(self.mean + self.standard_deviation, self.maximum), 2)
             self.current_error = True
         else:
-            value_change = round(random.uniform(0, self.variance), 2)
-            self.value += value_change * self.factors[random.randint(0, 1)]
+            value_change = round(self.random.uniform(0, self.variance), 2)
+            self.value += value_change * self.factors[self.random.randint(0, 1)]
+
+
+class FloatSimulatorArray:
+    """
+    The FloatSimulatorArray is the vectorized variant of the FloatSimulator. It holds the state of many
+    simulated channels sharing the same statistical schema in NumPy arrays, and computes the next value
+    for all of them at once.
+
+    The values follow the same random walk, mean reversion and error semantics as the FloatSimulator.
+
+    To use the FloatSimulatorArray instantiate an object and call the `next_values()` function
+    """
+
+    def __init__(
+        self,
+        size: int,
+        mean: float,
+        minimum: float,
+        maximum: float,
+        stdev: float,
+        variance: float,
+        error_rate: float = 0,
+        error_length: float = 0,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param size: the number of simulated channels
+        :param seed: optional. Seed for the random number generator of this instance.
+            default None -> fresh entropy from the operating system
+
+        For all other parameters, see `FloatSimulator`.
+        """
+        self.size = size
+        self.value_count = 0
+        self.error_count = 0
+        self.mean = mean
+        self.minimum = minimum
+        self.maximum = maximum
+        self.standard_deviation = stdev
+        self.default_error_rate = error_rate
+        self.default_error_length = error_length
+        self.variance = variance
+        self.random = numpy.random.default_rng(seed)
+        self.current_error_rate = numpy.full(size, error_rate, dtype=numpy.float64)
+        self.current_error_length = numpy.full(size, error_length, dtype=numpy.float64)
+        self.current_error = numpy.zeros(size, dtype=bool)
+        self.last_none_error_value = numpy.zeros(size, dtype=numpy.float64)
+        self.value = numpy.round(self.random.uniform(self.mean - self.variance, self.mean + self.variance, size), 2)
+
+    def next_values(self) -> numpy.ndarray:
+        """
+        This function returns the next value for each simulated channel
+        :return: array of floats with `size` elements
+        """
+        size = self.size
+        was_error = self.current_error
+
+        # on consecutive errors, the chance for the next value to also be an error decreases each time
+        self.current_error_length = numpy.where(was_error, self.current_error_length - 1, self.current_error_length)
+        self.current_error_rate = numpy.where(
+            was_error, numpy.maximum(self.current_error_length, 0.01), self.current_error_rate
+        )
+        is_error = self.random.integers(0, 1001, size) < (self.current_error_rate * 1000)
+        is_value = ~is_error
+
+        # new values, see `FloatSimulator._new_value` and `FloatSimulator._decide_factor`
+        value_change = self.random.uniform(0, self.variance, size)
+        above_mean = self.value > self.mean
+        chance = (50 * self.standard_deviation) - numpy.abs(self.value - self.mean)
+        continue_direction = self.random.integers(0, int(100 * self.standard_deviation) + 1, size) < chance
+        factor = numpy.where(above_mean == continue_direction, 1.0, -1.0)
+        base = numpy.where(was_error, self.last_none_error_value, self.value)
+        new_value = base + value_change * factor
+
+        # error values, see `FloatSimulator._new_error_value`
+        new_error = is_error & ~was_error
+        self.last_none_error_value = numpy.where(new_error, self.value, self.last_none_error_value)
+        lower_error = numpy.round(self.random.uniform(self.minimum, self.mean - self.standard_deviation, size), 2)
+        upper_error = numpy.round(self.random.uniform(self.mean + self.standard_deviation, self.maximum, size), 2)
+        new_error_value = numpy.where(self.value < self.mean, lower_error, upper_error)
+        error_change = numpy.round(self.random.uniform(0, self.variance, size), 2)
+        error_factor = numpy.where(self.random.integers(0, 2, size) == 1, 1.0, -1.0)
+        continued_error_value = self.value + error_change * error_factor
+
+        self.value = numpy.where(is_value, new_value, numpy.where(new_error, new_error_value, continued_error_value))
+
+        # reset the error state for channels returning to regular values
+        recovered = is_value & was_error
+        self.current_error_rate = numpy.where(recovered, self.default_error_rate, self.current_error_rate)
+        self.current_error_length = numpy.where(recovered, self.default_error_length, self.current_error_length)
+        self.current_error = is_error
+
+        error_count = int(numpy.count_nonzero(is_error))
+        self.error_count += error_count
+        self.value_count += size - error_count
+
+        return self.value
@@ -0,0 +1,210 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import math
+from typing import Dict, Iterable, List, Optional
+
+
+class Histogram:
+    """
+    The Histogram records values into a fixed number of logarithmic buckets, each one linearly
+    subdivided, like HdrHistogram. Recording a value costs O(1) time, and memory is bounded by
+    the number of buckets, however many values are recorded. Only the populated buckets are
+    allocated, which are few in practice.
+
+    Values are tracked with a relative error of at most `10 ** -significant_digits`, between
+    `lowest` and `highest`. Smaller values are counted as `lowest`, larger values as `highest`,
+    while `min` and `max` are always exact.
+
+    Histograms with the same parameters can be merged, for example to combine the histograms
+    recorded by multiple threads or processes.
+
+    To use the Histogram instantiate an object, call `record(value)` for each value, and query
+    it using `mean()`, `percentile(p)` or `quantiles(n)`.
+    """
+
+    def __init__(self, lowest: float = 1e-6, highest: float = 3600.0, significant_digits: int = 3):
+        """
+        :param lowest: the smallest discernible value, also the unit of the buckets
+        :param highest: the highest value to be tracked with the given precision
+        :param significant_digits: the number of significant decimal digits, between 1 and 5
+        """
+        if lowest <= 0 or highest < 2 * lowest:
+            raise ValueError(f"Invalid value range [{lowest}, {highest}]")
+        if not 1 <= significant_digits <= 5:
+            raise ValueError(f"Invalid number of significant digits: {significant_digits}")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_digits = significant_digits
+
+        # each bucket covers a power of two, split into `sub_bucket_count` linear sub-buckets,
+        # whose first half overlaps with the previous bucket and is omitted, except for the first one
+        self.sub_bucket_count = 2 ** math.ceil(math.log2(2 * 10**significant_digits))
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_half_count.bit_length() - 1
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+        self.sub_bucket_shift = self.sub_bucket_half_count_magnitude + 1
+        self.highest_unit = int(highest / lowest)
+        bucket_count = 1
+        while (self.sub_bucket_count << (bucket_count - 1)) <= self.highest_unit:
+            bucket_count += 1
+        self.size = (bucket_count + 1) * self.sub_bucket_half_count
+        # the counts of the populated buckets, keyed by their index
+        self.counts: Dict[int, int] = {}
+
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"<Histogram count={self.count} min={self.min} max={self.max}>"
+
+    def _index(self, unit: int) -> int:
+        bucket_index = (unit | self.sub_bucket_mask).bit_length() - self.sub_bucket_shift
+        sub_bucket_index = unit >> bucket_index
+        return (bucket_index << self.sub_bucket_half_count_magnitude) + sub_bucket_index
+
+    def _bucket_range(self, index: int) -> tuple:
+        """
+        The lowest value and the size of the bucket at `index`, in units.
+        """
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        return sub_bucket_index << bucket_index, 1 << bucket_index
+
+    def _value(self, index: int) -> float:
+        """
+        The value representing the bucket at `index`, its midpoint, bounded by `min` and `max`.
+        """
+        low, size = self._bucket_range(index)
+        value = (low + size / 2) * self.lowest if size > 1 else low * self.lowest
+        return min(max(value, self.min), self.max)
+
+    def record(self, value: float, count: int = 1):
+        """
+        Record a value, optionally `count` times.
+        """
+        # this is the hot path, so `_index` is inlined
+        unit = int(value / self.lowest) if value > 0 else 0
+        if unit > self.highest_unit:
+            unit = self.highest_unit
+        bucket_index = (unit | self.sub_bucket_mask).bit_length() - self.sub_bucket_shift
+        index = (bucket_index << self.sub_bucket_half_count_magnitude) + (unit >> bucket_index)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def record_many(self, values: Iterable[float]):
+        for value in values:
+            self.record(value)
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """
+        Add the values recorded by `other` to this histogram.
+        """
+        if (other.lowest, other.highest, other.significant_digits) != (
+            self.lowest,
+            self.highest,
+            self.significant_digits,
+        ):
+            raise ValueError("Histograms with different parameters can not be merged")
+        if other.count == 0:
+            return self
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram(self.lowest, self.highest, self.significant_digits)
+        return histogram.merge(self)
+
+    def reset(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def mean(self) -> float:
+        if self.count == 0:
+            raise ValueError("mean requires at least one recorded value")
+        return self.total / self.count
+
+    def stdev(self) -> float:
+        """
+        The sample standard deviation, estimated from the buckets.
+        """
+        if self.count < 2:
+            raise ValueError("stdev requires at least two recorded values")
+        mean = self.mean()
+        squares = sum(count * (self._value(index) - mean) ** 2 for index, count in self.counts.items())
+        return math.sqrt(squares / (self.count - 1))
+
+    def percentile(self, percentile: float) -> float:
+        """
+        The value below or equal to which `percentile` percent of the recorded values fall.
+        """
+        return self.percentiles([percentile])[0]
+
+    def percentiles(self, percentiles: Iterable[float]) -> List[float]:
+        """
+        Like `percentile`, but for multiple percentiles at once, walking the buckets only once.
+        """
+        if self.count == 0:
+            raise ValueError("percentiles require at least one recorded value")
+        percentiles = list(percentiles)
+        ranks = sorted((max(1, math.ceil(p / 100 * self.count)), i) for i, p in enumerate(percentiles))
+        results = [0.0] * len(percentiles)
+        position = 0
+        cumulative = 0
+        for index, count in sorted(self.counts.items()):
+            cumulative += count
+            while position < len(ranks) and ranks[position][0] <= cumulative:
+                rank, i = ranks[position]
+                # the highest rank is always the exact maximum
+                results[i] = self.max if rank >= self.count else self._value(index)
+                position += 1
+            if position == len(ranks):
+                break
+        for _, i in ranks[position:]:
+            results[i] = self.max
+        return results
+
+    def quantiles(self, n: int = 4) -> List[float]:
+        """
+        Divide the recorded values into `n` intervals with equal probability, like
+        `statistics.quantiles`, and return the `n - 1` cut points.
+        """
+        return self.percentiles(100 * i / n for i in range(1, n))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import struct
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Sequence
+
+# Microseconds between the Unix epoch and the PostgreSQL epoch, 2000-01-01.
+POSTGRES_EPOCH_OFFSET = 946_684_800_000_000
+
+SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+TRAILER = struct.pack(">h", -1)
+NULL = struct.pack(">i", -1)
+
+# The field formats of the column types, see `AbstractDatabaseInterface._get_tags_and_fields`.
+FIELD_FORMATS = {
+    "INTEGER": "i",
+    "INT": "i",
+    "BIGINT": "q",
+    "FLOAT": "d",
+    "DOUBLE PRECISION": "d",
+    "REAL": "f",
+    "BOOL": "?",
+    "BOOLEAN": "?",
+}
+
+HOUR = 3_600_000
+DAY = 86_400_000
+FIXED_PARTITIONS = {"second": 1000, "minute": 60_000, "hour": HOUR, "day": DAY}
+
+
+class LocalTimestamps:
+    """
+    Convert epoch milliseconds to wall clock milliseconds in the local timezone, and
+    truncate them to a partition, without creating `datetime` objects per value.
+
+    The results are equal to `truncate(datetime.fromtimestamp(ms / 1000), partition)`,
+    which is how the INSERT statements render timestamps. The UTC offset is cached per
+    hour, and the truncation of calendar partitions per day.
+    """
+
+    def __init__(self, partition: str):
+        if partition not in FIXED_PARTITIONS and partition not in ("week", "month", "quarter", "year"):
+            raise ValueError(f"Unsupported partition: {partition}")
+        self.partition = partition
+        self.offsets: Dict[int, int] = {}
+        self.days: Dict[int, int] = {}
+
+    def local(self, timestamp: int) -> int:
+        hour = timestamp // HOUR
+        offset = self.offsets.get(hour)
+        if offset is None:
+            offset = self.offsets[hour] = time.localtime(hour * 3600).tm_gmtoff * 1000
+        return timestamp + offset
+
+    def truncate(self, local: int) -> int:
+        width = FIXED_PARTITIONS.get(self.partition)
+        if width is not None:
+            return local - local % width
+        day = local // DAY
+        start = self.days.get(day)
+        if start is None:
+            start = self.days[day] = self._truncate_day(day)
+        return start * DAY
+
+    def _truncate_day(self, day: int) -> int:
+        if self.partition == "week":
+            # 1970-01-05 was a Monday
+            return day - (day - 4) % 7
+        value = date(1970, 1, 1) + timedelta(days=day)
+        if self.partition == "month":
+            value = value.replace(day=1)
+        elif self.partition == "quarter":
+            value = value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+        else:
+            value = value.replace(month=1, day=1)
+        return (value - date(1970, 1, 1)).days
+
+
+class BinaryCopyEncoder:
+    """
+    Encode batches for `COPY ... FROM STDIN (FORMAT binary)` into tables with the layout of
+    the PostgreSQL adapters. Each row is encoded as a timestamp, the timestamp truncated to
+    the partition, the fields, and the tags, so the COPY statement needs to list the
+    columns in this order.
+
+    Timestamps are encoded directly from the epoch milliseconds. Tag values are constant
+    per channel, so their encoding is cached, and the timestamps and fields of a row are
+    packed by a single precompiled struct.
+    """
+
+    def __init__(self, tag_types: Sequence[str], field_types: Sequence[str], partition: str):
+        self.timestamps = LocalTimestamps(partition)
+        self.tag_formats = [self._format(column_type) for column_type in tag_types]
+        self.field_formats = [self._format(column_type) for column_type in field_types]
+        self.column_count = 2 + len(tag_types) + len(field_types)
+        self.head = struct.Struct(">hiqiq")
+        self.row = struct.Struct(">hiqiq" + "".join(f"i{fmt}" for fmt in self.field_formats))
+        self.field_sizes = [struct.calcsize(">" + fmt) for fmt in self.field_formats]
+        self.tag_fragments: Dict[tuple, bytes] = {}
+
+    @staticmethod
+    def _format(column_type: str) -> str:
+        column_type = column_type.upper()
+        if column_type == "TEXT":
+            return "s"
+        if column_type not in FIELD_FORMATS:
+            raise ValueError(f"Unsupported column type for binary COPY: {column_type}")
+        return FIELD_FORMATS[column_type]
+
+    def encode(self, timestamps: Iterable[int], tags: Iterable[tuple], fields: Iterable[tuple]) -> bytes:
+        """
+        Encode the rows of a batch, given as the epoch milliseconds, the tag value tuple,
+        and the field value tuple of each row.
+        """
+        parts: List[bytes] = [SIGNATURE]
+        local_time = self.timestamps.local
+        truncate = self.timestamps.truncate
+        pack = self.row.pack
+        # the arguments of `pack`, with the field sizes interleaved with the field values
+        arguments = [self.column_count, 8, 0, 8, 0]
+        for size in self.field_sizes:
+            arguments += (size, None)
+        for timestamp, tag_values, field_values in zip(timestamps, tags, fields):
+            local = local_time(int(timestamp))
+            arguments[2] = local * 1000 - POSTGRES_EPOCH_OFFSET
+            arguments[4] = truncate(local) * 1000 - POSTGRES_EPOCH_OFFSET
+            fragment = self.tag_fragments.get(tag_values)
+            if fragment is None:
+                fragment = self.tag_fragments[tag_values] = self._encode_values(self.tag_formats, tag_values)
+            try:
+                if None in field_values:
+                    raise struct.error("NULL value")
+                arguments[6::2] = field_values
+                parts += (pack(*arguments), fragment)
+            except (struct.error, ValueError):
+                # NULL values, or values which need a conversion, e.g. floats for INTEGER columns
+                head = self.head.pack(*arguments[:5])
+                parts += (head, self._encode_values(self.field_formats, field_values), fragment)
+        parts.append(TRAILER)
+        return b"".join(parts)
+
+    @staticmethod
+    def _encode_values(formats: Sequence[str], values: Sequence) -> bytes:
+        parts = []
+        for fmt, value in zip(formats, values):
+            if value is None:
+                parts.append(NULL)
+            elif fmt == "s":
+                data = str(value).encode("utf-8")
+                parts.append(struct.pack(">i", len(data)) + data)
+            else:
+                value = int(value) if fmt in "iq" else value
+                parts.append(struct.pack(f">i{fmt}", struct.calcsize(">" + fmt), value))
+        return b"".join(parts)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import threading
+import time
+from typing import Callable, Tuple
+
+
+class RateLimiter:
+    """
+    Thread-safe open-loop scheduler holding a target rate of units (e.g. rows) per second.
+
+    Works like a token bucket which is filled with `rate` tokens per second and holds
+    up to `burst` tokens. In contrast to a closed-loop limiter, the schedule is never
+    reset when the callers fall behind: missed capacity is not forgiven, and the time
+    a caller is behind its scheduled start is reported as lag.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"rate: {rate} <= 0")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.start = None
+        self.granted = None
+        self.scheduled = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Block until `amount` units are due according to the schedule.
+
+        :param amount: number of units to acquire
+        :return: how many seconds the caller is behind schedule, 0 if on time
+        """
+        wait = self.reserve(amount)
+        if wait > 0:
+            self.sleep(wait)
+        return max(0.0, -wait)
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        Reserve `amount` units on the schedule without blocking, e.g. for use with `asyncio.sleep`.
+
+        :param amount: number of units to reserve
+        :return: how many seconds to wait until the units are due, negative when behind schedule
+        """
+        due, now = self._schedule(amount)
+        return due - now
+
+    def schedule(self, amount: float = 1) -> float:
+        """
+        Reserve `amount` units on the schedule without blocking, like `reserve`.
+
+        :param amount: number of units to reserve
+        :return: the intended start time of the units, in terms of `clock`
+        """
+        due, _ = self._schedule(amount)
+        return due
+
+    def _schedule(self, amount: float) -> Tuple[float, float]:
+        with self._lock:
+            now = self.clock()
+            if self.start is None:
+                self.start = now
+            self.scheduled += amount
+            due = self.start + (self.scheduled - self.burst) / self.rate
+            wait = due - now
+            self.lag = max(0.0, -wait)
+            self.max_lag = max(self.max_lag, self.lag)
+            self.granted = max(self.granted or 0, now + max(0.0, wait))
+        return due, now
+
+    def achieved_rate(self) -> float:
+        """
+        The rate achieved so far, i.e. the number of acquired units over the time
+        from the first request to the latest grant.
+        """
+        if self.start is None:
+            return 0.0
+        elapsed = self.granted - self.start
+        if elapsed <= 0:
+            return float(self.rate)
+        return self.scheduled / elapsed
+
+    def sustained(self, tolerance: float = 0.01) -> bool:
+        """
+        Whether the target rate has been sustained, within the given relative tolerance.
+        """
+        return self.achieved_rate() >= self.rate * (1 - tolerance)
+
+    def summary(self) -> dict:
+        return {
+            "target_rate": self.rate,
+            "achieved_rate": self.achieved_rate(),
+            "sustained": self.sustained(),
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+        }
@@ -0,0 +1,88 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import math
+from typing import Optional
+
+
+class RunningStatistics:
+    """
+    The RunningStatistics aggregate count, mean, variance, minimum and maximum of a stream of
+    values in O(1) time and memory per value, using Welford's online algorithm.
+
+    Instances can be merged, using the parallel variant of the algorithm by Chan et al., for
+    example to combine the aggregates of multiple threads.
+
+    To use the RunningStatistics instantiate an object, call `add(value)` for each value, and
+    read `mean`, `variance()`, `stdev()`, `min` and `max`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # the sum of squared differences from the current mean
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"<RunningStatistics count={self.count} mean={self.mean} min={self.min} max={self.max}>"
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "RunningStatistics") -> "RunningStatistics":
+        """
+        Add the values aggregated by `other` to these statistics.
+        """
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def copy(self) -> "RunningStatistics":
+        return RunningStatistics().merge(self)
+
+    def variance(self) -> float:
+        """
+        The sample variance, like `statistics.variance`.
+        """
+        if self.count < 2:
+            raise ValueError("variance requires at least two values")
+        return self.m2 / (self.count - 1)
+
+    def stdev(self) -> float:
+        """
+        The sample standard deviation, like `statistics.stdev`.
+        """
+        return math.sqrt(self.variance())
@@ -21,14 +21,164 @@
 # SOFTWARE.
 
 import statistics
+import threading
 import time
-from typing import Any, Callable
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
-tic_toc = {}
-tic_toc_delta = {}
+from tsperf.util.histogram import Histogram
+
+
+class Recorder:
+    """
+    The result sets recorded by a single thread. Its lock is only contended while the
+    result sets are read by another thread.
+    """
+
+    def __init__(self, thread: Optional[threading.Thread] = None):
+        self.lock = threading.Lock()
+        self.thread = thread
+        self.results: Dict[str, Union[list, Histogram]] = {}
+
+
+class ResultSets(MutableMapping):
+    """
+    Result sets keyed by function name. Each thread records into a `Recorder` of its own,
+    so recording does not need a global lock. Reading a result set merges the result sets
+    of all threads. The result sets of threads which have ended are folded into a retired
+    recorder, so short-lived threads do not leave their recorders behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._recorders: List[Recorder] = []
+        self._retired = Recorder()
+
+    def _recorder(self) -> Recorder:
+        try:
+            return self._local.recorder
+        except AttributeError:
+            recorder = Recorder(threading.current_thread())
+            with self._lock:
+                self._recorders.append(recorder)
+            self._local.recorder = recorder
+            return recorder
+
+    def _all_recorders(self) -> List[Recorder]:
+        with self._lock:
+            ended = [recorder for recorder in self._recorders if not recorder.thread.is_alive()]
+            if ended:
+                self._recorders = [recorder for recorder in self._recorders if recorder.thread.is_alive()]
+                self._retire(ended)
+            return [self._retired, *self._recorders]
+
+    def _retire(self, recorders: List[Recorder]):
+        retired = self._retired
+        with retired.lock:
+            for recorder in recorders:
+                with recorder.lock:
+                    results, recorder.results = recorder.results, {}
+                for name, result_set in results.items():
+                    if name in retired.results:
+                        retired.results[name] = _merge([retired.results[name], result_set])
+                    else:
+                        retired.results[name] = result_set
+
+    def record(self, function_name: str, value: float):
+        recorder = self._recorder()
+        with recorder.lock:
+            result_set = recorder.results.get(function_name)
+            if result_set is None:
+                result_set = recorder.results[function_name] = _new_result_set()
+            if isinstance(result_set, Histogram):
+                result_set.record(value)
+            else:
+                result_set.append(value)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Union[list, Histogram]]:
+        """
+        Merge the result sets of all threads. With `reset`, the result sets of each thread
+        are taken and replaced by empty ones atomically, so no measurement gets lost.
+        """
+        parts = {}
+        for recorder in self._all_recorders():
+            with recorder.lock:
+                if reset:
+                    results, recorder.results = recorder.results, {}
+                else:
+                    results = {name: _copy(result_set) for name, result_set in recorder.results.items()}
+            for name, result_set in results.items():
+                parts.setdefault(name, []).append(result_set)
+        return {name: _merge(result_sets) for name, result_sets in parts.items()}
+
+    def merge(self, results: Dict[str, Union[list, Histogram]]):
+        """
+        Merge result sets recorded elsewhere, for example in another process, into the
+        result sets of the calling thread.
+        """
+        recorder = self._recorder()
+        with recorder.lock:
+            for name, result_set in results.items():
+                if name in recorder.results:
+                    recorder.results[name] = _merge([recorder.results[name], _copy(result_set)])
+                else:
+                    recorder.results[name] = _copy(result_set)
+
+    def __getitem__(self, function_name: str) -> Union[list, Histogram]:
+        parts = []
+        for recorder in self._all_recorders():
+            with recorder.lock:
+                if function_name in recorder.results:
+                    parts.append(_copy(recorder.results[function_name]))
+        if not parts:
+            raise KeyError(function_name)
+        return _merge(parts)
+
+    def __setitem__(self, function_name: str, result_set: Union[list, Histogram]):
+        self.pop(function_name, None)
+        recorder = self._recorder()
+        with recorder.lock:
+            recorder.results[function_name] = result_set
+
+    def __delitem__(self, function_name: str):
+        found = False
+        for recorder in self._all_recorders():
+            with recorder.lock:
+                if recorder.results.pop(function_name, None) is not None:
+                    found = True
+        if not found:
+            raise KeyError(function_name)
+
+    def __contains__(self, function_name) -> bool:
+        return any(function_name in recorder.results for recorder in self._all_recorders())
+
+    def __iter__(self) -> Iterator[str]:
+        names = {}
+        for recorder in self._all_recorders():
+            with recorder.lock:
+                names.update(dict.fromkeys(recorder.results))
+        return iter(names)
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+    def clear(self):
+        for recorder in self._all_recorders():
+            with recorder.lock:
+                recorder.results = {}
+
+
+tic_toc = ResultSets()
+tic_toc_delta = ResultSets()
 enabled = True
 delta_enabled = True
 
+# By default, execution times are recorded into histograms of constant size. In list mode,
+# every single execution time is kept instead.
+list_mode = False
+significant_digits = 3
+
 
 def timed_function(do_print: bool = False, save_result: bool = True) -> Callable:
     """
@@ -68,37 +218,107 @@ def execute_timed_function(func: Callable, *args, do_print: bool = False, save_r
     toc = time.monotonic() - tic  # stopping time measurement
 
     if save_result:
-        if func.__name__ not in tic_toc:
-            tic_toc[func.__name__] = []
-
-        tic_toc[func.__name__].append(toc)
+        tic_toc.record(func.__name__, toc)
 
         if delta_enabled:
-            if func.__name__ not in tic_toc_delta:
-                tic_toc_delta[func.__name__] = []
-
-            tic_toc_delta[func.__name__].append(toc)
+            tic_toc_delta.record(func.__name__, toc)
 
     if do_print:
         print(f"{func.__name__} took: {toc} seconds")  # noqa: T201
     return function_return
 
 
+def _new_result_set() -> Union[list, Histogram]:
+    if list_mode:
+        return []
+    return Histogram(significant_digits=significant_digits)
+
+
+def _copy(result_set: Union[list, Histogram]) -> Union[list, Histogram]:
+    if isinstance(result_set, Histogram):
+        return result_set.copy()
+    return list(result_set)
+
+
+def _merge(result_sets: List[Union[list, Histogram]]) -> Union[list, Histogram]:
+    """
+    Merge the result sets of multiple threads into the first one. When list mode has been
+    switched while recording, lists are merged into a histogram.
+    """
+    result_sets = sorted(result_sets, key=lambda result_set: not isinstance(result_set, Histogram))
+    merged = result_sets[0]
+    for result_set in result_sets[1:]:
+        if isinstance(merged, list):
+            merged.extend(result_set)
+        elif isinstance(result_set, Histogram):
+            merged.merge(result_set)
+        else:
+            merged.record_many(result_set)
+    return merged
+
+
+def snapshot_delta() -> Dict[str, Union[list, Histogram]]:
+    """
+    Take the delta result sets of all functions, and reset them, atomically.
+    """
+    return tic_toc_delta.snapshot(reset=True)
+
+
+def mean(result_set: Union[list, Histogram]) -> float:
+    """
+    The mean of a result set, either a list of execution times or a histogram.
+    """
+    if isinstance(result_set, Histogram):
+        return result_set.mean()
+    return statistics.mean(result_set)
+
+
+def stdev(result_set: Union[list, Histogram]) -> float:
+    """
+    The sample standard deviation of a result set, either a list of execution times or a histogram.
+    """
+    if isinstance(result_set, Histogram):
+        return result_set.stdev()
+    return statistics.stdev(result_set)
+
+
+def minimum(result_set: Union[list, Histogram]) -> float:
+    if isinstance(result_set, Histogram):
+        return result_set.min
+    return min(result_set)
+
+
+def maximum(result_set: Union[list, Histogram]) -> float:
+    if isinstance(result_set, Histogram):
+        return result_set.max
+    return max(result_set)
+
+
+def quantiles(result_set: Union[list, Histogram], n: int = 4) -> List[float]:
+    """
+    The `n - 1` cut points dividing a result set into `n` intervals with equal probability,
+    see `statistics.quantiles`.
+    """
+    if isinstance(result_set, Histogram):
+        return result_set.quantiles(n)
+    return statistics.quantiles(result_set, n=n, method="inclusive")
+
+
 def timed_function_statistics(
     function_name: str,
-    func: Callable = statistics.mean,
+    func: Callable = mean,
     *args,
     delta: bool = False,
     **kwargs,
 ) -> Any:
     """
     this function takes the saved execution times and applies `func` to it. The return value of `func` is returned.
-    `func` must take a list of numbers as first argument otherwise execution will fail and a `SyntaxError` will be
-    raised.
+    `func` must take the result set, a `Histogram` or in list mode a list of numbers, as first argument otherwise
+    execution will fail and a `SyntaxError` will be raised.
     If no execution times for function_name exist this function will throw a `ValueError`.
 
     :param function_name: the name of the function for which the executions times will be analyzed
-    :param func: the function that is applied to the execution times (optional) default `statistics.mean`
+    :param func: the function that is applied to the execution times (optional) default `mean`
     :param args: arguments for func
     :param delta: boolean if set to True the calculation is done on the delta values (optional) default False
     :param kwargs: keyword arguments for func
@@ -123,9 +343,9 @@ def consolidate(
     **kwargs,
 ):
     """
-    this function can be used to consolidate saved values to reduce memory usage. This function overwrites previously
-    saved results for the given `function_name` so when e.g. applying statistics.mean quantiles can no longer be
-    calculated.
+    this function can be used to consolidate saved values to reduce memory usage in list mode. This function
+    overwrites previously saved results for the given `function_name` so when e.g. applying statistics.mean quantiles
+    can no longer be calculated.
     `func` must take a list of numbers as first argument otherwise execution will fail and a `SyntaxError` will be
     raised.
 
@@ -179,8 +399,7 @@ def reset_delta(function_name: str):
 
     :param function_name: name of the function for which the result set will be deleted from the delta values
     """
-    if function_name in tic_toc_delta:
-        del tic_toc_delta[function_name]
+    tic_toc_delta.pop(function_name, None)
 
 
 def reset(function_name: str, delta: bool = True):
@@ -191,7 +410,6 @@ def reset(function_name: str, delta: bool = True):
     :param function_name: name of the function for which the result set will be deleted
     :param delta: boolean to decide if result set from should also be removed from delta, default True (optional)
     """
-    if function_name in tic_toc:
-        del tic_toc[function_name]
-    if delta and function_name in tic_toc_delta:
-        del tic_toc_delta[function_name]
+    tic_toc.pop(function_name, None)
+    if delta:
+        tic_toc_delta.pop(function_name, None)
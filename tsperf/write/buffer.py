@@ -0,0 +1,129 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import sys
+import time
+from collections import deque
+from queue import Full, Queue
+from typing import Callable, Optional, Tuple
+
+from tsperf.write.model.batch import ColumnarBatch
+
+# Size of a timestamp value and of a reference to a value, in bytes.
+TIMESTAMP_BYTES = sys.getsizeof(0)
+REFERENCE_BYTES = 8
+
+
+def estimate_row_bytes(batch) -> int:
+    """
+    Estimate the number of bytes a single row of the given batch occupies in memory.
+
+    Rows of a batch are homogeneous, so the estimation is based on the first row.
+    """
+    if len(batch) == 0:
+        return 0
+    if isinstance(batch, ColumnarBatch):
+        return TIMESTAMP_BYTES + sum(REFERENCE_BYTES + sys.getsizeof(batch[key][0]) for key in batch.keys())
+    row = batch[0]
+    if isinstance(row, dict):
+        return TIMESTAMP_BYTES + sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return TIMESTAMP_BYTES + sys.getsizeof(row)
+
+
+class ValuesBuffer(Queue):
+    """
+    A FIFO queue between the value generator and the database writer threads,
+    bounded by the number of rows, and optionally bytes, it holds.
+
+    Each item is either a dictionary with `timestamps` and `batch`, or a plain
+    batch. When the budget is exhausted, `put` blocks the producer until the
+    consumers made room. An item is admitted as long as the buffer is below its
+    budget, so the budget can be exceeded by the size of a single item.
+
+    :param max_rows: the row budget, 0 for no limit
+    :param max_bytes: the byte budget, 0 for no limit
+    :param on_stall: called with the number of seconds `put` was blocked
+    """
+
+    def __init__(self, max_rows: int = 0, max_bytes: int = 0, on_stall: Optional[Callable[[float], None]] = None):
+        super().__init__()
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.on_stall = on_stall
+        self.rows = 0
+        self.bytes = 0
+        self.row_bytes = None
+        self._weights = deque()
+
+    def weigh(self, item) -> Tuple[int, int]:
+        """
+        Return the number of rows and the estimated number of bytes of an item.
+        """
+        if item is None:
+            return 0, 0
+        batch = item["batch"] if isinstance(item, dict) else item
+        if self.row_bytes is None and len(batch) > 0:
+            self.row_bytes = estimate_row_bytes(batch)
+        return len(batch), len(batch) * (self.row_bytes or 0)
+
+    def full(self) -> bool:
+        with self.mutex:
+            return self._exhausted()
+
+    def _exhausted(self) -> bool:
+        return (self.max_rows > 0 and self.rows >= self.max_rows) or (
+            self.max_bytes > 0 and self.bytes >= self.max_bytes
+        )
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        with self.not_full:
+            weight = self.weigh(item)
+            if self._exhausted():
+                if not block:
+                    raise Full
+                stall_start = time.monotonic()
+                try:
+                    if timeout is None:
+                        while self._exhausted():
+                            self.not_full.wait()
+                    elif timeout < 0:
+                        raise ValueError("'timeout' must be a non-negative number")
+                    else:
+                        deadline = stall_start + timeout
+                        while self._exhausted():
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0.0:
+                                raise Full
+                            self.not_full.wait(remaining)
+                finally:
+                    if self.on_stall is not None:
+                        self.on_stall(time.monotonic() - stall_start)
+            self._weights.append(weight)
+            self._put(item)
+            self.rows += weight[0]
+            self.bytes += weight[1]
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _get(self):
+        rows, size = self._weights.popleft()
+        self.rows -= rows
+        self.bytes -= size
+        return super()._get()
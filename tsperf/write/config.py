@@ -22,8 +22,10 @@ import dataclasses
 import time
 from argparse import Namespace
 
+from tsperf.adapter import AdapterManager
 from tsperf.model.configuration import DatabaseConnectionConfiguration
-from tsperf.write.model import IngestMode
+from tsperf.model.interface import DatabaseInterfaceType
+from tsperf.write.model import IngestMode, InsertEngine
 
 
 @dataclasses.dataclass
@@ -31,16 +33,39 @@ class DataGeneratorConfig(DatabaseConnectionConfiguration):
     # The concurrency level.
     concurrency: int = 2
 
+    # Whether to run the database writers as threads, or as coroutines on a single event loop.
+    insert_engine: InsertEngine = InsertEngine.THREADS
+
+    # The number of processes generating values, each one for a sub-range of the channel ids.
+    generator_processes: int = 1
+
     # Describing how the Timeseries Datagenerator (TSDG) behaves
     id_start: int = 1
     id_end: int = 500
     timestamp_start: int = None
     timestamp_delta: int = 0.5
 
+    # Seed for the random number generators of all channels, None for random values.
+    seed: int = None
+
     ingest_mode: IngestMode = IngestMode.FAST
     ingest_size: int = 1000
     batch_size: int = -1
 
+    # The target number of rows per second with `ingest_mode = rate`.
+    ingest_rate: float = 0
+
+    # The budget of the queue between the value generator and the database writer threads,
+    # in rows and bytes. 0 means no limit.
+    queue_max_rows: int = 1_000_000
+    queue_max_bytes: int = 0
+
+    # Whether to pass values through the write pipeline in columnar representation.
+    columnar: bool = False
+
+    # A dataset file created by `tsperf generate`, to replay instead of generating values.
+    replay: str = None
+
     # Whether to expose metrics in Prometheus format.
     prometheus_enable: bool = False
     prometheus_listen: str = "localhost:8000"
@@ -63,6 +88,31 @@ class DataGeneratorConfig(DatabaseConnectionConfiguration):
 
         if self.concurrency < 1:
             self.invalid_configs.append(f"CONCURRENCY: {self.concurrency} < 1")
+        if self.generator_processes < 1:
+            self.invalid_configs.append(f"GENERATOR_PROCESSES: {self.generator_processes} < 1")
+        elif self.generator_processes > 1 and self.ingest_mode == IngestMode.CONSECUTIVE:
+            self.invalid_configs.append(
+                f"GENERATOR_PROCESSES: {self.generator_processes} > 1 requires INGEST_MODE: {IngestMode.FAST.value}"
+                f" or {IngestMode.RATE.value}"
+            )
+        if InsertEngine(self.insert_engine) == InsertEngine.ASYNCIO:
+            if self.ingest_mode == IngestMode.CONSECUTIVE:
+                self.invalid_configs.append(
+                    f"INSERT_ENGINE: {InsertEngine.ASYNCIO.value} not available with "
+                    f"INGEST_MODE: {IngestMode.CONSECUTIVE.value}"
+                )
+            if self.adapter is not None and not AdapterManager.supports_async(DatabaseInterfaceType(self.adapter)):
+                self.invalid_configs.append(
+                    f"INSERT_ENGINE: {InsertEngine.ASYNCIO.value} not supported by ADAPTER: "
+                    f"{DatabaseInterfaceType(self.adapter).value}"
+                )
+        if self.replay is not None:
+            if self.ingest_mode == IngestMode.CONSECUTIVE:
+                self.invalid_configs.append(f"REPLAY: not available with INGEST_MODE: {IngestMode.CONSECUTIVE.value}")
+            if self.generator_processes > 1:
+                self.invalid_configs.append(
+                    f"REPLAY: not available with GENERATOR_PROCESSES: {self.generator_processes}"
+                )
         if self.id_start < 0:
             self.invalid_configs.append(f"ID_START: {self.id_start} < 0")
         if self.id_end < 0:
@@ -73,11 +123,22 @@ class DataGeneratorConfig(DatabaseConnectionConfiguration):
             self.invalid_configs.append(f"TIMESTAMP_START: {self.timestamp_start} < 0")
         if self.timestamp_delta <= 0:
             self.invalid_configs.append(f"TIMESTAMP_DELTA: {self.timestamp_delta} <= 0")
+        if self.seed is not None and self.seed < 0:
+            self.invalid_configs.append(f"SEED: {self.seed} < 0")
 
         if not IngestMode(self.ingest_mode):
             self.invalid_configs.append(f"INGEST_MODE: {self.ingest_mode} not in {IngestMode}")
         if self.ingest_size < 0:
             self.invalid_configs.append(f"INGEST_SIZE: {self.ingest_size} < 0")
+        if self.ingest_rate < 0:
+            self.invalid_configs.append(f"INGEST_RATE: {self.ingest_rate} < 0")
+        elif self.ingest_rate == 0 and self.ingest_mode == IngestMode.RATE:
+            self.invalid_configs.append(f"INGEST_RATE: {self.ingest_rate} must be set with INGEST_MODE: rate")
+
+        if self.queue_max_rows < 0:
+            self.invalid_configs.append(f"QUEUE_MAX_ROWS: {self.queue_max_rows} < 0")
+        if self.queue_max_bytes < 0:
+            self.invalid_configs.append(f"QUEUE_MAX_BYTES: {self.queue_max_bytes} < 0")
 
         if self.statistics_interval <= 0:
             self.invalid_configs.append(f"STATISTICS_INTERVAL: {self.statistics_interval} <= 0")
@@ -98,6 +159,8 @@ class DataGeneratorConfig(DatabaseConnectionConfiguration):
             self.invalid_configs.append(f"SHARDS: {self.shards} <= 0")
         if self.replicas < 0:
             self.invalid_configs.append(f"REPLICAS: {self.replicas} < 0")
+        if self.timescaledb_pgcopy_connections < 1:
+            self.invalid_configs.append(f"TIMESCALEDB_PGCOPY_CONNECTIONS: {self.timescaledb_pgcopy_connections} < 1")
 
         if self.prometheus_enable:
             if ":" in self.prometheus_listen:
@@ -18,11 +18,15 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
+import asyncio
+import dataclasses
 import logging
+import multiprocessing
+import sys
 import time
-from queue import Empty, Queue
-from threading import Thread, current_thread
-from typing import Optional, Tuple
+from queue import Empty, Full, Queue
+from threading import Event, Semaphore, Thread, current_thread
+from typing import Callable, List, Optional, Tuple, Union
 
 from prometheus_client import start_http_server
 from tqdm import tqdm
@@ -31,14 +35,19 @@ from tsperf.engine import TsPerfEngine, load_schema
 from tsperf.model.interface import AbstractDatabaseInterface
 from tsperf.util import tictrack
 from tsperf.util.batch_size_automator import BatchSizeAutomator
+from tsperf.util.rate_limiter import RateLimiter
+from tsperf.write.buffer import ValuesBuffer
 from tsperf.write.config import DataGeneratorConfig
-from tsperf.write.model import IngestMode
-from tsperf.write.model.channel import Channel
+from tsperf.write.dataset import Dataset, DatasetWriter
+from tsperf.write.model import IngestMode, InsertEngine
+from tsperf.write.model.batch import ColumnarBatch
+from tsperf.write.model.channel import Channel, ChannelGroup, ChannelLayout
 from tsperf.write.model.metrics import (
     c_generated_values,
     c_inserted_values,
     c_inserts_failed,
     c_inserts_performed_success,
+    c_values_queue_producer_stall,
     c_values_queue_was_empty,
     g_batch_size,
     g_best_batch_rps,
@@ -46,6 +55,9 @@ from tsperf.write.model.metrics import (
     g_insert_percentage,
     g_insert_time,
     g_rows_per_second,
+    g_schedule_lag,
+    g_values_queue_bytes,
+    g_values_queue_rows,
 )
 
 logger = logging.getLogger(__name__)
@@ -57,11 +69,13 @@ engine: TsPerfEngine = None
 config: DataGeneratorConfig = None
 schema = {}
 last_ts = 0
-current_values_queue = Queue(10000)
+current_values_queue = ValuesBuffer(max_rows=1_000_000)
 inserted_values_queue = Queue(10000)
-stop_queue = Queue(1)
-insert_finished_queue = Queue(1)
+stop_event = Event()
 insert_exceptions = Queue()
+generator_stop = None
+rate_limiter: Optional[RateLimiter] = None
+dataset: Optional[Dataset] = None
 
 
 def get_database_adapter_old() -> AbstractDatabaseInterface:  # pragma: no cover
@@ -136,9 +150,13 @@ def create_channels() -> dict:
     id_end = config.id_end + 1
     count = id_end - id_start
     logger.info(f"Creating {count} channels [{id_start}, {id_end}]")
+    tags = get_sub_element("tags")
+    fields = get_sub_element("fields")
+    # the layout is compiled once from the schema and shared by all channels
+    layout = ChannelLayout(tags, fields)
     channels = {}
     for i in tqdm(range(config.id_start, config.id_end + 1)):
-        channels[i] = Channel(i, get_sub_element("tags"), get_sub_element("fields"))
+        channels[i] = Channel(i, tags, fields, layout=layout, seed=config.seed)
     return channels
 
 
@@ -152,52 +170,266 @@ def get_sub_element(sub: str) -> dict:
     return element
 
 
-@tictrack.timed_function()
-def get_next_value(channels: dict):
+def split_id_range(id_start: int, id_end: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split the channel id range [id_start, id_end] into at most `parts` contiguous
+    sub-ranges of about equal size.
+    """
+    count = id_end - id_start + 1
+    parts = max(1, min(parts, count))
+    size, remainder = divmod(count, parts)
+    ranges = []
+    start = id_start
+    for i in range(parts):
+        end = start + size - 1 + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def next_timestamp() -> int:
+    """
+    Advance the timestamp of the generated values by `timestamp_delta`, and return it
+    in milliseconds.
+    """
     global last_ts
+    ts = last_ts + config.timestamp_delta
+    timestamp_factor = 1 / config.timestamp_delta
+    last_ts = round(ts * timestamp_factor) / timestamp_factor
+    return int(last_ts * 1000)
+
+
+@tictrack.timed_function()
+def get_next_value(channels: Union[dict, ChannelGroup], values_queue: Optional[Queue] = None):
+    if values_queue is None:
+        values_queue = current_values_queue
     # for each channel in the channels list all next values are calculated and
     # saved to the `channel_values` list. This list is then added to the FIFO
     # queue, so each entry of the FIFO queue contains all next values for each
     # channel in the channel list.
-    channel_values = []
-    for channel in channels.values():
-        channel_values.append(channel.calculate_next_value())
+    if isinstance(channels, ChannelGroup):
+        channel_values = channels.calculate_next_batch()
+    else:
+        channel_values = []
+        for channel in channels.values():
+            channel_values.append(channel.calculate_next_value())
     if len(channel_values) > 0:
         c_generated_values.inc(len(channel_values))
-        if config.ingest_mode == IngestMode.FAST:
-            ts = last_ts + config.timestamp_delta
-            timestamp_factor = 1 / config.timestamp_delta
-            last_ts = round(ts * timestamp_factor) / timestamp_factor
-            timestamps = [int(last_ts * 1000)] * len(channel_values)
-            current_values_queue.put({"timestamps": timestamps, "batch": channel_values})
+        if config.ingest_mode in (IngestMode.FAST, IngestMode.RATE):
+            timestamps = [next_timestamp()] * len(channel_values)
+            values_queue.put({"timestamps": timestamps, "batch": channel_values})
         else:
-            current_values_queue.put(channel_values)
+            values_queue.put(channel_values)
+
+
+def generate_values(channels: dict, values_queue: Optional[Queue] = None, progress: Optional[tqdm] = None):
+    """
+    Compute `config.ingest_size` ticks of values for the given channels, or
+    run endlessly when `config.ingest_size` is 0.
+    """
+    if config.columnar:
+        channels = ChannelGroup(channels.values())
+    while_count = 0
+    while config.ingest_size == 0 or while_count < config.ingest_size:
+        if generator_stop is not None and generator_stop.is_set():
+            break
+        while_count += 1
+        get_next_value(channels, values_queue)
+        if progress is not None:
+            progress.update()
+
+
+def replay_values(dataset_: Dataset, progress: Optional[tqdm] = None):
+    """
+    Feed the values of a pre-generated dataset into the values queue, one tick at a
+    time, with the timestamps stored in the dataset.
+    """
+    for timestamp, batch in dataset_.iter_ticks():
+        if generator_stop is not None and generator_stop.is_set():
+            break
+        if not config.columnar:
+            batch = batch.rows()
+        c_generated_values.inc(len(batch))
+        current_values_queue.put({"timestamps": [timestamp] * len(batch), "batch": batch})
+        if progress is not None:
+            progress.update()
+
+
+def generate(configuration: DataGeneratorConfig, path: str):
+    """
+    Generate `ingest_size` ticks of values for all channels once, and write them to
+    a dataset file, which can be replayed by `tsperf write --replay`.
+    """
+    global config, schema, last_ts
+    if not configuration.validate_config():
+        logger.error(f"Invalid configuration: {configuration.invalid_configs}")
+        sys.exit(-1)
+    if configuration.ingest_size == 0:
+        logger.error("Invalid configuration: INGEST_SIZE: 0 not available for generating a dataset")
+        sys.exit(-1)
+
+    config = configuration
+    schema = load_schema(config.schema)
+    last_ts = config.timestamp_start
+
+    channels = ChannelGroup(create_channels().values())
+    writer = DatasetWriter(path, schema, channels, config.ingest_size)
+    try:
+        for _ in tqdm(range(config.ingest_size)):
+            writer.write_tick(next_timestamp(), channels.calculate_next_batch())
+    finally:
+        writer.close()
+    logger.info(f"Wrote {config.ingest_size} ticks of {len(channels)} channels to »{path}«, {writer.size} bytes")
+
+
+class StoppableQueue:
+    """
+    Submit values to the cross-process `values_queue` of a generator process.
+
+    `put` blocks while the queue is full, but gives up once `stop_event` is set, so
+    a generator process never hangs on a parent which stopped consuming.
+    """
+
+    timeout = 0.1
+
+    def __init__(self, values_queue, stop_event=None):
+        self.values_queue = values_queue
+        self.stop_event = stop_event
+
+    def put(self, item) -> bool:
+        if self.stop_event is None:
+            self.values_queue.put(item)
+            return True
+        while not self.stop_event.is_set():
+            try:
+                self.values_queue.put(item, timeout=self.timeout)
+                return True
+            except Full:
+                pass
+        return False
+
+
+def generator_process(configuration: DataGeneratorConfig, schema_: dict, values_queue, stop_event=None):
+    """
+    Entrypoint of a generator process. It creates the channels of its own
+    sub-range [configuration.id_start, configuration.id_end] and feeds their
+    values into the cross-process `values_queue`. Each generator process starts
+    at the same `timestamp_start`, so all shards produce identical timestamps
+    for the same tick.
+
+    When done, a `None` sentinel is submitted to signal the end of the shard.
+    """
+    global config, schema, last_ts, generator_stop
+    config = configuration
+    schema = schema_
+    last_ts = config.timestamp_start
+    generator_stop = stop_event
+    values_queue = StoppableQueue(values_queue, stop_event)
+    try:
+        channels = create_channels()
+        generate_values(channels, values_queue)
+    except Exception as e:
+        logger.exception(e)
+    finally:
+        values_queue.put(None)
+
+
+def run_generator_processes():
+    """
+    Spawn `config.generator_processes` generator processes, each one responsible
+    for a sub-range of [config.id_start, config.id_end], and forward the values
+    they produce to the database writer threads.
+    """
+    global generator_stop
+    ranges = split_id_range(config.id_start, config.id_end, config.generator_processes)
+    logger.info(f"Starting {len(ranges)} generator processes for channel id ranges {ranges}")
+
+    # Use the `spawn` start method, because forking a process which already runs
+    # the database writer threads is not safe.
+    context = multiprocessing.get_context("spawn")
+    values_queue = context.Queue(maxsize=10 * len(ranges))
+    generator_stop = context.Event()
+    processes = []
+    for i, (id_start, id_end) in enumerate(ranges):
+        shard_config = dataclasses.replace(config, id_start=id_start, id_end=id_end)
+        process = context.Process(
+            target=generator_process,
+            args=(shard_config, schema, values_queue, generator_stop),
+            name=f"GeneratorProcess-{i}",
+        )
+        processes.append(process)
+    for process in processes:
+        process.start()
+
+    try:
+        finished = 0
+        progress = tqdm(total=config.ingest_size * len(processes))
+        while finished < len(processes):
+            try:
+                values = values_queue.get(timeout=1.0)
+            except Empty:
+                check_generator_processes(processes, values_queue)
+                continue
+            if values is None:
+                finished += 1
+                continue
+            c_generated_values.inc(len(values["batch"]))
+            current_values_queue.put(values)
+            progress.update()
+        progress.close()
+    finally:
+        generator_stop.set()
+        # Children may block on a full queue, or flushing their buffered values, until
+        # the queue is drained.
+        for process in processes:
+            while process.is_alive():
+                drain_queue(values_queue)
+                process.join(timeout=0.1)
+        drain_queue(values_queue)
+
+
+def check_generator_processes(processes: list, values_queue):
+    """
+    Raise when a generator process exited without submitting its `None` sentinel,
+    e.g. when it has been killed.
+    """
+    for process in processes:
+        if not process.is_alive() and process.exitcode != 0:
+            raise RuntimeError(f"Generator process {process.name} exited with code {process.exitcode}")
+    if not any(process.is_alive() for process in processes) and values_queue.empty():
+        raise RuntimeError("Generator processes exited without finishing")
+
+
+def drain_queue(values_queue):
+    try:
+        while True:
+            values_queue.get_nowait()
+    except Empty:
+        pass
 
 
 def statistics_logger(last_stat_ts_local: float) -> float:
     if time.time() - last_stat_ts_local >= config.statistics_interval:
-        for key, value in tictrack.tic_toc_delta.items():
-            logger.info(f"Average time for {key}: {(sum(value) / len(value))}")
-        tictrack.tic_toc_delta = {}
+        for key, value in tictrack.snapshot_delta().items():
+            logger.info(f"Average time for {key}: {tictrack.mean(value)}")
     return time.time()
 
 
 def statistics_thread():
     logger.info("Starting statistics thread")
     last_stat_ts_local = time.time()
-    while not stop_process():
-        if time.time() - last_stat_ts_local >= config.statistics_interval:
-            last_stat_ts_local = statistics_logger(last_stat_ts_local)
-        else:
-            # we could calculate the exact time to sleep until next output but this would block the
-            # the thread until it happens, this would mean at the end the whole data generator could
-            # sleep for another `config.statistics_interval` seconds before finishing
-            time.sleep(1)
+    # waiting on the stop event sleeps exactly until the next output is due, but wakes up
+    # immediately when the data generator is finished
+    while not stop_event.wait(max(0.0, last_stat_ts_local + config.statistics_interval - time.time())):
+        last_stat_ts_local = statistics_logger(last_stat_ts_local)
 
 
 def do_insert(adapter, timestamps, batch):
     try:
-        adapter.insert_stmt(timestamps, batch)
+        if isinstance(batch, ColumnarBatch):
+            adapter.insert_columnar(timestamps, batch)
+        else:
+            adapter.insert_stmt(timestamps, batch)
         c_inserts_performed_success.inc()
         inserted_values_queue.put_nowait(len(batch))
     except Exception as e:
@@ -208,19 +440,62 @@ def do_insert(adapter, timestamps, batch):
         logger.error(e)
 
 
-def get_insert_values(batch_size: int) -> Tuple[list, list]:
-    batch = []
-    timestamps = []
-    while len(batch) < batch_size:
+async def do_insert_async(adapter, timestamps, batch):
+    """
+    Like `do_insert`, but for the asynchronous database adapters of the `asyncio` insert engine.
+    """
+    try:
+        if isinstance(batch, ColumnarBatch):
+            await adapter.insert_columnar(timestamps, batch)
+        else:
+            await adapter.insert_stmt(timestamps, batch)
+        c_inserts_performed_success.inc()
+        inserted_values_queue.put_nowait(len(batch))
+    except Exception as e:
+        c_inserts_failed.inc()
+        logger.error(e)
+
+
+def get_insert_values(batch_size: int, timeout: float = 0.1) -> Tuple[Union[list, ColumnarBatch], list]:
+    """
+    Collect values from the queue until `batch_size` is reached, or the queue is empty.
+
+    Only the first item is waited for, up to `timeout` seconds, so the caller does not
+    spin while the generator is busy, but can check regularly whether to stop.
+    """
+    items = []
+    size = 0
+    while size < batch_size:
         try:
-            batch_values = current_values_queue.get_nowait()
-            batch.extend(batch_values["batch"])
-            timestamps.extend(batch_values["timestamps"])
+            if items:
+                batch_values = current_values_queue.get_nowait()
+            else:
+                batch_values = current_values_queue.get(timeout=timeout)
+            items.append(batch_values)
+            size += len(batch_values["timestamps"])
         except Empty:
             # if there are no more values in the queue the insert is done
             # without proper batch_size
             c_values_queue_was_empty.inc()
             break
+    return merge_values(items)
+
+
+def merge_values(items: List[dict]) -> Tuple[Union[list, ColumnarBatch], list]:
+    """
+    Merge items of the values queue into a single batch and its timestamps.
+    """
+    batch = []
+    columnar_batches = []
+    timestamps = []
+    for item in items:
+        if isinstance(item["batch"], ColumnarBatch):
+            columnar_batches.append(item["batch"])
+        else:
+            batch.extend(item["batch"])
+        timestamps.extend(item["timestamps"])
+    if columnar_batches:
+        batch = ColumnarBatch.concat(columnar_batches)
     return batch, timestamps
 
 
@@ -234,57 +509,194 @@ def probe_insert():
         return False
 
 
-def insert_routine():
-    name = current_thread().name
+def create_batch_size_automator() -> BatchSizeAutomator:
     data_batch_size = config.id_end - config.id_start + 1
-    insert_bsa = BatchSizeAutomator(
+    return BatchSizeAutomator(
         batch_size=config.batch_size,
         active=bool(config.ingest_mode),
         data_batch_size=data_batch_size,
     )
 
+
+def record_batch_time(name: str, insert_bsa: BatchSizeAutomator, batch_length: int, batch_size: int, duration: float):
+    if insert_bsa.auto_batch_mode and batch_length == batch_size:
+        g_insert_time.labels(thread=name).set(duration)
+        g_rows_per_second.labels(thread=name).set(batch_length / duration)
+        g_best_batch_size.labels(thread=name).set(insert_bsa.batch_times["best"]["size"])
+        g_best_batch_rps.labels(thread=name).set(insert_bsa.batch_times["best"]["batch_per_second"])
+        insert_bsa.insert_batch_time(duration)
+
+
+def insert_routine():
+    name = current_thread().name
+    insert_bsa = create_batch_size_automator()
+
     adapter = engine.create_adapter()
     while not current_values_queue.empty() or not stop_process():
         local_batch_size = insert_bsa.get_next_batch_size()
         if insert_bsa.auto_batch_mode:
             g_batch_size.labels(thread=name).set(local_batch_size)
+        adapter.set_batch_size(local_batch_size)
 
         batch, timestamps = get_insert_values(local_batch_size)
 
         if len(batch) > 0:
+            if rate_limiter is not None:
+                g_schedule_lag.set(rate_limiter.acquire(len(batch)))
             start = time.time()
             do_insert(adapter, timestamps, batch)
-
-            if insert_bsa.auto_batch_mode and len(batch) == local_batch_size:
-                duration = time.time() - start
-                g_insert_time.labels(thread=name).set(duration)
-                g_rows_per_second.labels(thread=name).set(len(batch) / duration)
-                g_best_batch_size.labels(thread=name).set(insert_bsa.batch_times["best"]["size"])
-                g_best_batch_rps.labels(thread=name).set(insert_bsa.batch_times["best"]["batch_per_second"])
-                insert_bsa.insert_batch_time(duration)
+            record_batch_time(name, insert_bsa, len(batch), local_batch_size, time.time() - start)
 
     adapter.close_connection()
 
     return True
 
 
+class AsyncValuesForwarder:
+    """
+    Feed the values of the `asyncio` insert engine from the blocking values queue
+    into an `asyncio.Queue`, which all writers await.
+
+    A single thread blocks on the values queue, and hands each item over to the
+    event loop. At most `capacity` items are waiting in the `asyncio.Queue`, so the
+    values queue keeps applying back pressure to the generator. When the values are
+    exhausted, a `None` sentinel is submitted, which every writer passes on.
+    """
+
+    timeout = 0.1
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, capacity: int):
+        self.loop = loop
+        self.values = asyncio.Queue()
+        self.slots = Semaphore(capacity)
+        self.stopped = Event()
+        self.thread = Thread(target=self.forward, name="AsyncValuesForwarder", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def forward(self):
+        try:
+            while not self.stopped.is_set() and (not current_values_queue.empty() or not stop_process()):
+                if not self.slots.acquire(timeout=self.timeout):
+                    continue
+                try:
+                    item = current_values_queue.get(timeout=self.timeout)
+                except Empty:
+                    self.slots.release()
+                    c_values_queue_was_empty.inc()
+                    continue
+                self.loop.call_soon_threadsafe(self.values.put_nowait, item)
+        finally:
+            self.loop.call_soon_threadsafe(self.values.put_nowait, None)
+
+    async def get(self, batch_size: int) -> Optional[Tuple[Union[list, ColumnarBatch], list]]:
+        """
+        Await values until `batch_size` is reached, or no more values are waiting.
+        Return `None` when the values are exhausted.
+        """
+        item = await self.values.get()
+        if item is None:
+            self.values.put_nowait(None)
+            return None
+        items = [item]
+        size = len(item["timestamps"])
+        while size < batch_size and not self.values.empty():
+            item = self.values.get_nowait()
+            if item is None:
+                self.values.put_nowait(None)
+                break
+            items.append(item)
+            size += len(item["timestamps"])
+        for _ in items:
+            self.slots.release()
+        return merge_values(items)
+
+
+async def async_insert_routine(name: str, forwarder: AsyncValuesForwarder):
+    """
+    A logical database writer of the `asyncio` insert engine. Like `insert_routine`,
+    each writer uses its own database connection and batch size automator.
+
+    Values are awaited from the `forwarder`, which is shared by all writers, so no
+    writer blocks the event loop, or waits for the reads of other writers.
+    """
+    insert_bsa = create_batch_size_automator()
+
+    adapter = engine.create_async_adapter()
+    await adapter.connect()
+    try:
+        while True:
+            local_batch_size = insert_bsa.get_next_batch_size()
+            if insert_bsa.auto_batch_mode:
+                g_batch_size.labels(thread=name).set(local_batch_size)
+            adapter.set_batch_size(local_batch_size)
+
+            values = await forwarder.get(local_batch_size)
+            if values is None:
+                break
+            batch, timestamps = values
+            if len(batch) == 0:
+                continue
+
+            if rate_limiter is not None:
+                wait = rate_limiter.reserve(len(batch))
+                g_schedule_lag.set(max(0.0, -wait))
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            start = time.time()
+            await do_insert_async(adapter, timestamps, batch)
+            record_batch_time(name, insert_bsa, len(batch), local_batch_size, time.time() - start)
+    finally:
+        await adapter.close_connection()
+
+
+async def run_async_writers():
+    forwarder = AsyncValuesForwarder(asyncio.get_running_loop(), capacity=2 * config.concurrency)
+    forwarder.start()
+    try:
+        await asyncio.gather(
+            *[async_insert_routine(name=f"AsyncWriter-{i}", forwarder=forwarder) for i in range(config.concurrency)]
+        )
+    finally:
+        forwarder.stop()
+
+
 def spawn_insert_threads():
     logger.info(f"Starting {config.concurrency} database writer thread(s)")
     insert_threads = []
     for i in range(config.concurrency):
         insert_threads.append(Thread(target=insert_routine, name=f"InsertThread-{i}"))
-    for thread in insert_threads:
-        thread.start()
-    for thread in insert_threads:
-        thread.join()
+    try:
+        for thread in insert_threads:
+            thread.start()
+        for thread in insert_threads:
+            thread.join()
+    finally:
+        # Signal the Prometheus thread that insert is finished.
+        inserted_values_queue.put(None)
+
 
-    # Signal the Prometheus thread that insert is finished.
-    insert_finished_queue.put_nowait(True)
+def spawn_async_writers():
+    logger.info(f"Starting {config.concurrency} asynchronous database writer(s)")
+    try:
+        asyncio.run(run_async_writers())
+    finally:
+        # Signal the Prometheus thread that insert is finished.
+        inserted_values_queue.put(None)
 
 
 def fast_insert():
+    if config.insert_engine == InsertEngine.ASYNCIO:
+        spawner = Thread(target=spawn_async_writers, name="AsyncInsertLoop")
+    else:
+        spawner = Thread(target=spawn_insert_threads, name="InsertThreadSpawner")
     fast_insert_threads = [
-        Thread(target=spawn_insert_threads, name="InsertThreadSpawner"),
+        spawner,
         Thread(target=statistics_thread, name="StatisticsThread"),
     ]
     for thread in fast_insert_threads:
@@ -301,66 +713,70 @@ def consecutive_insert():
     adapter.prepare_database()
     last_insert = config.timestamp_start
     last_stat_ts_local = time.time()
-    while not current_values_queue.empty() or not stop_process():
-        # we calculate the time delta from the last insert to the current timestamp
-        insert_delta = time.time() - last_insert
-        # delta needs to be bigger than timestamp_delta
-        # if delta is smaller than timestamp_delta the time difference is waited (as we want an insert
-        # every `config.timestamp_delta` second
-        if insert_delta > config.timestamp_delta:
-            last_stat_ts_local = statistics_logger(last_stat_ts_local)
-            c_inserted_values.inc(config.id_end - config.id_start + 1)
-            try:
-                batch = current_values_queue.get_nowait()
-                ts = time.time()
-                # we want the same timestamp for each value this timestamp should be the same
-                # even if the write runs in multiple containers therefore we round the
-                # timestamp to match timestamp_delta this is done by multiplying
-                # by timestamp_delta and then dividing the result by timestamp_delta
-                timestamp_factor = 1 / config.timestamp_delta
-                last_insert = round(ts * timestamp_factor) / timestamp_factor
-                timestamps = [int(last_insert * 1000)] * len(batch)
-                do_insert(adapter, timestamps, batch)
-            except Empty:
-                c_values_queue_was_empty.inc()
+    try:
+        while not current_values_queue.empty() or not stop_process():
+            # we calculate the time delta from the last insert to the current timestamp
+            insert_delta = time.time() - last_insert
+            # delta needs to be bigger than timestamp_delta
+            # if delta is smaller than timestamp_delta the time difference is waited (as we want an insert
+            # every `config.timestamp_delta` second
+            if insert_delta > config.timestamp_delta:
+                last_stat_ts_local = statistics_logger(last_stat_ts_local)
+                c_inserted_values.inc(config.id_end - config.id_start + 1)
+                try:
+                    # wait for the generator, but not longer than one interval, to check whether to stop
+                    batch = current_values_queue.get(timeout=config.timestamp_delta)
+                    ts = time.time()
+                    # we want the same timestamp for each value this timestamp should be the same
+                    # even if the write runs in multiple containers therefore we round the
+                    # timestamp to match timestamp_delta this is done by multiplying
+                    # by timestamp_delta and then dividing the result by timestamp_delta
+                    timestamp_factor = 1 / config.timestamp_delta
+                    last_insert = round(ts * timestamp_factor) / timestamp_factor
+                    timestamps = [int(last_insert * 1000)] * len(batch)
+                    do_insert(adapter, timestamps, batch)
+                except Empty:
+                    c_values_queue_was_empty.inc()
 
-        else:
-            time.sleep(config.timestamp_delta - insert_delta)
-    adapter.close_connection()
+            else:
+                time.sleep(config.timestamp_delta - insert_delta)
+    finally:
+        adapter.close_connection()
 
-    # Signal the Prometheus thread that insert is finished.
-    insert_finished_queue.put_nowait(True)
+        # Signal the Prometheus thread that insert is finished.
+        inserted_values_queue.put(None)
 
 
 def stop_process() -> bool:
-    return not stop_queue.empty()
+    return stop_event.is_set()
 
 
 def prometheus_insert_percentage():
-    while not inserted_values_queue.empty() or insert_finished_queue.empty():
-        try:
-            inserted_values = inserted_values_queue.get_nowait()
-            c_inserted_values.inc(inserted_values)
-            g_insert_percentage.set(
-                (c_inserted_values._value.get() / (config.ingest_size * (config.id_end - config.id_start + 1))) * 100
-            )
-        except Empty:
-            # get_nowait throws Empty exception which might happen if the inserted_values_queue
-            # is empty and the insert_finished_queue is as well
-            pass
+    # blocks until values have been inserted, a `None` sentinel signals that insert is finished
+    for inserted_values in iter(inserted_values_queue.get, None):
+        c_inserted_values.inc(inserted_values)
+        g_insert_percentage.set(
+            (c_inserted_values._value.get() / (config.ingest_size * (config.id_end - config.id_start + 1))) * 100
+        )
 
 
 @tictrack.timed_function()
 def run_dg():
+    global rate_limiter
     logger.info(f"Starting data generator with config »{config}« and schema »{config.schema}«")
 
     logger.info("Starting database writer subsystem")
     if config.ingest_mode == IngestMode.CONSECUTIVE:
         logger.info("Using insert mode »consecutive«")
         adapter_thread = Thread(target=consecutive_insert, name="ConsecutiveInsert")
+    elif config.ingest_mode == IngestMode.RATE:
+        logger.info(f"Using insert mode »rate« with a target of {config.ingest_rate} rows/s")
+        rate_limiter = RateLimiter(config.ingest_rate)
+        adapter_thread = Thread(target=fast_insert, name="ParallelInsert")
     else:
         logger.info("Using insert mode »fast«")
         adapter_thread = Thread(target=fast_insert, name="ParallelInsert")
+    adapter_thread.run = report_exceptions(adapter_thread.run, insert_exceptions)
     adapter_thread.start()
 
     logger.info("Starting metrics collector thread")
@@ -368,63 +784,124 @@ def run_dg():
     prometheus_insert_percentage_thread.start()
 
     try:
-        channels = create_channels()
-
         # We are either in endless mode or have a certain amount of values to create.
         # TODO: This should not have an endless loop. For now, stop with CTRL+C.
-        logger.info(f"Starting insert operation with ingest size {config.ingest_size}")
-        while_count = 0
-        progress = tqdm(total=config.ingest_size)
-        while config.ingest_size == 0 or while_count < config.ingest_size:
-            while_count += 1
-            get_next_value(channels)
-            progress.update()
-        progress.close()
+        if dataset is not None:
+            logger.info(f"Starting insert operation replaying {dataset.ticks} ticks from »{dataset.path}«")
+            progress = tqdm(total=dataset.ticks)
+            replay_values(dataset, progress=progress)
+            progress.close()
+        elif config.generator_processes > 1:
+            logger.info(f"Starting insert operation with ingest size {config.ingest_size}")
+            run_generator_processes()
+        else:
+            channels = create_channels()
+            logger.info(f"Starting insert operation with ingest size {config.ingest_size}")
+            progress = tqdm(total=config.ingest_size)
+            generate_values(channels, progress=progress)
+            progress.close()
     except Exception as e:
         logger.exception(e)
     finally:
         # Once value creation is finished, signal the worker threads to stop.
         logger.info("Shutting down")
-        stop_queue.put(True)
+        stop_event.set()
         logger.info("Waiting for database writer thread(s)")
         wait_for_thread(adapter_thread, insert_exceptions)
+        if rate_limiter is not None:
+            report_rate(rate_limiter)
 
         if config.prometheus_enable:
             logger.info("Waiting for metrics collector thread")
             prometheus_insert_percentage_thread.join()
 
 
+def report_rate(limiter: RateLimiter) -> dict:
+    """
+    Report whether the target ingest rate has been sustained, and how far the
+    database writers fell behind its schedule.
+    """
+    summary = limiter.summary()
+    outcome = "sustained" if summary["sustained"] else "NOT sustained"
+    logger.info(
+        f"Target rate of {summary['target_rate']} rows/s {outcome}: "
+        f"achieved {summary['achieved_rate']:.2f} rows/s, "
+        f"behind schedule by {summary['lag']:.3f}s at the end, {summary['max_lag']:.3f}s at most"
+    )
+    return summary
+
+
+def report_exceptions(target: Callable, error_channel: Queue) -> Callable:
+    """
+    Wrap a thread's target to submit its exception to `error_channel` on failure,
+    or a `None` sentinel on success, see `wait_for_thread`.
+    """
+
+    def wrapper(*args, **kwargs):
+        try:
+            target(*args, **kwargs)
+        except Exception:
+            error_channel.put(sys.exc_info())
+        else:
+            error_channel.put(None)
+
+    return wrapper
+
+
 def wait_for_thread(thread: Thread, error_channel: Optional[Queue] = None):
     """
     Wait for thread to finish and, on failure, catch the thread's exception in
     the caller thread.
 
+    When using `error_channel`, the thread's target must be wrapped using
+    `report_exceptions`.
+
     - https://stackoverflow.com/a/2830127
     """
-    while True:
-        if error_channel:
-            try:
-                exc = error_channel.get(block=False)
-            except Empty:
-                pass
-            else:
-                exc_type, exc_obj, exc_trace = exc
-                # Re-raise the exception.
-                raise exc_obj
+    if error_channel:
+        exc = error_channel.get()
+        if exc is not None:
+            exc_type, exc_obj, exc_trace = exc
+            # Re-raise the exception.
+            raise exc_obj
 
-        thread.join(0.1)
-        if thread.is_alive():
-            continue
-        break
+    thread.join()
 
 
-def start(configuration: DataGeneratorConfig):
+def create_values_queue() -> ValuesBuffer:
+    """
+    Create the queue between the value generator and the database writer threads,
+    bounded by the configured row and byte budget, and export its metrics.
+    """
+    values_queue = ValuesBuffer(
+        max_rows=config.queue_max_rows,
+        max_bytes=config.queue_max_bytes,
+        on_stall=c_values_queue_producer_stall.inc,
+    )
+    g_values_queue_rows.set_function(lambda: values_queue.rows)
+    g_values_queue_bytes.set_function(lambda: values_queue.bytes)
+    return values_queue
+
+
+def setup(configuration: DataGeneratorConfig):
+    """
+    Load the schema or dataset, validate the configuration, and prepare the database,
+    without starting to write.
+    """
     # TODO: Get rid of global variables.
     global engine, config
-    global schema, last_ts
+    global schema, last_ts, current_values_queue, dataset
 
     # TODO: Move schema loading to engine.
-    schema = load_schema(configuration.schema)
+    if configuration.replay is not None:
+        # the dataset defines schema, channels and the number of ticks
+        dataset = Dataset.open(configuration.replay)
+        schema = dataset.schema
+        configuration = dataclasses.replace(
+            configuration, id_start=dataset.id_start, id_end=dataset.id_end, ingest_size=dataset.ticks
+        )
+    else:
+        schema = load_schema(configuration.schema)
     engine = TsPerfEngine(config=configuration, schema=schema)
     engine.bootstrap()
 
@@ -438,8 +915,13 @@ def start(configuration: DataGeneratorConfig):
         logger.info(f"Starting Prometheus HTTP server on {config.prometheus_host}:{config.prometheus_port}")
         start_http_server(config.prometheus_port, addr=config.prometheus_host)
 
-    data_batch_size = config.id_end - config.id_start + 1
     last_ts = config.timestamp_start
+    current_values_queue = create_values_queue()
+
+
+def start(configuration: DataGeneratorConfig):
+    setup(configuration)
+    data_batch_size = config.id_end - config.id_start + 1
 
     # start the write logic
     run_dg()
@@ -448,8 +930,8 @@ def start(configuration: DataGeneratorConfig):
     run = 0
     for k, v in tictrack.tic_toc.items():
         if k == "run_dg":
-            run = sum(v) / len(v)
-        logger.info(f"Average time for {k}: {(sum(v) / len(v))}")
+            run = tictrack.mean(v)
+        logger.info(f"Average time for {k}: {tictrack.mean(v)}")
 
     logger.info(
         f"Values per second: {data_batch_size * config.ingest_size * len(get_sub_element('fields').keys()) / run}"
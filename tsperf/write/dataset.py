@@ -0,0 +1,199 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+import json
+import struct
+from pathlib import Path
+from typing import Iterator, List, Union
+
+import numpy as np
+
+from tsperf.write.model.batch import ColumnarBatch
+from tsperf.write.model.channel import ChannelGroup
+
+# The file starts with the magic bytes, followed by the length of the JSON header.
+MAGIC = b"TSPERF\x00\x01"
+PREAMBLE = struct.Struct("<8sQ")
+
+# Arrays are stored little-endian and aligned to this number of bytes.
+ALIGNMENT = 64
+OFFSET_DIGITS = 20
+
+TIMESTAMP_DTYPE = "<i8"
+FIELD_DTYPES = {
+    "float": "<f8",
+    "bool": "|b1",
+}
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class Dataset:
+    """
+    A pre-generated dataset in a compact binary columnar file, see `DatasetWriter`.
+
+    Arrays are memory-mapped, so opening a dataset is cheap, and reading a tick only
+    touches the pages it needs. The operating system's page cache keeps repeated
+    replays of the same file in memory.
+
+    The layout of the file is:
+
+    - the magic bytes `TSPERF\\x00\\x01` and the length of the JSON header, as unsigned 64-bit integer
+    - the JSON header, describing schema, channels, and the offsets of all arrays
+    - the timestamps in milliseconds, one 64-bit integer per tick
+    - for each field, a `ticks x channels` array of 64-bit floats or 8-bit booleans
+    """
+
+    def __init__(self, path: Union[str, Path], header: dict):
+        self.path = Path(path)
+        self.header = header
+        self.schema: dict = header["schema"]
+        self.id_start: int = header["id_start"]
+        self.id_end: int = header["id_end"]
+        self.ticks: int = header["ticks"]
+        self.tag_keys: List[str] = header["tag_keys"]
+        self.field_keys: List[str] = [field["key"] for field in header["fields"]]
+        self.tag_values = [tuple(values) for values in header["tag_values"]]
+        self.tag_columns = {
+            key: [values[index] for values in self.tag_values] for index, key in enumerate(self.tag_keys)
+        }
+        self.timestamps = np.memmap(
+            self.path, dtype=TIMESTAMP_DTYPE, mode="r", offset=header["timestamps"], shape=(self.ticks,)
+        )
+        self.fields = {
+            field["key"]: np.memmap(
+                self.path, dtype=field["dtype"], mode="r", offset=field["offset"], shape=(self.ticks, len(self))
+            )
+            for field in header["fields"]
+        }
+
+    def __len__(self) -> int:
+        """
+        The number of channels.
+        """
+        return len(self.tag_values)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "Dataset":
+        with open(path, "rb") as f:
+            magic, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a tsperf dataset: {path}")
+            header = json.loads(f.read(length))
+        return cls(path, header)
+
+    def get_tick(self, tick: int) -> ColumnarBatch:
+        """
+        The values of all channels for a single tick, in columnar representation.
+        """
+        columns = dict(self.tag_columns)
+        for key, values in self.fields.items():
+            columns[key] = values[tick].tolist()
+        return ColumnarBatch(columns, tag_values=self.tag_values)
+
+    def iter_ticks(self) -> Iterator[tuple]:
+        """
+        Iterate the timestamp and the values of each tick.
+        """
+        for tick in range(self.ticks):
+            yield int(self.timestamps[tick]), self.get_tick(tick)
+
+
+class DatasetWriter:
+    """
+    Write a dataset of `ticks` ticks for the given channels into a binary columnar file,
+    see `Dataset` for the layout.
+
+    The file is allocated upfront and written through memory-mapped arrays, one tick at
+    a time, so generating large datasets does not need more memory than a single tick.
+    """
+
+    def __init__(self, path: Union[str, Path], schema: dict, channels: ChannelGroup, ticks: int):
+        self.path = Path(path)
+        self.channels = channels
+        self.ticks = ticks
+        self.tick = 0
+        layout = channels.layout
+        ids = [channel.id for channel in channels.channels]
+
+        # the offsets of all arrays depend on the size of the header, so they are computed relative
+        # to the start of the data first, and the header is padded to a fixed size
+        fields = []
+        offset = align(ticks * np.dtype(TIMESTAMP_DTYPE).itemsize)
+        for key, type_ in zip(layout.field_keys, layout.field_types):
+            dtype = FIELD_DTYPES[type_.lower()]
+            fields.append({"key": key, "type": type_, "dtype": dtype, "offset": offset})
+            offset = align(offset + ticks * len(ids) * np.dtype(dtype).itemsize)
+        header = {
+            "version": 1,
+            "schema": schema,
+            "id_start": min(ids),
+            "id_end": max(ids),
+            "ticks": ticks,
+            "tag_keys": list(layout.tag_keys),
+            "tag_values": [list(values) for values in channels.tag_values],
+            "timestamps": 0,
+            "fields": fields,
+        }
+        # reserve room for the digits the offsets will grow by
+        size = len(self._encode(header, 0)) + OFFSET_DIGITS * (len(fields) + 1)
+        data_offset = align(PREAMBLE.size + size)
+        header["timestamps"] = data_offset
+        for field in fields:
+            field["offset"] += data_offset
+        self.header = header
+        self.size = data_offset + offset
+
+        encoded = self._encode(header, data_offset)
+        with open(self.path, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, len(encoded)))
+            f.write(encoded)
+            f.truncate(self.size)
+
+        self.timestamps = np.memmap(self.path, dtype=TIMESTAMP_DTYPE, mode="r+", offset=data_offset, shape=(ticks,))
+        self.fields = [
+            np.memmap(self.path, dtype=field["dtype"], mode="r+", offset=field["offset"], shape=(ticks, len(ids)))
+            for field in fields
+        ]
+
+    @staticmethod
+    def _encode(header: dict, data_offset: int) -> bytes:
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        # pad the header with whitespace up to the start of the data
+        if data_offset:
+            encoded = encoded.ljust(data_offset - PREAMBLE.size, b" ")
+        return encoded
+
+    def write_tick(self, timestamp: int, batch: ColumnarBatch):
+        """
+        Write the values of all channels for the next tick.
+        """
+        self.timestamps[self.tick] = timestamp
+        for array, key in zip(self.fields, self.channels.layout.field_keys):
+            array[self.tick] = batch[key]
+        self.tick += 1
+
+    def close(self):
+        for array in [self.timestamps, *self.fields]:
+            array.flush()
+        self.timestamps = None
+        self.fields = []
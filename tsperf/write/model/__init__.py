@@ -4,3 +4,9 @@ from enum import Enum
 class IngestMode(Enum):
     CONSECUTIVE = "consecutive"
     FAST = "fast"
+    RATE = "rate"
+
+
+class InsertEngine(Enum):
+    THREADS = "threads"
+    ASYNCIO = "asyncio"
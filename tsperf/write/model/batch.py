@@ -0,0 +1,80 @@
+# -*- coding: utf-8; -*-
+#
+# Licensed to Crate.io GmbH ("Crate") under one or more contributor
+# license agreements.  See the NOTICE file distributed with this work for
+# additional information regarding copyright ownership.  Crate licenses
+# this file to you under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.  You may
+# obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# However, if you have executed another commercial license agreement
+# with Crate these terms will supersede the license and you may use the
+# software solely pursuant to the terms of the relevant commercial agreement.
+from typing import Dict, Iterable, List, Optional
+
+
+class ColumnarBatch:
+    """
+    A batch of rows in columnar representation, with one list of values for
+    each tag and field, keyed by column name.
+
+    Optionally, `tag_values` holds the immutable tag tuple of the channel of
+    each row, see `Channel.tag_values`. Adapters can use it as a key for caching
+    serialized tag fragments.
+
+    Column lists may be shared between batches, so they must not be mutated.
+    """
+
+    def __init__(self, columns: Dict[str, list], tag_values: Optional[List[tuple]] = None):
+        self.columns = columns
+        self.tag_values = tag_values
+
+    def __len__(self) -> int:
+        for values in self.columns.values():
+            return len(values)
+        return 0
+
+    def __getitem__(self, key: str) -> list:
+        return self.columns[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.columns
+
+    def keys(self) -> List[str]:
+        return list(self.columns.keys())
+
+    def rows(self) -> List[dict]:
+        """
+        Convert the batch into the row representation, one dictionary per row.
+        """
+        keys = self.keys()
+        return [dict(zip(keys, values)) for values in zip(*self.columns.values())]
+
+    @classmethod
+    def concat(cls, batches: Iterable["ColumnarBatch"]) -> "ColumnarBatch":
+        """
+        Concatenate multiple batches with the same columns into a single batch.
+        """
+        batches = list(batches)
+        if len(batches) == 1:
+            return batches[0]
+        columns = {}
+        tag_values = []
+        for batch in batches:
+            for key, values in batch.columns.items():
+                if key not in columns:
+                    columns[key] = []
+                columns[key].extend(values)
+            if tag_values is not None and batch.tag_values is not None:
+                tag_values.extend(batch.tag_values)
+            else:
+                tag_values = None
+        return cls(columns, tag_values=tag_values)
@@ -18,39 +18,79 @@
 # However, if you have executed another commercial license agreement
 # with Crate these terms will supersede the license and you may use the
 # software solely pursuant to the terms of the relevant commercial agreement.
+from typing import Iterable, Optional
+
+import numpy
+
+from tsperf.write.model.batch import ColumnarBatch
 from tsperf.write.model.sensor import BoolSensor, FloatSensor
 
 factors = [-1, 1]
 
 
+def derive_seed(seed: int, *keys: int) -> int:
+    """
+    Derive an independent seed for a random number generator stream from the global
+    `seed` and the given keys, for example the channel id and the sensor index.
+
+    The derived seed only depends on its inputs, so a stream produces the same values
+    regardless of which thread or process it is computed in.
+    """
+    return int(numpy.random.SeedSequence(seed, spawn_key=keys).generate_state(1, numpy.uint64)[0])
+
+
+class ChannelLayout:
+    """
+    The ordered layout of the tags and fields of a channel, compiled from the schema.
+
+    `tag_keys` and `field_keys` define the order of tag values and field values.
+    """
+
+    def __init__(self, tags: dict, fields: dict):
+        self.tag_keys = tuple(key for key in tags.keys() if key != "description")
+        self.field_keys = tuple(value["key"]["value"] for key, value in fields.items() if key != "description")
+        self.field_types = tuple(value["type"]["value"] for key, value in fields.items() if key != "description")
+
+
 class Channel:
-    def __init__(self, identifier: int, tags: dict, schema: dict):
+    def __init__(
+        self,
+        identifier: int,
+        tags: dict,
+        schema: dict,
+        layout: Optional[ChannelLayout] = None,
+        seed: Optional[int] = None,
+    ):
         self.id = identifier
         self.tags = tags
         self.schema = schema
+        self.layout = layout or ChannelLayout(tags, schema)
         self.sensors = []
         self.payload = {}
-        self._init_sensors()
+        self._init_sensors(seed)
+
+        # tags never change for a channel, so they are computed once
+        self._assign_tag_values()
+        self.tag_values = tuple(self.payload[key] for key in self.layout.tag_keys)
 
-    def _init_sensors(self):
-        for value in self.schema.values():
+    def _init_sensors(self, seed: Optional[int] = None):
+        for index, value in enumerate(self.schema.values()):
+            # each sensor of each channel uses its own random number generator stream
+            sensor_seed = None if seed is None else derive_seed(seed, self.id, index)
             sensor_type = value["type"]["value"].lower()
             if sensor_type == "float":
-                self.sensors.append(FloatSensor(value))
+                self.sensors.append(FloatSensor(value, seed=sensor_seed))
             elif sensor_type == "bool":
-                self.sensors.append(BoolSensor(value))
+                self.sensors.append(BoolSensor(value, seed=sensor_seed))
             else:
                 raise NotImplementedError("only FLOAT and BOOL Type have been implemented")
 
     def calculate_next_value(self) -> dict:
-        if self.payload == {}:
-            self._assign_tag_values()
-
+        # a copy of the tag payload is used so we don't overwrite the previously returned values
+        payload = dict(self.payload)
         for sensor in self.sensors:
-            self.payload[sensor.get_key()] = sensor.calculate_next_value()
-
-        # a copy of payload is returned so we don't overwrite the previously returned values
-        return dict(self.payload)
+            payload[sensor.get_key()] = sensor.calculate_next_value()
+        return payload
 
     def _assign_tag_values(self):
         items = list(self.tags.items())
@@ -72,3 +112,33 @@ class Channel:
                     self.payload[key] = identifiers[int((self.id - 1) / elements_identifier) % len(identifiers)]
 
                 elements_identifier += len(identifiers)
+
+
+class ChannelGroup:
+    """
+    Compute the next values for a group of channels in columnar representation.
+
+    Tag values never change for a channel, so the tag columns are computed once
+    and shared by all batches produced by the group.
+    """
+
+    def __init__(self, channels: Iterable[Channel]):
+        self.channels = list(channels)
+        self.tag_columns = {}
+        self.tag_values = [channel.tag_values for channel in self.channels]
+        self.layout = None
+        if not self.channels:
+            return
+
+        self.layout = self.channels[0].layout
+        for index, key in enumerate(self.layout.tag_keys):
+            self.tag_columns[key] = [tag_values[index] for tag_values in self.tag_values]
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def calculate_next_batch(self) -> ColumnarBatch:
+        columns = dict(self.tag_columns)
+        for index, key in enumerate(self.layout.field_keys):
+            columns[key] = [channel.sensors[index].calculate_next_value() for channel in self.channels]
+        return ColumnarBatch(columns, tag_values=self.tag_values)
@@ -28,6 +28,12 @@ c_values_queue_was_empty = Counter(
     "tsperf_values_queue_empty",
     "How many times the values_queue was empty when " "insert_routine needed more values",
 )
+c_values_queue_producer_stall = Counter(
+    "tsperf_values_queue_producer_stall_seconds",
+    "How many seconds the value generator was blocked because the values_queue was full",
+)
+g_values_queue_rows = Gauge("tsperf_values_queue_rows", "How many rows are buffered in the values_queue")
+g_values_queue_bytes = Gauge("tsperf_values_queue_bytes", "Estimated number of bytes buffered in the values_queue")
 c_inserts_performed_success = Counter(
     "tsperf_inserts_performed_success",
     "How many times the an insert into the " "database was performed successfully",
@@ -55,6 +61,10 @@ g_best_batch_size = Gauge(
     "The up to now best batch size found by the " "batch_size_automator",
     labelnames=("thread",),
 )
+g_schedule_lag = Gauge(
+    "tsperf_schedule_lag_seconds",
+    "How many seconds the database writers are behind the schedule of the target ingest rate",
+)
 g_best_batch_rps = Gauge(
     "tsperf_best_batch_rps",
     "The rows per second for the up to now best batch size",
@@ -1,4 +1,5 @@
 import random
+from typing import Optional
 
 from tsperf.util.float_simulator import FloatSimulator
 
@@ -12,7 +13,7 @@ class Sensor:
 
 
 class FloatSensor(Sensor):
-    def __init__(self, schema):
+    def __init__(self, schema, seed: Optional[int] = None):
         super().__init__(schema)
         self.float_simulator = FloatSimulator(
             schema["mean"]["value"],
@@ -22,6 +23,7 @@ class FloatSensor(Sensor):
             schema["variance"]["value"],
             schema["error_rate"]["value"],
             schema["error_length"]["value"],
+            seed=seed,
         )
 
     def calculate_next_value(self) -> float:
@@ -29,9 +31,10 @@ class FloatSensor(Sensor):
 
 
 class BoolSensor(Sensor):
-    def __init__(self, schema):
+    def __init__(self, schema, seed: Optional[int] = None):
         super().__init__(schema)
         self.true_ratio = self.schema["true_ratio"]["value"]
+        self.random = random if seed is None else random.Random(seed)  # noqa:S311
 
     def calculate_next_value(self) -> bool:
-        return random.randint(0, int(1 / self.true_ratio)) < 1  # noqa:S311
+        return self.random.randint(0, int(1 / self.true_ratio)) < 1